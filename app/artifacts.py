@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are produced
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STATIC_CACHE_CONTROL = "public, max-age=3600"
+COMPRESSIBLE_SUFFIXES = {".html", ".css", ".js", ".svg", ".json", ".txt"}
+MIN_COMPRESS_BYTES = 1024
+# extracted images are already named after the sha256 of their bytes
+CONTENT_ADDRESSED_NAME = re.compile(r"^img_([0-9a-f]{24})\.[a-z0-9]+$")
+ETAG_CACHE_SIZE = 4096
+CHUNK_SIZE = 64 * 1024
+
+_etags: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def content_etag(path: Path, stat_result: os.stat_result) -> str:
+    """Strong ETag derived from the file's bytes, hashed once per path, size and mtime."""
+
+    named = CONTENT_ADDRESSED_NAME.match(path.name)
+    if named:
+        return f'"{named.group(1)}"'
+    key = (str(path), stat_result.st_size, stat_result.st_mtime_ns)
+    with _etags_lock:
+        etag = _etags.get(key)
+        if etag is not None:
+            _etags.move_to_end(key)
+            return etag
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+    with _etags_lock:
+        _etags[key] = etag
+        while len(_etags) > ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return etag
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def precompressed(path: Path, stat_result: os.stat_result, encoding: str, variants_dir: Path) -> Optional[Path]:
+    """Path of the ``encoding`` variant of ``path`` in ``variants_dir``, written there on first use.
+
+    Variants never go next to the source, which may be part of the installed package. Returns
+    ``None`` when the variant cannot be produced.
+    """
+
+    suffix = ".br" if encoding == "br" else ".gz"
+    # flat names keep variants of equally named files in different directories apart
+    source_key = hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    variant = variants_dir / f"{source_key}-{path.name}{suffix}"
+    try:
+        if variant.stat().st_mtime_ns >= stat_result.st_mtime_ns:
+            return variant
+    except FileNotFoundError:
+        pass
+    if encoding == "br" and brotli is None:
+        return None
+    try:
+        variants_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = variant.with_name(f".{variant.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(_compress(path.read_bytes(), encoding))
+        tmp_path.replace(variant)
+    except OSError:
+        logger.warning("Cannot write %s variant of %s to %s", encoding, path, variants_dir, exc_info=True)
+        return None
+    return variant
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in {"q=0", "q=0.0", "q=0.00", "q=0.000"}:
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive byte range for a single-range ``Range`` header.
+
+    Returns ``None`` when the header should be ignored (malformed or multi-range) and raises
+    ``ValueError`` when the range cannot be satisfied.
+    """
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if not start_text:
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        if start_text.isdigit() or end_text.isdigit():
+            raise
+        return None
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class ArtifactResponse(Response):
+    """File response that negotiates a precompressed variant and honours conditional and range requests."""
+
+    def __init__(
+        self, path: PathLike, stat_result: os.stat_result, cache_control: str, variants_dir: Optional[PathLike] = None
+    ):
+        self.path = Path(path)
+        self.stat_result = stat_result
+        self.cache_control = cache_control
+        self.variants_dir = Path(variants_dir) if variants_dir is not None else None
+        self.media_type = guess_type(self.path.name)[0] or "application/octet-stream"
+        self.background = None
+        self.status_code = 200
+        self.init_headers({})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        path, stat_result, encoding = self.path, self.stat_result, None
+        compressible = self.variants_dir is not None and self.path.suffix.lower() in COMPRESSIBLE_SUFFIXES
+        if compressible and stat_result.st_size >= MIN_COMPRESS_BYTES:
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for candidate in ("br", "gzip"):
+                if candidate not in accepted:
+                    continue
+                variant = await anyio.to_thread.run_sync(
+                    precompressed, self.path, stat_result, candidate, self.variants_dir
+                )
+                if variant is not None:
+                    path, stat_result, encoding = variant, variant.stat(), candidate
+                    break
+
+        etag = await anyio.to_thread.run_sync(content_etag, path, stat_result)
+        headers = {
+            "cache-control": self.cache_control,
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+        }
+        if compressible:
+            headers["vary"] = "Accept-Encoding"
+        if encoding:
+            headers["content-encoding"] = encoding
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (
+            if_none_match.strip() == "*" or etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        ):
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        range_header = request_headers.get("range")
+        if range_header and request_headers.get("if-range", etag) == etag:
+            try:
+                byte_range = parse_range(range_header, stat_result.st_size)
+            except ValueError:
+                headers["content-range"] = f"bytes */{stat_result.st_size}"
+                await Response(status_code=416, headers=headers)(scope, receive, send)
+                return
+            if byte_range is not None:
+                await self._send_range(scope, send, path, byte_range, stat_result.st_size, headers)
+                return
+
+        # full bodies go through FileResponse, which hands the path to servers that offer
+        # the ``http.response.pathsend`` extension (zero-copy sendfile)
+        response = FileResponse(path, headers=headers, media_type=self.media_type, stat_result=stat_result)
+        await response(scope, receive, send)
+
+    async def _send_range(
+        self, scope: Scope, send: Send, path: Path, byte_range: Tuple[int, int], size: int, headers: dict
+    ) -> None:
+        start, end = byte_range
+        headers = {
+            **headers,
+            "content-range": f"bytes {start}-{end}/{size}",
+            "content-length": str(end - start + 1),
+            "content-type": self.media_type,
+        }
+        raw_headers = [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()]
+        await send({"type": "http.response.start", "status": 206, "headers": raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = end - start + 1
+        async with await anyio.open_file(path, mode="rb") as handle:
+            await handle.seek(start)
+            while remaining > 0:
+                chunk = await handle.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class ArtifactFiles(StaticFiles):
+    """``StaticFiles`` serving through :class:`ArtifactResponse` with a fixed ``Cache-Control``.
+
+    Compressible files get precompressed variants in ``variants_dir``; without one they are
+    always served as they are.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: PathLike,
+        cache_control: str = STATIC_CACHE_CONTROL,
+        variants_dir: Optional[PathLike] = None,
+    ):
+        super().__init__(directory=directory)
+        self.cache_control = cache_control
+        self.variants_dir = variants_dir
+
+    def file_response(
+        self, full_path: PathLike, stat_result: os.stat_result, scope: Scope, status_code: int = 200
+    ) -> Response:
+        return ArtifactResponse(full_path, stat_result, self.cache_control, variants_dir=self.variants_dir)
+
+
+__all__ = [
+    "ArtifactFiles",
+    "ArtifactResponse",
+    "IMMUTABLE_CACHE_CONTROL",
+    "STATIC_CACHE_CONTROL",
+    "content_etag",
+    "parse_range",
+    "precompressed",
+]
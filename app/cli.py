@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set
+
+DEFAULT_OUTPUT = Path("products.jsonl")
+# every output line is one of these: a product, or the outcome of a whole file after its products
+PRODUCT_RECORD = "product"
+FILE_RECORD = "file"
+HASH_CHUNK_BYTES = 1024 * 1024
+# recycle workers now and then so memory MuPDF holds on to does not build up over a long run
+MAX_TASKS_PER_CHILD = 50
+
+
+def find_pdfs(inputs: Iterable[str]) -> List[Path]:
+    """Expand directories (recursively) and glob patterns into a sorted list of PDF files."""
+
+    found: Set[Path] = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates: Iterable[Path] = path.rglob("*")
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = (Path(match) for match in glob.glob(item, recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() == ".pdf":
+                found.add(candidate.resolve())
+    return sorted(found)
+
+
+def completed_sources(output: Path) -> Set[str]:
+    """Sources recorded as done in an earlier run; failed files are tried again."""
+
+    done: Set[str] = set()
+    if not output.is_file():
+        return done
+    with output.open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # last line of a run that was killed mid-write
+            if record.get("type") == FILE_RECORD and record.get("status") == "done":
+                done.add(record["source"])
+    return done
+
+
+def _trim_unfinished(output: Path) -> None:
+    """Cut ``output`` back to its last file record.
+
+    A file's product lines are written before its file record, so anything after the last
+    one belongs to a file an interrupted run did not finish, and that file is converted again.
+    """
+
+    keep = 0
+    with output.open("rb") as handle:
+        for line in iter(handle.readline, b""):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("type") == FILE_RECORD:
+                keep = handle.tell()
+    with output.open("r+b") as handle:
+        handle.truncate(keep)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _init_worker() -> None:
+    from app.config import settings
+
+    # files are already spread over processes; the source PDFs are not kept, so previews
+    # cannot be rendered later on demand
+    settings.extract_workers = 1
+    settings.render_mode = "eager"
+    # the cache index is shared by every process and only locked within one
+    settings.cache_enabled = False
+    logging.basicConfig(level=logging.WARNING)
+
+
+def convert_file(source: str) -> Dict[str, Any]:
+    """Process-pool worker: extract and parse one PDF into its file record and products.
+
+    The job runs like a queue worker's, so it also saves the record the web app writes and
+    ``/jobs/<job_id>/results`` can show the catalog.
+    """
+
+    from app.services import jobs, storage
+
+    path = Path(source)
+    started = time.perf_counter()
+    job = jobs.Job(job_id=uuid.uuid4().hex, filename=path.name)
+    record: Dict[str, Any] = {"source": source, "job_id": job.job_id}
+    try:
+        job.sha256 = record["sha256"] = _file_sha256(path)
+        # this is already one of the pool's processes
+        jobs.JobManager(1).process(job, path)
+    except Exception as exc:
+        storage.cleanup_job(job.job_id)
+        job.state, job.error = jobs.JOB_FAILED, f"{type(exc).__name__}: {exc}"
+    if job.state == jobs.JOB_DONE:
+        record.update(status="done", pages=job.pages_total, products=[product.to_dict() for product in job.products])
+    else:
+        record.update(status="failed", pages=0, products=[], error=job.error)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def _crashed_record(source: str) -> Dict[str, Any]:
+    return {
+        "source": source,
+        "job_id": None,
+        "status": "failed",
+        "pages": 0,
+        "products": [],
+        "error": "BrokenProcessPool: the worker process died while converting this file",
+        "seconds": 0.0,
+    }
+
+
+def _convert_batch(
+    sources: Deque[str], workers: int, context: BaseContext, on_record: Callable[[Dict[str, Any]], None]
+) -> List[str]:
+    """Convert ``sources`` in a fresh pool until they are all done or a worker process dies.
+
+    Files are submitted a few at a time, so a dead worker only takes the files in flight with
+    it. Those are returned; files not submitted yet stay in ``sources``.
+    """
+
+    in_flight: Dict[Future, str] = {}
+    crashed: List[str] = []
+    broken = False
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        max_tasks_per_child=MAX_TASKS_PER_CHILD,
+    ) as pool:
+        while (sources and not broken) or in_flight:
+            while sources and not broken and len(in_flight) < 2 * workers:
+                source = sources.popleft()
+                try:
+                    in_flight[pool.submit(convert_file, source)] = source
+                except BrokenProcessPool:
+                    sources.appendleft(source)
+                    broken = True
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    crashed.append(source)
+                    broken = True
+                    continue
+                on_record(record)
+    return crashed
+
+
+def convert(
+    sources: Sequence[Path],
+    output: Path,
+    workers: int,
+    resume: bool = True,
+    progress: bool = True,
+) -> Dict[str, Any]:
+    """Convert ``sources`` into ``output`` and return the throughput summary."""
+
+    done = completed_sources(output) if resume else set()
+    pending = [str(source) for source in sources if str(source) not in done]
+    summary: Dict[str, Any] = {
+        "files": 0,
+        "pages": 0,
+        "products": 0,
+        "failures": 0,
+        "skipped": len(sources) - len(pending),
+    }
+    started = time.perf_counter()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if pending:
+        context = multiprocessing.get_context("spawn")
+        if resume and output.is_file():
+            _trim_unfinished(output)
+        with output.open("a" if resume else "w", encoding="utf-8") as sink:
+            def record_file(record: Dict[str, Any]) -> None:
+                products = record.pop("products")
+                lines = [
+                    {"type": PRODUCT_RECORD, "source": record["source"], "job_id": record["job_id"], **product}
+                    for product in products
+                ]
+                lines.append({"type": FILE_RECORD, **record, "products": len(products)})
+                sink.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+                sink.flush()
+                summary["files"] += 1
+                summary["pages"] += record["pages"]
+                summary["products"] += len(products)
+                if record["status"] != "done":
+                    summary["failures"] += 1
+                if progress:
+                    detail = record.get("error") or f"{record['pages']} pages"
+                    print(
+                        f"[{summary['files']}/{len(pending)}] {record['status']} {record['source']} ({detail}, {record['seconds']}s)",
+                        file=sys.stderr,
+                    )
+
+            queue = deque(pending)
+            while queue:
+                suspects = _convert_batch(queue, max(1, min(workers, len(queue))), context, record_file)
+                # a worker died, so the pool is gone; retry the files it took down one at a time in
+                # their own pool, and record only a file that kills its worker again as failed
+                for source in suspects:
+                    if _convert_batch(deque([source]), 1, context, record_file):
+                        record_file(_crashed_record(source))
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["files_per_second"] = round(summary["files"] / elapsed, 2) if elapsed > 0 else 0.0
+    summary["pages_per_second"] = round(summary["pages"] / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    return (
+        f"{summary['files']} files ({summary['failures']} failed, {summary['skipped']} skipped), "
+        f"{summary['pages']} pages, {summary['products']} products in {summary['seconds']:.1f}s: "
+        f"{summary['files_per_second']:.2f} files/s, {summary['pages_per_second']:.2f} pages/s"
+    )
+
+
+def _convert_command(args: argparse.Namespace) -> int:
+    sources = find_pdfs(args.inputs)
+    if not sources:
+        print("No PDF files found.", file=sys.stderr)
+        return 2
+    summary = convert(sources, args.output, args.workers, resume=not args.no_resume, progress=not args.quiet)
+    print(json.dumps(summary) if args.json else format_summary(summary))
+    return 1 if summary["failures"] else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Offline catalog tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="convert PDF catalogs to JSON Lines")
+    convert_parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    convert_parser.add_argument("-o", "--output", type=Path, default=DEFAULT_OUTPUT, help="JSON Lines output file")
+    convert_parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    convert_parser.add_argument("--no-resume", action="store_true", help="overwrite the output instead of skipping done files")
+    convert_parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    convert_parser.add_argument("-q", "--quiet", action="store_true", help="no per-file progress lines")
+    convert_parser.set_defaults(handler=_convert_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
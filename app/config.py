@@ -13,6 +13,8 @@ DEFAULT_TEMPLATE_DIR = BASE_DIR / "templates"
 DEFAULT_TMP_DIR = BASE_DIR.parent / "data" / "tmp"
 DEFAULT_EXTRACTED_DIR = BASE_DIR.parent / "data" / "extracted"
 DEFAULT_UPLOAD_DIR = DEFAULT_STATIC_DIR / "uploads"
+DEFAULT_CATALOG_DB = BASE_DIR.parent / "data" / "catalog.db"
+DEFAULT_QUEUE_DB = BASE_DIR.parent / "data" / "queue.db"
 
 
 class Settings(BaseSettings):
@@ -26,7 +28,12 @@ class Settings(BaseSettings):
 
     app_name: str = Field("pdf-catalog-to-web", validation_alias="APP_NAME")
     max_upload_mb: int = Field(25, validation_alias="MAX_UPLOAD_MB", description="Maximum upload size in megabytes")
+    upload_chunk_bytes: int = Field(1024 * 1024, validation_alias="UPLOAD_CHUNK_BYTES")
+    resumable_max_upload_mb: int = Field(4096, validation_alias="RESUMABLE_MAX_UPLOAD_MB", description="Largest file accepted by upload sessions")
+    resumable_chunk_bytes: int = Field(8 * 1024 * 1024, validation_alias="RESUMABLE_CHUNK_BYTES", description="Chunk size of upload sessions")
     log_level: str = Field("INFO", validation_alias="LOG_LEVEL")
+    metrics_enabled: bool = Field(True, validation_alias="METRICS_ENABLED")
+    timing_logs: bool = Field(False, validation_alias="TIMING_LOGS", description="Structured per-job timing log lines")
     env: str = Field("production", validation_alias="ENV")
 
     static_dir: Path = Field(default_factory=lambda: DEFAULT_STATIC_DIR, validation_alias="STATIC_DIR")
@@ -36,6 +43,41 @@ class Settings(BaseSettings):
     upload_static_dir: Path = Field(default_factory=lambda: DEFAULT_UPLOAD_DIR, validation_alias="UPLOAD_DIR")
     render_scale: float = Field(2.0, validation_alias="RENDER_SCALE")
     render_format: str = Field("png", validation_alias="RENDER_FORMAT")
+    render_quality: int = Field(85, validation_alias="RENDER_QUALITY", description="JPEG/WebP quality for page previews")
+    preview_levels: int = Field(3, validation_alias="PREVIEW_LEVELS", description="Preview sizes, each half the previous")
+    render_mode: str = Field("eager", validation_alias="RENDER_MODE", description="eager or lazy page previews")
+    render_max_pixels: int = Field(25_000_000, validation_alias="RENDER_MAX_PIXELS", description="Pages are rendered at a lower scale past this size")
+    render_tile_pixels: int = Field(8_000_000, validation_alias="RENDER_TILE_PIXELS", description="Larger renders are drawn in bands")
+    render_memory_mb: int = Field(512, validation_alias="RENDER_MEMORY_MB", description="Memory shared by concurrent page renders")
+    lazy_max_scale: float = Field(4.0, validation_alias="LAZY_MAX_SCALE")
+    prewarm_pages: int = Field(6, validation_alias="PREWARM_PAGES", description="Pages pre-rendered in lazy mode")
+    image_min_width: int = Field(8, validation_alias="IMAGE_MIN_WIDTH", description="Narrower embedded images are not exported")
+    image_min_height: int = Field(8, validation_alias="IMAGE_MIN_HEIGHT", description="Shorter embedded images are not exported")
+    image_min_pixels: int = Field(256, validation_alias="IMAGE_MIN_PIXELS", description="Smaller embedded images are not exported")
+    image_skip_masks: bool = Field(True, validation_alias="IMAGE_SKIP_MASKS", description="Do not export soft and stencil masks")
+    extract_workers: int = Field(1, validation_alias="EXTRACT_WORKERS", description="Processes per extraction; 1 disables parallel mode")
+    extract_chunk_pages: int = Field(8, validation_alias="EXTRACT_CHUNK_PAGES")
+    job_workers: int = Field(2, validation_alias="JOB_WORKERS", description="Concurrent extraction jobs")
+    job_backend: str = Field("local", validation_alias="JOB_BACKEND", description="local extracts in the web process; queue hands jobs to app.worker")
+    queue_db_path: Path = Field(default_factory=lambda: DEFAULT_QUEUE_DB, validation_alias="QUEUE_DB_PATH")
+    queue_lease_seconds: float = Field(60, validation_alias="QUEUE_LEASE_SECONDS", description="Jobs of workers silent this long are retried")
+    queue_heartbeat_seconds: float = Field(5, validation_alias="QUEUE_HEARTBEAT_SECONDS")
+    queue_max_attempts: int = Field(3, validation_alias="QUEUE_MAX_ATTEMPTS", description="Claims before a crashing job is failed")
+    worker_poll_seconds: float = Field(1.0, validation_alias="WORKER_POLL_SECONDS")
+    admission_max_pages: int = Field(500, validation_alias="ADMISSION_MAX_PAGES", description="Pages extracted at once; 0 disables")
+    admission_queue_pages: int = Field(2000, validation_alias="ADMISSION_QUEUE_PAGES", description="Pages waiting before uploads get 503; 0 disables")
+    catalog_store_enabled: bool = Field(True, validation_alias="CATALOG_STORE_ENABLED")
+    catalog_db_path: Path = Field(default_factory=lambda: DEFAULT_CATALOG_DB, validation_alias="CATALOG_DB_PATH")
+    results_page_size: int = Field(24, validation_alias="RESULTS_PAGE_SIZE", description="Product cards per results page")
+    cache_enabled: bool = Field(True, validation_alias="CACHE_ENABLED")
+    cache_max_entries: int = Field(200, validation_alias="CACHE_MAX_ENTRIES")
+    cache_max_mb: int = Field(2048, validation_alias="CACHE_MAX_MB")
+    cache_max_age_hours: float = Field(168, validation_alias="CACHE_MAX_AGE_HOURS")
+    retention_enabled: bool = Field(True, validation_alias="RETENTION_ENABLED")
+    retention_max_age_hours: float = Field(720, validation_alias="RETENTION_MAX_AGE_HOURS", description="0 disables the age limit")
+    retention_max_mb: int = Field(20480, validation_alias="RETENTION_MAX_MB", description="0 disables the size limit")
+    retention_interval_seconds: float = Field(600, validation_alias="RETENTION_INTERVAL_SECONDS")
+    retention_min_idle_seconds: float = Field(900, validation_alias="RETENTION_MIN_IDLE_SECONDS", description="Recently accessed jobs are kept")
 
     @property
     def max_upload_size_mb(self) -> int:
@@ -45,6 +87,10 @@ class Settings(BaseSettings):
     def max_upload_size_bytes(self) -> int:
         return self.max_upload_mb * 1024 * 1024
 
+    @property
+    def resumable_max_upload_bytes(self) -> int:
+        return self.resumable_max_upload_mb * 1024 * 1024
+
 
 settings = Settings()
 
@@ -20,6 +20,18 @@ LOGGING_CONFIG: Dict[str, Any] = {
             "formatter": "standard",
             "level": "INFO",
         },
+        "timing": {
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+            "level": "INFO",
+        },
+    },
+    "loggers": {
+        "app.timing": {
+            "handlers": ["timing"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
     "root": {
         "handlers": ["console"],
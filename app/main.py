@@ -2,27 +2,89 @@ from __future__ import annotations
 
 import logging
 import os
+import re
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app import metrics
+from app.artifacts import IMMUTABLE_CACHE_CONTROL, ArtifactFiles
 from app.config import settings
 from app.logging_conf import configure_logging
-from app.routers import catalog
-from app.services import storage
+from app.routers import api, catalog, jobs as jobs_router, uploads
+from app.services import admission, extraction_cache, jobs, page_cache, render_budget, retention, storage
 
 configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.app_name)
+# upload sessions become jobs with the same id, so their files are tracked the same way
+JOB_PATH_PATTERN = re.compile(r"^/(?:jobs|api/jobs|static/uploads|uploads)/([A-Za-z0-9_-]+)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.retention_enabled:
+        retention.sweeper.start()
+    yield
+    retention.sweeper.stop()
+    jobs.manager.shutdown(wait=False)
+    page_cache.renderer.shutdown()
+    extraction_cache.cache.flush()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 app.state.templates = Jinja2Templates(directory=str(settings.template_dir))
-app.mount("/static", StaticFiles(directory=str(settings.static_dir)), name="static")
+# gzip/Brotli copies of static files live with the other runtime data, never in the package
+compressed_dir = settings.tmp_dir / "compressed"
+# job artifacts never change once written; mounted first so /static does not shadow it
+app.mount(
+    "/static/uploads",
+    ArtifactFiles(
+        directory=str(settings.upload_static_dir), cache_control=IMMUTABLE_CACHE_CONTROL, variants_dir=compressed_dir
+    ),
+    name="uploads",
+)
+app.mount("/static", ArtifactFiles(directory=str(settings.static_dir), variants_dir=compressed_dir), name="static")
 storage.ensure_directories()
 app.include_router(catalog.router)
+app.include_router(jobs_router.router)
+app.include_router(api.router)
+app.include_router(uploads.router)
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    if request.method == "POST" and request.url.path == "/upload" and catalog.declared_body_too_large(request):
+        return catalog.too_large_response(request)
+    return await call_next(request)
+
+
+class JobAccessMiddleware:
+    """Record job reads for the retention sweeper and keep the job pinned while they are handled.
+
+    Plain ASGI rather than ``@app.middleware``: ``call_next`` returns before a streamed body
+    (files, range requests) is sent, while the wrapped app here only returns after its last
+    body message.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match = JOB_PATH_PATTERN.match(scope["path"]) if scope["type"] == "http" else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+        with retention.sweeper.pinned(match.group(1)):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(JobAccessMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -52,6 +114,13 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    if not settings.metrics_enabled:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/debug/config", response_class=JSONResponse)
 async def debug_config():
     def exists_and_writable(path):
@@ -63,6 +132,16 @@ async def debug_config():
         "extracted_dir": str(settings.extracted_dir),
         "upload_static_dir": str(settings.upload_static_dir),
         "max_upload_mb": settings.max_upload_mb,
+        "jobs": {
+            "workers": jobs.manager.max_workers,
+            "queued": jobs.manager.queue_depth(),
+            "running": jobs.manager.in_flight(),
+        },
+        "admission": admission.controller.stats(),
+        "queue": dict(backend=settings.job_backend, **(jobs.manager.queue.stats() if jobs.manager.queue else {})),
+        "cache": dict(enabled=settings.cache_enabled, **extraction_cache.cache.stats()),
+        "render_budget": render_budget.render_budget.stats(),
+        "retention": dict(enabled=settings.retention_enabled, **retention.sweeper.stats()),
         "directories": {
             "static_dir_ready": exists_and_writable(settings.static_dir),
             "tmp_dir_ready": exists_and_writable(settings.tmp_dir),
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from app.config import settings
+
+LabelValues = Tuple[str, ...]
+MetricT = TypeVar("MetricT", bound="_Metric")
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation)
+        self._function = function
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is None:
+            return []
+        return [f"{self.name} {_format_value(self._function())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), []))
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        if not settings.metrics_enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: MetricT) -> MetricT:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(
+    Histogram("catalog_stage_seconds", "Time spent per pipeline stage.", ["stage"])
+)
+PAGE_SECONDS = registry.register(Histogram("catalog_page_seconds", "Time to extract one page."))
+JOB_SECONDS = registry.register(
+    Histogram("catalog_job_seconds", "Wall time of extraction jobs.", ["state"], buckets=JOB_BUCKETS)
+)
+PAGES_TOTAL = registry.register(Counter("catalog_pages_total", "Pages extracted."))
+PAGES_REUSED = registry.register(
+    Counter("catalog_pages_reused_total", "Unchanged pages reused from an earlier version of a catalog.")
+)
+IMAGES_WRITTEN = registry.register(Counter("catalog_images_written_total", "Unique embedded images written."))
+IMAGES_SKIPPED = registry.register(
+    Counter("catalog_images_skipped_total", "Embedded masks and trivially small images not exported.")
+)
+BYTES_WRITTEN = registry.register(Counter("catalog_bytes_written_total", "Artifact bytes written.", ["kind"]))
+JOBS_TOTAL = registry.register(Counter("catalog_jobs_total", "Finished extraction jobs.", ["state"]))
+JOBS_IN_FLIGHT = registry.register(Gauge("catalog_jobs_in_flight", "Jobs currently extracting."))
+JOBS_QUEUED = registry.register(Gauge("catalog_jobs_queued", "Jobs waiting for an extraction worker."))
+ADMISSION_REJECTED = registry.register(
+    Counter("catalog_admission_rejected_total", "Uploads rejected because the wait queue was full.")
+)
+RENDER_BYTES_RESERVED = registry.register(
+    Gauge("catalog_render_bytes_reserved", "Memory reserved by page renders in progress.")
+)
+RETENTION_SWEEP_SECONDS = registry.register(
+    Histogram("catalog_retention_sweep_seconds", "Duration of retention sweeps.")
+)
+RETENTION_RECLAIMED_BYTES = registry.register(
+    Counter("catalog_retention_reclaimed_bytes_total", "Bytes deleted by the retention sweeper.")
+)
+
+
+__all__ = [
+    "ADMISSION_REJECTED",
+    "BYTES_WRITTEN",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "IMAGES_SKIPPED",
+    "IMAGES_WRITTEN",
+    "JOBS_IN_FLIGHT",
+    "JOBS_QUEUED",
+    "JOBS_TOTAL",
+    "JOB_SECONDS",
+    "PAGES_REUSED",
+    "PAGES_TOTAL",
+    "PAGE_SECONDS",
+    "RENDER_BYTES_RESERVED",
+    "RETENTION_RECLAIMED_BYTES",
+    "RETENTION_SWEEP_SECONDS",
+    "Registry",
+    "STAGE_SECONDS",
+    "registry",
+]
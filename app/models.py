@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -14,3 +14,18 @@ class Product:
     page_preview_url: Optional[str] = None
     specs: Optional[List[Tuple[str, str]]] = None
     embedded_images: Optional[List[str]] = None
+    thumbnail_url: Optional[str] = None
+    srcset: Optional[str] = None
+    price_value: Optional[float] = None
+    price_text: Optional[str] = None
+    currency: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Product":
+        values = dict(data)
+        if values.get("specs"):
+            values["specs"] = [tuple(spec) for spec in values["specs"]]
+        return cls(**values)
@@ -1,3 +1,3 @@
-from . import catalog
+from . import api, catalog, jobs
 
-__all__ = ["catalog"]
+__all__ = ["api", "catalog", "jobs"]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.models import Product
+from app.services import catalog_store, extraction_cache, jobs
+from app.services.product_parser import product_price_value
+
+router = APIRouter(prefix="/api")
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+API_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _content_tag(job: jobs.Job) -> str:
+    """Identify a job's extracted content: its PDF digest plus output settings when known."""
+
+    if job.sha256:
+        return extraction_cache.cache_key(job.sha256)
+    return f"{job.job_id}:{job.finished_at}"
+
+
+def _etag(job: jobs.Job, *parts: object) -> str:
+    digest = hashlib.sha256("|".join([_content_tag(job), *map(str, parts)]).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _filter_products(
+    products: List[Product], min_price: Optional[float], max_price: Optional[float], q: Optional[str]
+) -> List[Product]:
+    needle = q.casefold() if q else None
+    selected = []
+    for product in products:
+        if min_price is not None or max_price is not None:
+            value = product_price_value(product)
+            if value is None:
+                continue
+            if min_price is not None and value < min_price:
+                continue
+            if max_price is not None and value > max_price:
+                continue
+        if needle and needle not in f"{product.name}\n{product.description}".casefold():
+            continue
+        selected.append(product)
+    return selected
+
+
+@router.get("/jobs/{job_id}/products")
+async def list_products(
+    request: Request,
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    q: Optional[str] = None,
+):
+    job = await run_in_threadpool(jobs.manager.get, job_id)
+    if job is None:
+        return JSONResponse({"detail": "Job not found."}, status_code=404)
+    if job.state != jobs.JOB_DONE:
+        return JSONResponse(job.to_status(), status_code=409 if job.state == jobs.JOB_FAILED else 202)
+
+    etag = _etag(job, offset, limit, min_price, max_price, q)
+    headers = {"ETag": etag, "Cache-Control": API_CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    matches = _filter_products(job.products, min_price, max_price, q)
+    page = matches[offset : offset + limit]
+    next_offset = offset + limit if offset + limit < len(matches) else None
+    next_url = None
+    if next_offset is not None:
+        next_url = str(request.url.include_query_params(offset=next_offset, limit=limit))
+    return JSONResponse(
+        {
+            "job_id": job.job_id,
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+            "next": next_url,
+            "items": [product.to_dict() for product in page],
+        },
+        headers=headers,
+    )
+
+
+@router.get("/jobs/{job_id}/pages/{page_number}/text")
+async def page_text(request: Request, job_id: str, page_number: int):
+    """Full extracted text of one page, fetched on demand by the results view."""
+
+    job = await run_in_threadpool(jobs.manager.get, job_id)
+    if job is None or job.state != jobs.JOB_DONE:
+        return JSONResponse({"detail": "Job not found."}, status_code=404)
+    product = next((item for item in job.products if item.page_number == page_number), None)
+    if product is None:
+        return JSONResponse({"detail": "Page not found."}, status_code=404)
+
+    etag = _etag(job, "text", page_number)
+    headers = {"ETag": etag, "Cache-Control": API_CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return PlainTextResponse(product.extracted_text or "", headers=headers)
+
+
+@router.get("/search")
+async def search_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    job_id: Optional[str] = None,
+):
+    """Full-text search over every catalog in the store, best matches first."""
+
+    hits = await run_in_threadpool(catalog_store.store.search, q, limit, offset, job_id)
+    return {"query": q, "offset": offset, "limit": limit, "hits": hits}
@@ -2,15 +2,20 @@ from __future__ import annotations
 
 import logging
 
-from fastapi import APIRouter, File, Request, UploadFile
-from fastapi.responses import HTMLResponse
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, RedirectResponse
 
 from app.config import settings
-from app.services import pdf_extract, product_parser, storage
+from app.services import admission, jobs, pdf_extract, storage
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
 
 def _validate_pdf(file: UploadFile) -> str:
     allowed_types = {"application/pdf", "application/x-pdf", "application/octet-stream"}
@@ -20,45 +25,111 @@ def _validate_pdf(file: UploadFile) -> str:
     return filename or "upload.pdf"
 
 
+def previous_version(job_id: Optional[str]) -> Optional[str]:
+    """Validate the optional earlier job a revised catalog is compared against."""
+
+    job_id = (job_id or "").strip()
+    if not job_id:
+        return None
+    previous = jobs.manager.get(job_id) if storage.JOB_ID_PATTERN.fullmatch(job_id) else None
+    if previous is None or previous.state != jobs.JOB_DONE:
+        raise ValueError(f"Previous version {job_id} was not found or has not finished processing.")
+    return job_id
+
+
 def _too_large(size: int) -> bool:
     return size > settings.max_upload_size_bytes
 
 
+def too_large_response(request: Request):
+    return request.app.state.templates.TemplateResponse(
+        "error.html",
+        {
+            "request": request,
+            "message": f"File exceeds maximum size of {settings.max_upload_size_mb} MB.",
+        },
+        status_code=413,
+    )
+
+
+def busy_response(request: Request, exc: admission.AdmissionRejected):
+    return request.app.state.templates.TemplateResponse(
+        "error.html",
+        {"request": request, "message": f"{exc} Please try again in {exc.retry_after} seconds."},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def declared_body_too_large(request: Request) -> bool:
+    """Check the Content-Length header before the multipart body is read.
+
+    The form encoding adds some overhead, so the exact limit is enforced while spooling.
+    """
+
+    length = request.headers.get("content-length", "")
+    return length.isdigit() and _too_large(int(length) - MULTIPART_OVERHEAD_BYTES)
+
+
 @router.get("/", response_class=HTMLResponse)
 async def upload_form(request: Request):
     return request.app.state.templates.TemplateResponse(
-        "upload.html", {"request": request, "max_size_mb": settings.max_upload_size_mb}
+        "upload.html",
+        {
+            "request": request,
+            "max_size_mb": settings.max_upload_size_mb,
+            "resumable_max_size_mb": settings.resumable_max_upload_mb,
+        },
     )
 
 
 @router.post("/upload", response_class=HTMLResponse)
-async def upload_pdf(request: Request, file: UploadFile = File(...)):
+async def upload_pdf(
+    request: Request, file: UploadFile = File(...), previous_job_id: Optional[str] = Form(None)
+):
     template = request.app.state.templates
     job_id = None
+    spool: Optional[storage.UploadSpool] = None
+    submitted = False
     try:
         filename = _validate_pdf(file)
-        file_bytes = await file.read()
-        if not file_bytes:
+        previous_job_id = await run_in_threadpool(previous_version, previous_job_id)
+        spool = storage.UploadSpool(filename, max_bytes=settings.max_upload_size_bytes)
+        try:
+            while chunk := await file.read(settings.upload_chunk_bytes):
+                spool.write(chunk)
+        except storage.UploadTooLarge:
+            return too_large_response(request)
+        if spool.size == 0:
             raise ValueError("Uploaded file is empty.")
-        if _too_large(len(file_bytes)):
-            return template.TemplateResponse(
-                "error.html",
-                {
-                    "request": request,
-                    "message": f"File exceeds maximum size of {settings.max_upload_size_mb} MB.",
-                },
-                status_code=413,
-            )
 
-        pdf_path, job_id = storage.save_upload(file_bytes, filename)
-        extraction = pdf_extract.extract_from_pdf(pdf_path, job_id)
-        products = product_parser.parse_products(
-            extraction.text_blocks, extraction.page_images, extraction.page_previews
-        )
+        cached = await run_in_threadpool(jobs.manager.find_cached, spool.sha256)
+        if cached is not None:
+            logger.info("Serving cached extraction %s for %s", cached.job_id, filename)
+            return RedirectResponse(f"/jobs/{cached.job_id}/results", status_code=303)
+
+        pdf_path, job_id = spool.finish()
+        pages = await run_in_threadpool(pdf_extract.page_count, pdf_path)
+        try:
+            job = await run_in_threadpool(
+                jobs.manager.submit,
+                pdf_path,
+                job_id,
+                filename,
+                sha256=spool.sha256,
+                pages=pages,
+                previous_job_id=previous_job_id,
+            )
+        except admission.AdmissionRejected as exc:
+            logger.warning("Rejected %s (%d pages): %s", filename, pages, exc)
+            return busy_response(request, exc)
+        submitted = True
 
         return template.TemplateResponse(
-            "results.html",
-            {"request": request, "products": products, "job_id": job_id},
+            "job.html",
+            {"request": request, "job": job.to_status()},
+            status_code=202,
+            headers={"Location": f"/jobs/{job_id}"},
         )
     except ValueError as exc:
         logger.exception("Validation error while uploading PDF")
@@ -79,3 +150,7 @@ async def upload_pdf(request: Request, file: UploadFile = File(...)):
             },
             status_code=500,
         )
+    finally:
+        # the spooled PDF belongs to the job once it is submitted; every other path drops it
+        if spool is not None and not submitted:
+            spool.discard()
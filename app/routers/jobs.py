@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
+
+from app import metrics
+from app.config import settings
+
+from app.services import jobs, page_cache, static_export
+from app.services.image_export import MEDIA_TYPES
+
+router = APIRouter(prefix="/jobs")
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_CHARS = 16 * 1024
+EVENT_POLL_SECONDS = 0.2
+# queued jobs are read from job.json and the queue database rather than memory, so poll them less often
+QUEUE_EVENT_POLL_SECONDS = 1.0
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+
+def _buffered(fragments: Iterable[str], size: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    """Coalesce Jinja's many small output fragments into chunks of roughly ``size`` characters."""
+
+    buffer = []
+    buffered = 0
+    rendering = 0.0
+    started = time.perf_counter()
+    for fragment in fragments:
+        buffer.append(fragment)
+        buffered += len(fragment)
+        if buffered >= size:
+            rendering += time.perf_counter() - started
+            yield "".join(buffer)
+            buffer, buffered = [], 0
+            started = time.perf_counter()
+    rendering += time.perf_counter() - started
+    # excludes time spent waiting on the client between chunks
+    metrics.STAGE_SECONDS.observe(rendering, stage="template")
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_template(request: Request, name: str, context: Dict[str, Any], status_code: int = 200) -> StreamingResponse:
+    """Render a template incrementally instead of building the whole page before the first byte."""
+
+    template = request.app.state.templates.get_template(name)
+    fragments = template.generate({"request": request, **context})
+    return StreamingResponse(_buffered(fragments), status_code=status_code, media_type="text/html")
+
+
+@router.get("/{job_id}", response_class=JSONResponse)
+async def job_status(job_id: str):
+    job = await run_in_threadpool(jobs.manager.get, job_id)
+    if job is None:
+        return JSONResponse({"detail": "Job not found."}, status_code=404)
+    return job.to_status()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _job_events(request: Request, job: jobs.Job) -> AsyncIterator[str]:
+    """Forward new products and progress from a running job until it finishes."""
+
+    sent_products = 0
+    sent_pages = -1
+    idle = 0.0
+    queued = jobs.manager.queue is not None
+    interval = QUEUE_EVENT_POLL_SECONDS if queued else EVENT_POLL_SECONDS
+    while True:
+        if queued:
+            # queued jobs run in worker processes; each lookup is a fresh snapshot read from disk
+            job = await run_in_threadpool(jobs.manager.get, job.job_id) or job
+        finished = job.finished  # read before products so nothing appended at the end is missed
+        new_products = job.products[sent_products:]
+        for product in new_products:
+            yield _sse("product", product.to_dict())
+        sent_products += len(new_products)
+        if job.pages_done != sent_pages:
+            sent_pages = job.pages_done
+            yield _sse("progress", {"pages_done": job.pages_done, "pages_total": job.pages_total})
+            idle = 0.0
+        if finished:
+            yield _sse("failed" if job.state == jobs.JOB_FAILED else "done", job.to_status())
+            return
+        if await request.is_disconnected():
+            return
+        if idle >= EVENT_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(interval)
+        idle += interval
+
+
+@router.get("/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    job = await run_in_threadpool(jobs.manager.get, job_id)
+    if job is None:
+        return JSONResponse({"detail": "Job not found."}, status_code=404)
+    return StreamingResponse(
+        _job_events(request, job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}/results", response_class=HTMLResponse)
+async def job_results(
+    request: Request,
+    job_id: str,
+    page: int = Query(1, ge=1),
+    per_page: Optional[int] = Query(None, ge=1, le=500),
+):
+    template = request.app.state.templates
+    job = await run_in_threadpool(jobs.manager.get, job_id)
+    if job is None:
+        return template.TemplateResponse(
+            "error.html",
+            {"request": request, "message": "Job not found."},
+            status_code=404,
+        )
+    if job.state == jobs.JOB_FAILED:
+        return template.TemplateResponse(
+            "error.html",
+            {"request": request, "message": job.error or "Failed to process the PDF."},
+            status_code=500,
+        )
+    if job.state != jobs.JOB_DONE:
+        return template.TemplateResponse(
+            "job.html",
+            {"request": request, "job": job.to_status()},
+            status_code=202,
+        )
+
+    per_page = per_page or settings.results_page_size
+    total = len(job.products)
+    pages = max(1, math.ceil(total / per_page))
+    page = min(page, pages)
+    start = (page - 1) * per_page
+    return stream_template(
+        request,
+        "results.html",
+        {
+            "products": job.products[start : start + per_page],
+            "job_id": job_id,
+            "pagination": {"page": page, "pages": pages, "per_page": per_page, "total": total},
+        },
+    )
+
+
+@router.get("/{job_id}/export.zip")
+async def job_export(request: Request, job_id: str):
+    job = await run_in_threadpool(jobs.manager.get, job_id)
+    if job is None:
+        return JSONResponse({"detail": "Job not found."}, status_code=404)
+    if job.state != jobs.JOB_DONE:
+        return JSONResponse({"detail": "Job is not finished yet.", "state": job.state}, status_code=409)
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", Path(job.filename or "").stem).strip("._") or "catalog"
+    return StreamingResponse(
+        static_export.stream_export(request.app.state.templates.env, job_id, job.filename, job.products),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{stem}-catalog.zip"'},
+    )
+
+
+@router.get("/{job_id}/pages/{page_number}.{fmt}")
+async def job_page_image(job_id: str, page_number: int, fmt: str, scale: Optional[float] = None):
+    try:
+        fmt = page_cache.normalize_format(fmt)
+    except ValueError as exc:
+        return JSONResponse({"detail": str(exc)}, status_code=400)
+    try:
+        path = await run_in_threadpool(
+            page_cache.renderer.render, job_id, page_number, page_cache.snap_scale(scale), fmt
+        )
+    except page_cache.PageNotFound as exc:
+        return JSONResponse({"detail": str(exc)}, status_code=404)
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt])
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.routers.catalog import previous_version
+from app.services import admission, jobs, pdf_extract, storage
+from app.services.upload_sessions import SessionNotFound, UploadIncomplete, UploadSession
+
+router = APIRouter(prefix="/uploads")
+logger = logging.getLogger(__name__)
+
+CHUNK_CHECKSUM_HEADER = "x-chunk-sha256"
+# request body messages are small; gather them so each trip to the threadpool writes a useful amount
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+def _error(message: str, status_code: int, headers: Optional[Dict[str, str]] = None, **extra: Any) -> JSONResponse:
+    return JSONResponse({"detail": message, **extra}, status_code=status_code, headers=headers)
+
+
+def _not_found(upload_id: str) -> JSONResponse:
+    return _error(f"Upload {upload_id} was not found or has already been finalized.", 404)
+
+
+async def _json_body(request: Request) -> Dict[str, Any]:
+    body = await request.body()
+    if not body.strip():
+        return {}
+    try:
+        payload = await request.json()
+    except ValueError as exc:
+        raise ValueError("Request body must be a JSON object.") from exc
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object.")
+    return payload
+
+
+@router.post("")
+async def create_upload(request: Request):
+    """Start a resumable upload: ``{"filename": ..., "size": <bytes>, "sha256": <optional hex>}``."""
+
+    try:
+        payload = await _json_body(request)
+        filename = str(payload.get("filename") or "")
+        if not filename.lower().endswith(".pdf"):
+            raise ValueError("Only PDF files are allowed.")
+        size = payload.get("size")
+        if not isinstance(size, int) or isinstance(size, bool):
+            raise ValueError("size must be the file size in bytes.")
+        session = await run_in_threadpool(UploadSession.create, filename, size, sha256=payload.get("sha256"))
+    except storage.UploadTooLarge as exc:
+        return _error(str(exc), 413)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    logger.info("Started upload %s for %s (%d bytes in %d chunks)", session.upload_id, session.filename, size, session.chunks)
+    return JSONResponse(await run_in_threadpool(session.status), status_code=201, headers={"Location": f"/uploads/{session.upload_id}"})
+
+
+@router.get("/{upload_id}")
+async def upload_status(upload_id: str):
+    try:
+        session = await run_in_threadpool(UploadSession.load, upload_id)
+    except SessionNotFound:
+        return _not_found(upload_id)
+    return await run_in_threadpool(session.status)
+
+
+@router.put("/{upload_id}/chunks/{index}")
+async def put_chunk(request: Request, upload_id: str, index: int):
+    """Write chunk ``index`` in place; chunks may be sent in parallel, in any order and more than once."""
+
+    try:
+        session = await run_in_threadpool(UploadSession.load, upload_id)
+        writer = await run_in_threadpool(session.open_chunk, index, request.headers.get(CHUNK_CHECKSUM_HEADER))
+    except SessionNotFound:
+        return _not_found(upload_id)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > writer.length:
+        writer.close()
+        return _error(f"Chunk {index} must be {writer.length} bytes long.", 413)
+    try:
+        buffer = bytearray()
+        async for data in request.stream():
+            buffer += data
+            if len(buffer) >= WRITE_BUFFER_BYTES:
+                await run_in_threadpool(writer.write, buffer)
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(writer.write, buffer)
+        return await run_in_threadpool(writer.finish)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    finally:
+        writer.close()
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload(request: Request, upload_id: str):
+    """Assemble the upload and hand it to the extraction pipeline, like ``POST /upload`` does.
+
+    Accepts an optional ``{"previous_job_id": ...}`` body for revised catalogs.
+    """
+
+    try:
+        session = await run_in_threadpool(UploadSession.load, upload_id)
+    except SessionNotFound:
+        return _not_found(upload_id)
+    job_id: Optional[str] = None
+    try:
+        payload = await _json_body(request)
+        previous_job_id = await run_in_threadpool(previous_version, payload.get("previous_job_id"))
+        pdf_path, sha256 = await run_in_threadpool(session.assemble)
+        job_id = session.upload_id
+
+        cached = await run_in_threadpool(jobs.manager.find_cached, sha256)
+        if cached is not None:
+            logger.info("Serving cached extraction %s for upload %s", cached.job_id, upload_id)
+            await run_in_threadpool(session.discard)
+            return JSONResponse(cached.to_status(), headers={"Location": f"/jobs/{cached.job_id}/results"})
+
+        pages = await run_in_threadpool(pdf_extract.page_count, pdf_path)
+        try:
+            job = await run_in_threadpool(
+                jobs.manager.submit,
+                pdf_path,
+                job_id,
+                session.filename,
+                sha256=sha256,
+                pages=pages,
+                previous_job_id=previous_job_id,
+            )
+        except admission.AdmissionRejected as exc:
+            logger.warning("Rejected upload %s (%d pages): %s", upload_id, pages, exc)
+            # the chunks stay in place, so finalizing can simply be retried
+            await run_in_threadpool(session.reopen)
+            return _error(str(exc), 503, headers={"Retry-After": str(exc.retry_after)})
+        await run_in_threadpool(session.close)
+        return JSONResponse(job.to_status(), status_code=202, headers={"Location": f"/jobs/{job_id}"})
+    except SessionNotFound:
+        return _not_found(upload_id)
+    except UploadIncomplete as exc:
+        return _error(str(exc), 409, missing_chunks=exc.missing)
+    except ValueError as exc:
+        logger.warning("Rejected upload %s: %s", upload_id, exc)
+        if job_id:
+            await run_in_threadpool(session.discard)
+        return _error(str(exc), 400)
+    except Exception:
+        logger.exception("Error finalizing upload %s", upload_id)
+        await run_in_threadpool(session.discard)
+        if job_id:
+            await run_in_threadpool(storage.cleanup_job, job_id)
+        return _error("Failed to process the PDF. Please try again with a valid file.", 500)
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    try:
+        session = await run_in_threadpool(UploadSession.load, upload_id)
+    except SessionNotFound:
+        return _not_found(upload_id)
+    await run_in_threadpool(session.discard)
+    return Response(status_code=204)
@@ -1,3 +1,3 @@
-from . import pdf_extract, product_parser, storage, image_export
-
-__all__ = ["pdf_extract", "product_parser", "storage", "image_export"]
+# Submodules are imported where they are used. Several of them create singletons on import
+# (job manager, caches, queue, retention sweeper), which spawned extraction workers must not build.
+__all__ = ["pdf_extract", "product_parser", "storage", "image_export", "catalog_store", "jobs"]
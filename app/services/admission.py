@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_AFTER_SECONDS = 10
+MAX_RETRY_AFTER_SECONDS = 300
+# weight of the newest job in the pages/second moving average
+THROUGHPUT_SMOOTHING = 0.3
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when the wait queue is full; ``retry_after`` estimates when there will be room."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Ticket:
+    job_id: str
+    pages: int
+
+
+class AdmissionController:
+    """Page-weighted admission in front of the extraction pipeline.
+
+    Jobs start in arrival order while the pages being extracted stay within ``max_running_pages``.
+    The rest wait in a queue holding at most ``max_queued_pages``, and new jobs are rejected
+    once it is full. A single job larger than a limit is still accepted when nothing else is
+    ahead of it. A limit of 0 disables it.
+    """
+
+    def __init__(self, max_running_pages: int, max_queued_pages: int):
+        self.max_running_pages = max_running_pages
+        self.max_queued_pages = max_queued_pages
+        self.admitted = 0
+        self.rejected = 0
+        self._queue: Deque[_Ticket] = deque()
+        self._running: Dict[str, int] = {}
+        self._pages_per_second: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def admit(self, job_id: str, pages: int) -> None:
+        """Reserve a place in the queue for ``job_id`` or raise :class:`AdmissionRejected`."""
+
+        ticket = _Ticket(job_id, max(1, pages))
+        with self._condition:
+            queued = sum(item.pages for item in self._queue)
+            if self.max_queued_pages > 0 and self._queue and queued + ticket.pages > self.max_queued_pages:
+                self.rejected += 1
+                metrics.ADMISSION_REJECTED.inc()
+                retry_after = self._retry_after(queued + sum(self._running.values()))
+                raise AdmissionRejected(
+                    f"Too many catalogs are waiting to be processed ({queued} pages queued).", retry_after
+                )
+            self._queue.append(ticket)
+            self.admitted += 1
+
+    def cancel(self, job_id: str) -> None:
+        with self._condition:
+            self._queue = deque(item for item in self._queue if item.job_id != job_id)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, job_id: str) -> Iterator[None]:
+        """Wait until ``job_id`` is first in line and fits, then hold its pages while running."""
+
+        with self._condition:
+            ticket = next((item for item in self._queue if item.job_id == job_id), None)
+            if ticket is not None:
+                self._condition.wait_for(lambda: self._queue[0] is ticket and self._fits(ticket))
+                self._queue.popleft()
+                self._running[job_id] = ticket.pages
+                self._condition.notify_all()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            if ticket is not None:
+                with self._condition:
+                    self._running.pop(job_id, None)
+                    self._observe(ticket.pages, time.monotonic() - started)
+                    self._condition.notify_all()
+
+    def _fits(self, ticket: _Ticket) -> bool:
+        if not self._running or self.max_running_pages <= 0:
+            return True
+        return sum(self._running.values()) + ticket.pages <= self.max_running_pages
+
+    def _observe(self, pages: int, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        rate = pages / seconds
+        previous = self._pages_per_second
+        self._pages_per_second = rate if previous is None else previous + THROUGHPUT_SMOOTHING * (rate - previous)
+
+    def _retry_after(self, pages_ahead: int) -> int:
+        if not self._pages_per_second:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        throughput = self._pages_per_second * max(1, len(self._running))
+        return min(MAX_RETRY_AFTER_SECONDS, max(1, math.ceil(pages_ahead / throughput)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "max_running_pages": self.max_running_pages,
+                "max_queued_pages": self.max_queued_pages,
+                "running_jobs": len(self._running),
+                "running_pages": sum(self._running.values()),
+                "queued_jobs": len(self._queue),
+                "queued_pages": sum(item.pages for item in self._queue),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "pages_per_second": round(self._pages_per_second, 2) if self._pages_per_second else None,
+            }
+
+
+controller = AdmissionController(settings.admission_max_pages, settings.admission_queue_pages)
+
+
+__all__ = ["AdmissionController", "AdmissionRejected", "controller"]
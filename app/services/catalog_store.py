@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from app.config import settings
+from app.models import Product
+from app.services.product_parser import product_price_value
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    filename TEXT,
+    sha256 TEXT,
+    pages_total INTEGER,
+    created_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    job_id TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    text TEXT,
+    preview_url TEXT,
+    PRIMARY KEY (job_id, page_number)
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    name TEXT,
+    description TEXT,
+    price TEXT,
+    price_value REAL,
+    page_image_url TEXT,
+    thumbnail_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_job_page ON products (job_id, page_number);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price_value);
+CREATE TABLE IF NOT EXISTS specs (
+    product_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_specs_product ON specs (product_id);
+CREATE TABLE IF NOT EXISTS images (
+    product_id INTEGER NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_product ON images (product_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, description, specs, tokenize='unicode61');
+"""
+
+# bm25 column weights for products_fts(name, description, specs)
+RANK_WEIGHTS = (10.0, 1.0, 4.0)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query that matches all words, quoting FTS syntax away."""
+
+    terms = [term.replace('"', '""') for term in text.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+class CatalogStore:
+    """SQLite store for finished jobs, their pages and products, with full-text search."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front, so id allocation is safe."""
+
+        conn = self._connect()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def save_job(
+        self,
+        job_id: str,
+        products: Sequence[Product],
+        filename: str = "",
+        sha256: Optional[str] = None,
+        pages_total: int = 0,
+        created_at: Optional[float] = None,
+        finished_at: Optional[float] = None,
+    ) -> None:
+        """Replace everything stored for ``job_id`` in a single transaction."""
+
+        with self._transaction() as conn:
+            self._delete(conn, job_id)
+            conn.execute(
+                "INSERT INTO jobs (job_id, filename, sha256, pages_total, created_at, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, filename, sha256, pages_total, created_at, finished_at),
+            )
+            conn.executemany(
+                "INSERT INTO pages (job_id, page_number, text, preview_url) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (job_id, page_number) DO NOTHING",
+                [(job_id, p.page_number, p.extracted_text, p.page_preview_url) for p in products],
+            )
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM products").fetchone()[0]
+            product_rows, spec_rows, image_rows, fts_rows = [], [], [], []
+            for product_id, product in enumerate(products, start=next_id):
+                product_rows.append(
+                    (
+                        product_id,
+                        job_id,
+                        product.page_number,
+                        product.name,
+                        product.description,
+                        product.price,
+                        product_price_value(product),
+                        product.page_image_url,
+                        product.thumbnail_url,
+                    )
+                )
+                specs = product.specs or []
+                spec_rows.extend((product_id, key, value) for key, value in specs)
+                image_rows.extend((product_id, url) for url in product.embedded_images or [])
+                fts_rows.append(
+                    (
+                        product_id,
+                        product.name,
+                        product.description,
+                        "\n".join(f"{key}: {value}" for key, value in specs),
+                    )
+                )
+            conn.executemany(
+                "INSERT INTO products (id, job_id, page_number, name, description, price, price_value,"
+                " page_image_url, thumbnail_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                product_rows,
+            )
+            conn.executemany("INSERT INTO specs (product_id, key, value) VALUES (?, ?, ?)", spec_rows)
+            conn.executemany("INSERT INTO images (product_id, url) VALUES (?, ?)", image_rows)
+            conn.executemany(
+                "INSERT INTO products_fts (rowid, name, description, specs) VALUES (?, ?, ?, ?)", fts_rows
+            )
+
+    def delete_job(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            self._delete(conn, job_id)
+
+    def _delete(self, conn: sqlite3.Connection, job_id: str) -> None:
+        product_ids = "SELECT id FROM products WHERE job_id = ?"
+        conn.execute(f"DELETE FROM products_fts WHERE rowid IN ({product_ids})", (job_id,))
+        conn.execute(f"DELETE FROM specs WHERE product_id IN ({product_ids})", (job_id,))
+        conn.execute(f"DELETE FROM images WHERE product_id IN ({product_ids})", (job_id,))
+        conn.execute("DELETE FROM products WHERE job_id = ?", (job_id,))
+        conn.execute("DELETE FROM pages WHERE job_id = ?", (job_id,))
+        conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def search(
+        self, text: str, limit: int = 20, offset: int = 0, job_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Rank products across all stored catalogs by bm25 relevance."""
+
+        query = fts_query(text)
+        if query is None:
+            return []
+        sql = (
+            "SELECT p.job_id, p.page_number, p.name, p.price, p.price_value, p.page_image_url, p.thumbnail_url,"
+            " j.filename, snippet(products_fts, 1, '[', ']', '…', 12) AS snippet,"
+            f" bm25(products_fts, {', '.join(map(str, RANK_WEIGHTS))}) AS score"
+            " FROM products_fts JOIN products p ON p.id = products_fts.rowid"
+            " JOIN jobs j ON j.job_id = p.job_id"
+            " WHERE products_fts MATCH ?"
+        )
+        params: List[Any] = [query]
+        if job_id:
+            sql += " AND p.job_id = ?"
+            params.append(job_id)
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        rows = self._connect().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+store = CatalogStore(settings.catalog_db_path)
+
+
+__all__ = ["CatalogStore", "fts_query", "store"]
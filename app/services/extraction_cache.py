@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services import retention, storage
+from app.services.pdf_extract import RenderOptions
+
+logger = logging.getLogger(__name__)
+
+# hits only reorder the LRU, so they are written to the index at most this often
+TOUCH_SAVE_SECONDS = 30.0
+
+
+@dataclass
+class CacheEntry:
+    job_id: str
+    created_at: float
+    last_access: float
+    size_bytes: int
+
+
+def cache_key(sha256: str) -> str:
+    """Key a PDF digest together with the settings that affect its extraction output.
+
+    The settings come from ``RenderOptions``, so an option added there is part of the key too.
+    """
+
+    options = json.dumps(asdict(RenderOptions.from_settings()), sort_keys=True)
+    return hashlib.sha256(f"{sha256}|{options}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """LRU index from content keys to finished jobs whose artifact directories it owns."""
+
+    def __init__(self, index_path: Path, max_entries: int, max_bytes: int, max_age_seconds: float):
+        self.index_path = index_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # held while the index is written, so snapshots reach the disk in the order they were taken
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+        self._eviction_listeners: List[Callable[[str], None]] = []
+        self._load()
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        self._eviction_listeners.append(listener)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the job id cached for ``key`` and mark it as recently used.
+
+        The new order is persisted with the next change, or after ``TOUCH_SAVE_SECONDS``.
+        """
+
+        now = time.time()
+        evicted: List[str] = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                now - entry.created_at > self.max_age_seconds
+                or not storage.has_job_record(entry.job_id)
+            ):
+                # a pinned entry stays until it can be evicted, but is not served
+                evicted = self._detach([key])
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                entry.last_access = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._dirty = True
+            save = bool(evicted) or (self._dirty and now - self._saved_at >= TOUCH_SAVE_SECONDS)
+        if save:
+            self._save()
+        self._remove(evicted)
+        return entry.job_id if entry is not None else None
+
+    def store(self, key: str, job_id: str) -> None:
+        # sized before taking the lock: it walks the job's directories
+        size_bytes = storage.job_size(job_id)
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                # A concurrent upload of the same PDF finished first; keep that one.
+                return
+            self._entries[key] = CacheEntry(job_id=job_id, created_at=now, last_access=now, size_bytes=size_bytes)
+            evicted = self._enforce_bounds(now)
+        self._save()
+        self._remove(evicted)
+
+    def flush(self) -> None:
+        """Write recent hits to the index, e.g. on shutdown."""
+
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self._save()
+
+    def owns(self, job_id: str) -> bool:
+        with self._lock:
+            return any(entry.job_id == job_id for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": sum(entry.size_bytes for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _enforce_bounds(self, now: float) -> List[str]:
+        evicted = self._detach([k for k, e in self._entries.items() if now - e.created_at > self.max_age_seconds])
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        # never evict the newest entry, so a job is not deleted right after it finishes
+        for key in list(self._entries)[:-1]:
+            if len(self._entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            size = self._entries[key].size_bytes
+            dropped = self._detach([key])
+            if dropped:
+                evicted.extend(dropped)
+                total -= size
+        return evicted
+
+    def _detach(self, keys: List[str]) -> List[str]:
+        """Drop ``keys`` from the index, unless their job is pinned, and return the dropped job ids.
+
+        Called under the lock; their files are deleted by ``_remove`` once it is released.
+        Pinned jobs (being served or used as a revision's previous version) stay cached and are
+        evicted by a later pass instead.
+        """
+
+        job_ids = []
+        for key in keys:
+            job_id = self._entries[key].job_id
+            if retention.sweeper.is_pinned(job_id):
+                logger.info("Keeping pinned cached extraction %s", job_id)
+                continue
+            del self._entries[key]
+            job_ids.append(job_id)
+        return job_ids
+
+    def _remove(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            logger.info("Evicting cached extraction %s", job_id)
+            storage.cleanup_job(job_id)
+            storage.remove_upload(job_id)
+            for listener in self._eviction_listeners:
+                try:
+                    listener(job_id)
+                except Exception:
+                    logger.warning("Eviction listener failed for job %s", job_id, exc_info=True)
+
+    def _load(self) -> None:
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        entries = sorted(raw.items(), key=lambda item: item[1].get("last_access", 0))
+        for key, data in entries:
+            try:
+                self._entries[key] = CacheEntry(**data)
+            except TypeError:
+                logger.warning("Ignoring malformed cache entry %s", key)
+
+    def _save(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                payload = json.dumps({key: asdict(entry) for key, entry in self._entries.items()})
+                self._dirty = False
+                self._saved_at = time.time()
+            try:
+                self.index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.index_path.with_suffix(".tmp")
+                tmp_path.write_text(payload, encoding="utf-8")
+                tmp_path.replace(self.index_path)
+            except OSError:
+                logger.exception("Failed to persist extraction cache index")
+
+
+cache = ExtractionCache(
+    index_path=settings.extracted_dir / "cache_index.json",
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_mb * 1024 * 1024,
+    max_age_seconds=settings.cache_max_age_hours * 3600,
+)
+
+
+__all__ = ["CacheEntry", "ExtractionCache", "cache", "cache_key"]
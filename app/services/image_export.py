@@ -1,16 +1,90 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import functools
+import hashlib
+import io
+import logging
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 import fitz  # PyMuPDF
 
+from app.config import settings
+from app.services.render_budget import rasterize
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; only WebP output needs it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# URL/file extension -> encoder output format for rendered pages
+PAGE_FORMATS = {"png": "png", "jpg": "jpg", "jpeg": "jpg", "webp": "webp"}
+MEDIA_TYPES = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+# Preview pyramid, largest first; each level is half the size of the previous one
+PYRAMID_LEVELS = ("zoom", "card", "thumb")
+# image stream filters whose raw bytes are a standalone file browsers can show, and its extension;
+# JPEG 2000 (JPXDecode) is not among them, as most browsers cannot display it
+RAW_IMAGE_FILTERS = {"DCTDecode": "jpg"}
+# formats of extracted originals that are kept as they are; anything else is converted to PNG
+BROWSER_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+RAW_COLORSPACES = {"DeviceRGB", "DeviceGray"}
+# ".xref-<xref>" files in a job's upload directory name the image exported for that xref
+XREF_LINK_PREFIX = ".xref-"
+
 
 @dataclass
 class ExportedImage:
     file_path: Path
     web_path: str
+    width: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ImagePolicy:
+    """Which embedded images are worth exporting, decided from ``get_images`` alone.
+
+    Soft and stencil masks are never shown on their own, and images below the size limits
+    are spacers, bullets and other decoration.
+    """
+
+    min_width: int = 8
+    min_height: int = 8
+    min_pixels: int = 256
+    skip_masks: bool = True
+
+    @classmethod
+    def from_settings(cls) -> "ImagePolicy":
+        return cls(
+            min_width=settings.image_min_width,
+            min_height=settings.image_min_height,
+            min_pixels=settings.image_min_pixels,
+            skip_masks=settings.image_skip_masks,
+        )
+
+    def accepts(self, width: int, height: int, bpc: int, colorspace: str, is_smask: bool) -> bool:
+        if self.skip_masks and (is_smask or (bpc == 1 and not colorspace)):
+            return False
+        return width >= self.min_width and height >= self.min_height and width * height >= self.min_pixels
+
+
+@dataclass
+class ImageRegistry:
+    """Images already exported for one document, keyed by xref and by content digest.
+
+    With ``link_xrefs`` the xref of each image is also recorded on disk, so registries in other
+    processes extracting the same document find the image without decoding it again.
+    """
+
+    by_xref: Dict[int, ExportedImage] = field(default_factory=dict)
+    by_digest: Dict[str, ExportedImage] = field(default_factory=dict)
+    skipped: Set[int] = field(default_factory=set)
+    images_written: int = 0
+    bytes_written: int = 0
+    link_xrefs: bool = False
 
 
 def build_web_image_path(job_id: str, filename: str) -> str:
@@ -21,9 +95,18 @@ def build_web_image_path(job_id: str, filename: str) -> str:
     return f"/static/uploads/{job_id}/{clean_name.as_posix()}".replace("\\", "/")
 
 
-def export_page_images(page: fitz.Page, job_id: str, output_dir: Path) -> List[ExportedImage]:
+def export_page_images(
+    page: fitz.Page,
+    job_id: str,
+    output_dir: Path,
+    registry: Optional[ImageRegistry] = None,
+    policy: Optional[ImagePolicy] = None,
+) -> List[ExportedImage]:
     """Export images from a page to the output directory.
 
+    Each unique image is written once as ``img_<digest>.<ext>``; pages sharing an xref or
+    identical bytes reuse the same file. Pass one ``registry`` per document to share
+    exports across pages. Images rejected by ``policy`` are skipped before any decoding.
     Returns list of ExportedImage entries with filesystem and web paths.
     """
 
@@ -33,32 +116,71 @@ def export_page_images(page: fitz.Page, job_id: str, output_dir: Path) -> List[E
     if not images:
         return image_paths
 
-    for idx, img in enumerate(images, start=1):
-        xref = img[0]
-        image_path = _export_original_image(page, xref, output_dir, idx)
-        if image_path is None:
-            # Fallback to pixmap rendering if the original cannot be extracted
-            pix = fitz.Pixmap(page.parent, xref)
-            if pix.n - pix.alpha >= 4:  # CMYK or similar; convert to RGB
-                pix = fitz.Pixmap(fitz.csRGB, pix)
-            image_path = output_dir / f"page{page.number + 1}_img{idx}.png"
-            pix.save(image_path)
-            pix = None
-
-        image_paths.append(
-            ExportedImage(
-                file_path=image_path.resolve(),
-                web_path=build_web_image_path(job_id, image_path.name),
+    registry = registry if registry is not None else ImageRegistry()
+    policy = policy or ImagePolicy.from_settings()
+    smasks = {img[1] for img in images if img[1]}
+    for xref, _, width, height, bpc, colorspace, _, _, image_filter, _ in images:
+        if xref in registry.skipped:
+            continue
+        exported = registry.by_xref.get(xref)
+        if exported is None and registry.link_xrefs:
+            exported = _linked_image(job_id, output_dir, xref)
+        if exported is None:
+            if not policy.accepts(width, height, bpc, colorspace, xref in smasks):
+                registry.skipped.add(xref)
+                continue
+            doc = page.parent
+            image_bytes, ext = (
+                _read_raw_image(doc, xref, image_filter, colorspace)
+                or _read_original_image(doc, xref)
+                or _render_image_pixmap(doc, xref)
             )
-        )
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            exported = registry.by_digest.get(digest)
+            if exported is None:
+                image_path = output_dir / f"img_{digest[:24]}.{ext}"
+                exported = ExportedImage(
+                    file_path=image_path.resolve(),
+                    web_path=build_web_image_path(job_id, image_path.name),
+                )
+                registry.by_digest[digest] = exported
+                # another chunk of the document may have written the same bytes already
+                if _write_image_once(image_path, image_bytes):
+                    registry.images_written += 1
+                    registry.bytes_written += len(image_bytes)
+            if registry.link_xrefs:
+                _link_image(output_dir, xref, exported)
+        registry.by_xref[xref] = exported
+
+        if exported not in image_paths:
+            image_paths.append(exported)
     return image_paths
 
 
-def _export_original_image(page: fitz.Page, xref: int, output_dir: Path, idx: int) -> Optional[Path]:
-    """Attempt to extract and persist the original embedded image bytes."""
+def _read_raw_image(doc: fitz.Document, xref: int, image_filter: str, colorspace: str) -> Optional[Tuple[bytes, str]]:
+    """A JPEG stream is already a complete image file; copy it without decoding.
+
+    Only single-filter RGB or grayscale streams qualify: browsers misread CMYK JPEGs, and a
+    ``/Decode`` array would change the pixels the PDF shows.
+    """
 
+    ext = RAW_IMAGE_FILTERS.get(image_filter)
+    if ext is None or colorspace not in RAW_COLORSPACES:
+        return None
+    if doc.xref_get_key(xref, "Decode")[0] != "null":
+        return None
     try:
-        image_dict = page.parent.extract_image(xref)
+        data = doc.xref_stream_raw(xref)
+    except Exception:
+        return None
+    return (data, ext) if data else None
+
+
+def _read_original_image(doc: fitz.Document, xref: int) -> Optional[Tuple[bytes, str]]:
+    """Attempt to read the original embedded image bytes, if browsers can display them."""
+
+    try:
+        image_dict = doc.extract_image(xref)
     except Exception:
         return None
 
@@ -66,10 +188,125 @@ def _export_original_image(page: fitz.Page, xref: int, output_dir: Path, idx: in
         return None
 
     ext = image_dict.get("ext", "png") or "png"
-    image_bytes = image_dict["image"]
-    output_path = output_dir / f"page{page.number + 1}_img{idx}.{ext}"
-    output_path.write_bytes(image_bytes)
-    return output_path
+    if ext not in BROWSER_IMAGE_EXTENSIONS:
+        return None
+    return image_dict["image"], ext
+
+
+def _render_image_pixmap(doc: fitz.Document, xref: int) -> Tuple[bytes, str]:
+    """Fallback to pixmap rendering if the original cannot be extracted."""
+
+    pix = fitz.Pixmap(doc, xref)
+    if pix.n - pix.alpha >= 4:  # CMYK or similar; convert to RGB
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return pix.tobytes("png"), "png"
+
+
+def _write_image_once(path: Path, image_bytes: bytes) -> bool:
+    """Write content-addressed bytes unless the file exists; return whether this call created it.
+
+    Parallel workers may race on the same name, so the file is hard-linked into place and only
+    the worker whose link succeeds counts it.
+    """
+
+    if path.exists():
+        return False
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(image_bytes)
+    try:
+        os.link(tmp_path, path)
+    except FileExistsError:
+        return False
+    except OSError:
+        tmp_path.replace(path)  # no hard links on this filesystem
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return True
+
+
+def _linked_image(job_id: str, output_dir: Path, xref: int) -> Optional[ExportedImage]:
+    try:
+        name = (output_dir / f"{XREF_LINK_PREFIX}{xref}").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    image_path = output_dir / name
+    if not image_path.is_file():
+        return None
+    return ExportedImage(file_path=image_path.resolve(), web_path=build_web_image_path(job_id, name))
+
+
+def _link_image(output_dir: Path, xref: int, exported: ExportedImage) -> None:
+    link_path = output_dir / f"{XREF_LINK_PREFIX}{xref}"
+    tmp_path = link_path.with_name(f"{link_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(exported.file_path.name, encoding="utf-8")
+    tmp_path.replace(link_path)
+
+
+def output_format(fmt: str) -> str:
+    """Resolve a requested page format to the encoder that will produce it."""
+
+    output = PAGE_FORMATS.get((fmt or "png").lower())
+    if output is None:
+        raise ValueError(f"Unsupported page format: {fmt}")
+    if output == "webp" and Image is None:
+        _warn_missing_pillow()
+        return "jpg"
+    return output
+
+
+@functools.lru_cache(maxsize=None)
+def _warn_missing_pillow() -> None:
+    logger.warning("Pillow is not installed; encoding WebP previews as JPEG")
+
+
+def encode_pixmap(pix: fitz.Pixmap, fmt: str = "png", quality: int = 85) -> bytes:
+    output = output_format(fmt)
+    if output == "webp":
+        mode = "L" if pix.n == 1 else "RGB"
+        image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=quality)
+        return buffer.getvalue()
+    if output == "jpg":
+        return pix.tobytes("jpg", jpg_quality=quality)
+    return pix.tobytes("png")
+
+
+def render_page_pyramid(
+    page: fitz.Page,
+    job_id: str,
+    output_dir: Path,
+    scale: float = 2.0,
+    fmt: str = "png",
+    quality: int = 85,
+    levels: int = 1,
+    max_pixels: Optional[int] = None,
+) -> List[ExportedImage]:
+    """Rasterize a page once and write it at up to ``levels`` sizes, largest first.
+
+    Smaller levels are produced by halving the same pixmap, never by re-rendering. The
+    scale may be lowered to keep oversized pages within the render budget.
+    """
+
+    pages_dir = output_dir / "pages"
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    ext = output_format(fmt)
+    rendered: List[ExportedImage] = []
+    with rasterize(page, scale, max_pixels=max_pixels) as pix:
+        for level, name in enumerate(PYRAMID_LEVELS[: max(1, levels)]):
+            if level:
+                pix.shrink(1)
+            filename = f"page_{page.number + 1}.{ext}" if level == 0 else f"page_{page.number + 1}_{name}.{ext}"
+            file_path = pages_dir / filename
+            file_path.write_bytes(encode_pixmap(pix, ext, quality))
+            rendered.append(
+                ExportedImage(
+                    file_path=file_path.resolve(),
+                    web_path=build_web_image_path(job_id, f"pages/{filename}"),
+                    width=pix.width,
+                )
+            )
+    return rendered
 
 
 def render_page_preview(
@@ -78,17 +315,22 @@ def render_page_preview(
     output_dir: Path,
     scale: float = 2.0,
     fmt: str = "png",
+    quality: int = 85,
 ) -> ExportedImage:
     """Render a high-resolution preview for a given page."""
 
-    pages_dir = output_dir / "pages"
-    pages_dir.mkdir(parents=True, exist_ok=True)
-    matrix = fitz.Matrix(scale, scale)
-    pix = page.get_pixmap(matrix=matrix, alpha=False)
-    ext = fmt.lower() if fmt else "png"
-    filename = f"page_{page.number + 1}.{ext}"
-    file_path = pages_dir / filename
-    pix.save(file_path)
-    pix = None
-    web_path = build_web_image_path(job_id, f"pages/{filename}")
-    return ExportedImage(file_path=file_path.resolve(), web_path=web_path)
+    return render_page_pyramid(page, job_id, output_dir, scale=scale, fmt=fmt, quality=quality)[0]
+
+
+def build_srcset(images: Sequence[ExportedImage]) -> Optional[str]:
+    """Format rendered levels as an ``<img srcset>`` value, smallest first."""
+
+    entries = [f"{img.web_path} {img.width}w" for img in sorted(images, key=lambda img: img.width or 0) if img.width]
+    return ", ".join(entries) or None
+
+
+def render_page_bytes(page: fitz.Page, scale: float = 2.0, fmt: str = "png", quality: int = 85) -> bytes:
+    """Rasterize a page within the render budget and encode it in memory."""
+
+    with rasterize(page, scale) as pix:
+        return encode_pixmap(pix, fmt, quality)
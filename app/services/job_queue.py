@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    job_id TEXT PRIMARY KEY,
+    pdf_path TEXT NOT NULL,
+    filename TEXT,
+    sha256 TEXT,
+    pages INTEGER NOT NULL DEFAULT 0,
+    previous_job_id TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_state ON queue (state, enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_queue_sha256 ON queue (sha256);
+CREATE TABLE IF NOT EXISTS queue_products (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+"""
+
+
+@dataclass
+class QueuedJob:
+    job_id: str
+    pdf_path: str
+    filename: str
+    sha256: Optional[str]
+    pages: int
+    previous_job_id: Optional[str]
+    state: str
+    attempts: int
+    worker: Optional[str]
+    lease_expires: Optional[float]
+    pages_done: int
+    error: Optional[str]
+    enqueued_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "QueuedJob":
+        return cls(**{key: row[key] for key in row.keys()})
+
+
+class JobQueue:
+    """Durable job queue in SQLite, shared by the web app and any number of worker processes.
+
+    A worker claims a job with a lease and keeps extending it with heartbeats. When a worker
+    dies, its lease runs out and the next claim hands the job to another worker, until
+    ``max_attempts`` claims have been used up. Products of a running job are published page by
+    page, so the web process can stream them before the job's record is written.
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max(1, max_attempts)
+        self._local = threading.local()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front, across processes."""
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue(
+        self,
+        job_id: str,
+        pdf_path: Path,
+        filename: str,
+        sha256: Optional[str] = None,
+        pages: int = 0,
+        previous_job_id: Optional[str] = None,
+    ) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO queue (job_id, pdf_path, filename, sha256, pages, previous_job_id, state, enqueued_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, str(pdf_path), filename, sha256, pages, previous_job_id, QUEUED, time.time()),
+            )
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[QueuedJob]:
+        """Take the oldest queued job, or one whose worker stopped renewing its lease."""
+
+        now = time.time()
+        with self._transaction() as conn:
+            abandoned = conn.execute(
+                "UPDATE queue SET state = ?, error = ?, finished_at = ?, worker = NULL"
+                " WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "Processing was interrupted too many times.", now, RUNNING, now, self.max_attempts),
+            ).rowcount
+            if abandoned:
+                logger.warning("Gave up on %d jobs after %d attempts", abandoned, self.max_attempts)
+                conn.execute(
+                    "DELETE FROM queue_products WHERE job_id IN (SELECT job_id FROM queue WHERE state = ?)", (FAILED,)
+                )
+            row = conn.execute(
+                "SELECT * FROM queue WHERE state = ? OR (state = ? AND lease_expires < ?)"
+                " ORDER BY enqueued_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            if row["state"] == RUNNING:
+                logger.warning("Lease of worker %s on job %s expired; retrying", row["worker"], row["job_id"])
+            conn.execute(
+                "UPDATE queue SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1,"
+                " pages_done = 0, started_at = ? WHERE job_id = ?",
+                (RUNNING, worker, now + lease_seconds, now, row["job_id"]),
+            )
+            # a retried job starts over from its first page
+            conn.execute("DELETE FROM queue_products WHERE job_id = ?", (row["job_id"],))
+            claimed = conn.execute("SELECT * FROM queue WHERE job_id = ?", (row["job_id"],)).fetchone()
+        return QueuedJob.from_row(claimed)
+
+    def heartbeat(self, job_id: str, worker: str, lease_seconds: float, pages_done: int, pages: int) -> bool:
+        """Extend the lease and record progress; ``False`` means the job is no longer ours."""
+
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE queue SET lease_expires = ?, pages_done = ?, pages = MAX(pages, ?)"
+                " WHERE job_id = ? AND worker = ? AND state = ?",
+                (time.time() + lease_seconds, pages_done, pages, job_id, worker, RUNNING),
+            ).rowcount
+        return updated > 0
+
+    def publish(self, job_id: str, worker: str, product: Optional[Dict[str, Any]], pages_done: int, pages: int) -> bool:
+        """Record a finished page: its product, if it had one, and the job's progress.
+
+        ``False`` means the job is no longer ours.
+        """
+
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE queue SET pages_done = ?, pages = MAX(pages, ?) WHERE job_id = ? AND worker = ? AND state = ?",
+                (pages_done, pages, job_id, worker, RUNNING),
+            ).rowcount
+            if updated and product is not None:
+                conn.execute(
+                    "INSERT INTO queue_products (job_id, position, product)"
+                    " SELECT ?, COUNT(*), ? FROM queue_products WHERE job_id = ?",
+                    (job_id, json.dumps(product, ensure_ascii=False), job_id),
+                )
+        return updated > 0
+
+    def products(self, job_id: str) -> List[Dict[str, Any]]:
+        """Products published so far by the worker running ``job_id``, in page order."""
+
+        rows = self._connect().execute(
+            "SELECT product FROM queue_products WHERE job_id = ? ORDER BY position", (job_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def finish(self, job_id: str, worker: str, error: Optional[str] = None) -> bool:
+        """Mark the job done, or failed with ``error``; ``False`` when another worker owns it now.
+
+        Published products are dropped: a finished job is read from its record.
+        """
+
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE queue SET state = ?, error = ?, finished_at = ?, lease_expires = NULL"
+                " WHERE job_id = ? AND worker = ? AND state = ?",
+                (FAILED if error else DONE, error, time.time(), job_id, worker, RUNNING),
+            ).rowcount
+            if updated:
+                conn.execute("DELETE FROM queue_products WHERE job_id = ?", (job_id,))
+        return updated > 0
+
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        row = self._connect().execute("SELECT * FROM queue WHERE job_id = ?", (job_id,)).fetchone()
+        return QueuedJob.from_row(row) if row is not None else None
+
+    def finished_with(self, sha256: str) -> List[str]:
+        """Ids of jobs that finished extracting content with ``sha256``, newest first."""
+
+        rows = self._connect().execute(
+            "SELECT job_id FROM queue WHERE sha256 = ? AND state = ? ORDER BY finished_at DESC", (sha256, DONE)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def is_active(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return job is not None and job.state in (QUEUED, RUNNING)
+
+    def pending_pages(self) -> int:
+        row = self._connect().execute("SELECT COALESCE(SUM(pages), 0) FROM queue WHERE state = ?", (QUEUED,)).fetchone()
+        return row[0]
+
+    def count(self, state: str) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM queue WHERE state = ?", (state,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._connect().execute("SELECT state, COUNT(*) FROM queue GROUP BY state").fetchall())
+        return {
+            "db_path": str(self.db_path),
+            "max_attempts": self.max_attempts,
+            **{state: counts.get(state, 0) for state in (QUEUED, RUNNING, DONE, FAILED)},
+            "queued_pages": self.pending_pages(),
+        }
+
+
+queue = JobQueue(settings.queue_db_path, max_attempts=settings.queue_max_attempts)
+
+
+__all__ = ["DONE", "FAILED", "JobQueue", "QUEUED", "QueuedJob", "RUNNING", "queue"]
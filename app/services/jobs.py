@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app import metrics
+from app.config import settings
+from app.models import Product
+from app.services import admission, catalog_store, extraction_cache, job_queue, page_cache, pdf_extract, product_parser, retention, revisions, storage
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("app.timing")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = {JOB_DONE, JOB_FAILED}
+
+# called after each page with the job and the page's product, if it had one
+PageCallback = Callable[["Job", Optional[Product]], None]
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's extraction once it must stop, e.g. because another worker owns it now."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    filename: str
+    sha256: Optional[str] = None
+    state: str = JOB_QUEUED
+    pages_total: int = 0
+    pages_done: int = 0
+    error: Optional[str] = None
+    products: List[Product] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    previous_job_id: Optional[str] = None
+    # pages extracted again because they differ from the previous version
+    changed_pages: Optional[List[int]] = None
+    page_fingerprints: List[str] = field(default_factory=list)
+    render_options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def to_status(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "sha256": self.sha256,
+            "state": self.state,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "products": len(self.products),
+            "error": self.error,
+            "previous_job_id": self.previous_job_id,
+            "changed_pages": self.changed_pages,
+            "status_url": f"/jobs/{self.job_id}",
+            "events_url": f"/jobs/{self.job_id}/events",
+            "results_url": f"/jobs/{self.job_id}/results",
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "sha256": self.sha256,
+            "pages_total": self.pages_total,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "previous_job_id": self.previous_job_id,
+            "changed_pages": self.changed_pages,
+            "page_fingerprints": self.page_fingerprints,
+            "render_options": self.render_options,
+            "products": [product.to_dict() for product in self.products],
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Job":
+        return cls(
+            job_id=record["job_id"],
+            filename=record.get("filename", ""),
+            sha256=record.get("sha256"),
+            state=JOB_DONE,
+            pages_total=record.get("pages_total", 0),
+            pages_done=record.get("pages_total", 0),
+            products=[Product.from_dict(item) for item in record.get("products", [])],
+            created_at=record.get("created_at", time.time()),
+            finished_at=record.get("finished_at"),
+            previous_job_id=record.get("previous_job_id"),
+            changed_pages=record.get("changed_pages"),
+            page_fingerprints=record.get("page_fingerprints") or [],
+            render_options=record.get("render_options") or {},
+        )
+
+
+class JobManager:
+    """Run extraction jobs on a bounded thread pool and track their state.
+
+    The threads only orchestrate: pages are parsed and rendered in ``page_pool`` processes,
+    so extraction does not hold the web process's GIL. Once a job is done it is dropped from
+    memory and read back from its record.
+
+    With a ``queue``, submitted jobs go to the durable queue instead and are extracted by
+    ``app.worker`` processes; their state is read back from the queue.
+    """
+
+    def __init__(self, max_workers: int, queue: Optional[job_queue.JobQueue] = None):
+        self.max_workers = max(1, max_workers)
+        self.queue = queue
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        # admission tickets must be handed out in the order jobs reach the executor's queue
+        self._submit_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="extract"
+                )
+            return self._executor
+
+    def submit(
+        self,
+        pdf_path: Path,
+        job_id: str,
+        filename: str,
+        sha256: Optional[str] = None,
+        pages: Optional[int] = None,
+        previous_job_id: Optional[str] = None,
+    ) -> Job:
+        """Queue a PDF for extraction; raises ``AdmissionRejected`` when the wait queue is full.
+
+        With ``previous_job_id``, only pages that differ from that job are extracted again.
+        """
+
+        if self.queue is not None:
+            return self._enqueue(pdf_path, job_id, filename, sha256, pages or 0, previous_job_id)
+        job = Job(
+            job_id=job_id,
+            filename=filename,
+            sha256=sha256,
+            pages_total=pages or 0,
+            previous_job_id=previous_job_id,
+        )
+        executor = self._get_executor()
+        # Submits come from many request threads. A job whose ticket is behind another's must not
+        # reach the executor first, or it would hold a thread waiting for a job queued behind it.
+        with self._submit_lock:
+            admission.controller.admit(job_id, pages or 1)
+            with self._lock:
+                self._jobs[job_id] = job
+            # unpinned when _run finishes, so the sweeper never deletes a queued or running job
+            retention.sweeper.pin(job_id)
+            try:
+                executor.submit(self._run, job, pdf_path)
+            except RuntimeError:
+                admission.controller.cancel(job_id)
+                retention.sweeper.unpin(job_id)
+                with self._lock:
+                    self._jobs.pop(job_id, None)
+                raise
+        return job
+
+    def _enqueue(
+        self, pdf_path: Path, job_id: str, filename: str, sha256: Optional[str], pages: int, previous_job_id: Optional[str]
+    ) -> Job:
+        queued_pages = self.queue.pending_pages()
+        limit = settings.admission_queue_pages
+        if limit > 0 and queued_pages and queued_pages + pages > limit:
+            metrics.ADMISSION_REJECTED.inc()
+            raise admission.AdmissionRejected(
+                f"Too many catalogs are waiting to be processed ({queued_pages} pages queued).",
+                admission.DEFAULT_RETRY_AFTER_SECONDS,
+            )
+        self.queue.enqueue(job_id, pdf_path, filename, sha256=sha256, pages=pages, previous_job_id=previous_job_id)
+        return Job(job_id=job_id, filename=filename, sha256=sha256, pages_total=pages, previous_job_id=previous_job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job: queued, running and failed jobs from memory, finished ones from their record.
+
+        Finished jobs are not kept in memory; each call reads ``job.json`` again.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        record = storage.load_job_record(job_id)
+        if record is None:
+            return self._queued(job_id) if self.queue is not None else None
+        return Job.from_record(record)
+
+    def _queued(self, job_id: str) -> Optional[Job]:
+        """Snapshot of a job that a worker has not finished yet, with the products it has published."""
+
+        queued = self.queue.get(job_id)
+        if queued is None:
+            return None
+        products = self.queue.products(job_id) if queued.state == job_queue.RUNNING else []
+        return Job(
+            job_id=queued.job_id,
+            filename=queued.filename,
+            sha256=queued.sha256,
+            state=queued.state,
+            pages_total=queued.pages,
+            pages_done=queued.pages_done,
+            error=queued.error,
+            products=[Product.from_dict(item) for item in products],
+            created_at=queued.enqueued_at,
+            finished_at=queued.finished_at,
+            previous_job_id=queued.previous_job_id,
+        )
+
+    def process(
+        self,
+        job: Job,
+        pdf_path: Path,
+        on_page: Optional[PageCallback] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Job:
+        """Extract ``job`` in the calling thread, as a queue worker does.
+
+        Unlike jobs run by ``submit``, pages are rendered in the calling process unless
+        parallel mode applies: a worker process does nothing else. ``on_page`` is called after
+        each page, e.g. to publish its product. Once ``cancel`` is set, extraction stops after
+        the current page and the job's files and record are left alone.
+        """
+
+        self._extract(job, pdf_path, isolate=False, on_page=on_page, cancel=cancel)
+        return job
+
+    def find_cached(self, sha256: str) -> Optional[Job]:
+        """Return a finished job for identical content and output settings, if one is cached."""
+
+        if not settings.cache_enabled:
+            return None
+        key = extraction_cache.cache_key(sha256)
+        job_id = extraction_cache.cache.lookup(key)
+        if job_id is None and self.queue is not None:
+            job_id = self._adopt_finished(key, sha256)
+        return self.get(job_id) if job_id else None
+
+    def _adopt_finished(self, key: str, sha256: str) -> Optional[str]:
+        """Cache a job a worker finished for ``sha256`` with the current output settings.
+
+        Workers do not touch the extraction cache, which lives in the web process, so their
+        results are added to it the first time an identical upload looks for them.
+        """
+
+        options = asdict(pdf_extract.RenderOptions.from_settings())
+        for job_id in self.queue.finished_with(sha256):
+            record = storage.load_job_record(job_id)
+            if record is not None and record.get("render_options") == options:
+                extraction_cache.cache.store(key, job_id)
+                return job_id
+        return None
+
+    def forget(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def queue_depth(self) -> int:
+        if self.queue is not None:
+            return self.queue.count(job_queue.QUEUED)
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.state == JOB_QUEUED)
+
+    def in_flight(self) -> int:
+        if self.queue is not None:
+            return self.queue.count(job_queue.RUNNING)
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.state == JOB_RUNNING)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        pdf_extract.page_pool.shutdown(wait=wait)
+
+    def _index(self, job: Job) -> None:
+        """Write the finished job to the searchable catalog store; search is best-effort."""
+
+        if not settings.catalog_store_enabled:
+            return
+        try:
+            catalog_store.store.save_job(
+                job.job_id,
+                job.products,
+                filename=job.filename,
+                sha256=job.sha256,
+                pages_total=job.pages_total,
+                created_at=job.created_at,
+                finished_at=job.finished_at,
+            )
+        except Exception:
+            logger.exception("Failed to index job %s in the catalog store", job.job_id)
+
+    def _run(self, job: Job, pdf_path: Path) -> None:
+        with admission.controller.slot(job.job_id):
+            # pages are parsed and rendered in the page pool, never in the web process
+            self._extract(job, pdf_path, isolate=True)
+        if job.state == JOB_DONE:
+            # job.json has everything; get() reloads it, so the products need not stay in memory
+            self.forget(job.job_id)
+
+    def _extract_pages(
+        self,
+        job: Job,
+        pdf_path: Path,
+        stage_totals: Dict[str, float],
+        isolate: bool,
+        on_page: Optional[PageCallback],
+        cancel: Optional[threading.Event],
+    ) -> None:
+        previous = None
+        if job.previous_job_id:
+            job.changed_pages = []
+            previous = revisions.PreviousVersion.load(job.previous_job_id)
+            if previous is None:
+                logger.warning("Job %s has no page fingerprints; extracting every page", job.previous_job_id)
+        job.render_options = asdict(pdf_extract.RenderOptions.from_settings())
+        # products are appended as pages finish so event streams can forward them immediately
+        for page in pdf_extract.iter_pages(pdf_path, job.job_id, previous=previous, isolate=isolate):
+            parse_started = time.perf_counter()
+            product = product_parser.parse_page(
+                page.page_number,
+                page.text,
+                page.image_paths,
+                page.preview_path,
+                thumbnail_url=page.thumbnail_path,
+                srcset=page.preview_srcset,
+            )
+            page.timings["parse"] = time.perf_counter() - parse_started
+            metrics.STAGE_SECONDS.observe(page.timings["parse"], stage="parse")
+            for stage, seconds in page.timings.items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+            if product is not None:
+                job.products.append(product)
+            job.pages_total = page.pages_total
+            job.pages_done += 1
+            job.page_fingerprints.append(page.fingerprint)
+            if job.changed_pages is not None and not page.reused:
+                job.changed_pages.append(page.page_number)
+            if on_page is not None:
+                on_page(job, product)
+            if cancel is not None and cancel.is_set():
+                raise JobCancelled(f"Job {job.job_id} was cancelled after page {page.page_number}")
+
+    def _extract(
+        self,
+        job: Job,
+        pdf_path: Path,
+        isolate: bool = False,
+        on_page: Optional[PageCallback] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> None:
+        job.state = JOB_RUNNING
+        started = time.perf_counter()
+        stage_totals: Dict[str, float] = {}
+        try:
+            # unchanged pages are linked from the previous version, so keep the sweeper off it too
+            with retention.sweeper.pinned(job.previous_job_id or job.job_id):
+                self._extract_pages(job, pdf_path, stage_totals, isolate, on_page, cancel)
+            logger.info("Parsed %d products for job %s", len(job.products), job.job_id)
+            job.finished_at = time.time()
+            storage.save_job_record(job.job_id, job.to_record())
+            self._index(job)
+            if settings.cache_enabled and job.sha256 and self.queue is None:
+                extraction_cache.cache.store(extraction_cache.cache_key(job.sha256), job.job_id)
+            job.state = JOB_DONE
+            if settings.render_mode == "lazy" and settings.prewarm_pages > 0:
+                page_cache.renderer.prewarm(
+                    job.job_id,
+                    range(1, min(job.pages_total, settings.prewarm_pages) + 1),
+                    page_cache.snap_scale(None),
+                    page_cache.normalize_format(settings.render_format),
+                )
+        except JobCancelled as exc:
+            # whoever cancelled the job may be extracting it again; its files are theirs now
+            logger.warning("%s", exc)
+            job.error = "Processing was cancelled."
+            job.state = JOB_FAILED
+        except Exception:
+            logger.exception("Error processing job %s", job.job_id)
+            storage.cleanup_job(job.job_id)
+            job.error = "Failed to process the PDF. Please try again with a valid file."
+            job.state = JOB_FAILED
+            # failed jobs have no record to reload and stay in memory for status requests, without products
+            job.products = []
+        finally:
+            retention.sweeper.unpin(job.job_id)
+            job.finished_at = job.finished_at or time.time()
+            elapsed = time.perf_counter() - started
+            metrics.JOB_SECONDS.observe(elapsed, state=job.state)
+            metrics.JOBS_TOTAL.inc(state=job.state)
+            if settings.timing_logs:
+                stages = " ".join(f"{stage}_s={seconds:.3f}" for stage, seconds in sorted(stage_totals.items()))
+                timing_logger.info(
+                    "job=%s state=%s pages=%d products=%d total_s=%.3f %s",
+                    job.job_id,
+                    job.state,
+                    job.pages_done,
+                    len(job.products),
+                    elapsed,
+                    stages,
+                )
+
+
+manager = JobManager(settings.job_workers, queue=job_queue.queue if settings.job_backend == "queue" else None)
+if manager.queue is not None:
+    retention.sweeper.add_pin_check(manager.queue.is_active)
+metrics.JOBS_IN_FLIGHT.set_function(manager.in_flight)
+metrics.JOBS_QUEUED.set_function(manager.queue_depth)
+extraction_cache.cache.add_eviction_listener(manager.forget)
+extraction_cache.cache.add_eviction_listener(catalog_store.store.delete_job)
+retention.sweeper.add_eviction_listener(manager.forget)
+retention.sweeper.add_eviction_listener(catalog_store.store.delete_job)
+
+
+__all__ = [
+    "Job",
+    "JobCancelled",
+    "JobManager",
+    "JOB_QUEUED",
+    "JOB_RUNNING",
+    "JOB_DONE",
+    "JOB_FAILED",
+    "manager",
+]
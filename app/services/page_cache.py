@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from app.config import settings
+from app.services import storage
+from app.services.image_export import PYRAMID_LEVELS, output_format, render_page_bytes
+from app.services.page_pool import page_pool
+
+logger = logging.getLogger(__name__)
+
+RenderKey = Tuple[str, int, float, str]
+
+
+class PageNotFound(LookupError):
+    """Raised when the job, its source PDF or the requested page does not exist."""
+
+
+def normalize_format(fmt: str) -> str:
+    return output_format(fmt or "")
+
+
+def lazy_scales() -> List[float]:
+    """Scales pages are rendered at on request: the preview pyramid, plus ``LAZY_MAX_SCALE`` for zooming."""
+
+    levels = min(max(1, settings.preview_levels), len(PYRAMID_LEVELS))
+    scales = {round(settings.render_scale / 2**level, 2) for level in range(levels)}
+    if settings.lazy_max_scale > settings.render_scale:
+        scales.add(round(settings.lazy_max_scale, 2))
+    return sorted(scales)
+
+
+def snap_scale(scale: Optional[float]) -> float:
+    """Map a requested scale to the nearest of ``lazy_scales``, so each page has only a few renders."""
+
+    if scale is None:
+        return round(settings.render_scale, 2)
+    return min(lazy_scales(), key=lambda level: abs(level - scale))
+
+
+def lazy_page_url(job_id: str, page_number: int, fmt: str, scale: Optional[float] = None) -> str:
+    url = f"/jobs/{job_id}/pages/{page_number}.{fmt}"
+    return url if scale is None else f"{url}?scale={scale:g}"
+
+
+def page_render_path(job_id: str, page_number: int, scale: float, fmt: str) -> Path:
+    return settings.upload_static_dir / job_id / "pages" / f"page_{page_number}@{scale:g}x.{fmt}"
+
+
+def _render_page_file(pdf_path: str, page_number: int, scale: float, fmt: str, quality: int, path: str) -> None:
+    """Render one page to ``path``; runs in ``page_pool`` processes for isolated renderers."""
+
+    with fitz.open(pdf_path) as doc:
+        if not 1 <= page_number <= doc.page_count:
+            raise PageNotFound(f"Page {page_number} out of range")
+        image_bytes = render_page_bytes(doc[page_number - 1], scale=scale, fmt=fmt, quality=quality)
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(image_bytes)
+    tmp_path.replace(target)
+
+
+class PageRenderer:
+    """Render pages from a job's source PDF on first request and keep them on disk.
+
+    Concurrent requests for the same page and scale share one render. With ``isolate``, pages
+    are rendered in the shared ``page_pool`` processes rather than in the calling thread.
+    """
+
+    def __init__(self, prewarm_workers: int = 1, isolate: bool = False):
+        self.prewarm_workers = max(1, prewarm_workers)
+        self.isolate = isolate
+        self._locks: Dict[RenderKey, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def render(self, job_id: str, page_number: int, scale: float, fmt: str) -> Path:
+        path = page_render_path(job_id, page_number, scale, fmt)
+        if path.exists():
+            return path
+
+        key = (job_id, page_number, scale, fmt)
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                if not path.exists():
+                    self._render_to(path, job_id, page_number, scale, fmt)
+        finally:
+            with self._guard:
+                self._locks.pop(key, None)
+        return path
+
+    def prewarm(self, job_id: str, page_numbers: Iterable[int], scale: float, fmt: str) -> None:
+        """Render pages in the background so the first visitors hit the disk cache."""
+
+        with self._guard:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.prewarm_workers, thread_name_prefix="prewarm"
+                )
+            executor = self._executor
+        for page_number in page_numbers:
+            executor.submit(self._prewarm_one, job_id, page_number, scale, fmt)
+
+    def shutdown(self) -> None:
+        with self._guard:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prewarm_one(self, job_id: str, page_number: int, scale: float, fmt: str) -> None:
+        try:
+            self.render(job_id, page_number, scale, fmt)
+        except Exception:
+            logger.warning("Failed to pre-render page %s of job %s", page_number, job_id, exc_info=True)
+
+    def _render_to(self, path: Path, job_id: str, page_number: int, scale: float, fmt: str) -> None:
+        pdf_path = storage.find_upload(job_id)
+        if pdf_path is None:
+            raise PageNotFound(f"No source PDF for job {job_id}")
+        args = (str(pdf_path), page_number, scale, fmt, settings.render_quality, str(path))
+        if not self.isolate:
+            _render_page_file(*args)
+        else:
+            pool = page_pool.get()
+            try:
+                pool.submit(_render_page_file, *args).result()
+            except BrokenProcessPool:
+                page_pool.discard(pool)
+                raise
+        logger.debug("Rendered page %s of job %s at %sx", page_number, job_id, scale)
+
+
+renderer = PageRenderer(isolate=True)
+
+
+__all__ = [
+    "PageNotFound",
+    "PageRenderer",
+    "lazy_page_url",
+    "lazy_scales",
+    "normalize_format",
+    "page_render_path",
+    "renderer",
+    "snap_scale",
+]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.config import settings
+from app.services import render_budget
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(render_memory_bytes: int) -> None:
+    render_budget.render_budget.max_bytes = render_memory_bytes
+
+
+class PagePool:
+    """Worker processes that parse and render pages for every job and page request of this process.
+
+    Started on first use with ``EXTRACT_WORKERS`` x ``JOB_WORKERS`` processes, as many as the
+    concurrent jobs can keep busy, and the render memory budget is split between them.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                workers = max(1, settings.extract_workers) * max(1, settings.job_workers)
+                memory = settings.render_memory_mb * 1024 * 1024
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # spawn rather than fork: the web process submits work from many threads
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(max(1, memory // workers) if memory > 0 else 0,),
+                )
+            return self._pool
+
+    def discard(self, pool: ProcessPoolExecutor) -> None:
+        """Drop ``pool`` after one of its processes died, so the next caller starts a fresh one."""
+
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+page_pool = PagePool()
+
+
+__all__ = ["PagePool", "page_pool"]
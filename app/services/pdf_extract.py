@@ -1,17 +1,84 @@
 from __future__ import annotations
 
 import logging
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
 import fitz  # PyMuPDF
 
+from app import metrics
 from app.config import settings
-from app.services.image_export import export_page_images, render_page_preview
-from app.services.storage import prepare_extraction_dirs
+from app.models import Product
+from app.services.image_export import (
+    PYRAMID_LEVELS,
+    ExportedImage,
+    ImagePolicy,
+    ImageRegistry,
+    build_srcset,
+    build_web_image_path,
+    export_page_images,
+    render_page_pyramid,
+)
+from app.services.page_cache import lazy_page_url, page_render_path
+from app.services.page_pool import page_pool
+from app.services.render_budget import effective_scale
+from app.services.revisions import Fingerprinter, PreviousVersion
+from app.services.storage import link_file, prepare_extraction_dirs
 
 logger = logging.getLogger(__name__)
 
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """Output settings handed to every page, including pages extracted in worker processes."""
+
+    scale: float
+    fmt: str
+    quality: int = 85
+    levels: int = 1
+    lazy: bool = False
+    max_pixels: int = 0
+    images: ImagePolicy = ImagePolicy()
+
+    @classmethod
+    def from_settings(cls) -> "RenderOptions":
+        return cls(
+            scale=settings.render_scale,
+            fmt=settings.render_format,
+            quality=settings.render_quality,
+            levels=min(max(1, settings.preview_levels), len(PYRAMID_LEVELS)),
+            lazy=settings.render_mode == "lazy",
+            max_pixels=settings.render_max_pixels,
+            images=ImagePolicy.from_settings(),
+        )
+
+
+@dataclass
+class PageExtraction:
+    page_number: int
+    text: str
+    image_paths: List[str]
+    preview_path: str
+    thumbnail_path: Optional[str] = None
+    preview_srcset: Optional[str] = None
+    pages_total: int = 0
+    # measured where the page was extracted (possibly a worker process), reported by iter_pages
+    timings: Dict[str, float] = field(default_factory=dict)
+    images_written: int = 0
+    images_skipped: int = 0
+    image_bytes_written: int = 0
+    preview_bytes_written: int = 0
+    fingerprint: Optional[str] = None
+    reused: bool = False
+
 
 class ExtractionResult:
     def __init__(
@@ -20,36 +87,373 @@ class ExtractionResult:
         page_images: Dict[int, List[str]],
         page_previews: Dict[int, str],
         job_id: str,
+        page_thumbnails: Optional[Dict[int, str]] = None,
+        page_srcsets: Optional[Dict[int, str]] = None,
     ):
         self.text_blocks = text_blocks
         self.page_images = page_images
         self.page_previews = page_previews
+        self.page_thumbnails = page_thumbnails or {}
+        self.page_srcsets = page_srcsets or {}
         self.job_id = job_id
 
 
-def extract_from_pdf(pdf_path: Path, job_id: str) -> ExtractionResult:
-    extraction_dir, upload_dir = prepare_extraction_dirs(job_id)
+def _extract_page(
+    page: fitz.Page,
+    job_id: str,
+    upload_dir: Path,
+    options: RenderOptions,
+    registry: ImageRegistry,
+    fingerprinter: Optional[Fingerprinter] = None,
+) -> PageExtraction:
+    page_number = page.number + 1
+    started = time.perf_counter()
+    fingerprint = fingerprinter.page(page) if fingerprinter is not None else None
+    fingerprinted = time.perf_counter()
+    text = (page.get_text("text") or "").strip()
+    text_done = time.perf_counter()
+    images_before, bytes_before = registry.images_written, registry.bytes_written
+    skipped_before = len(registry.skipped)
+    images = export_page_images(page, job_id, upload_dir, registry=registry, policy=options.images)
+    images_done = time.perf_counter()
+    if options.lazy:
+        previews = _lazy_pyramid(page, job_id, options)
+        preview_bytes = 0
+    else:
+        previews = render_page_pyramid(
+            page,
+            job_id,
+            upload_dir,
+            scale=options.scale,
+            fmt=options.fmt,
+            quality=options.quality,
+            levels=options.levels,
+            max_pixels=options.max_pixels,
+        )
+        preview_bytes = sum(preview.file_path.stat().st_size for preview in previews)
+    render_done = time.perf_counter()
+    return PageExtraction(
+        page_number=page_number,
+        text=text,
+        image_paths=[img.web_path for img in images],
+        preview_path=previews[0].web_path,
+        thumbnail_path=previews[-1].web_path if len(previews) > 1 else None,
+        preview_srcset=build_srcset(previews) if len(previews) > 1 else None,
+        timings={
+            "fingerprint": fingerprinted - started,
+            "text": text_done - fingerprinted,
+            "images": images_done - text_done,
+            "render": render_done - images_done,
+            "page": render_done - started,
+        },
+        images_written=registry.images_written - images_before,
+        images_skipped=len(registry.skipped) - skipped_before,
+        image_bytes_written=registry.bytes_written - bytes_before,
+        preview_bytes_written=preview_bytes,
+        fingerprint=fingerprint,
+    )
+
+
+def _lazy_pyramid(page: fitz.Page, job_id: str, options: RenderOptions) -> List[ExportedImage]:
+    """Page endpoint URLs for each preview level; nothing is rendered until requested."""
+
+    page_number = page.number + 1
+    previews: List[ExportedImage] = []
+    for level in range(options.levels):
+        scale = round(options.scale / 2**level, 2)
+        previews.append(
+            ExportedImage(
+                file_path=page_render_path(job_id, page_number, scale, options.fmt),
+                web_path=lazy_page_url(job_id, page_number, options.fmt, scale=scale if level else None),
+                width=int(page.rect.width * effective_scale(page.rect, scale, options.max_pixels)),
+            )
+        )
+    return previews
+
+
+def _extract_page_range(
+    pdf_path: str, job_id: str, upload_dir: str, numbers: List[int], options: RenderOptions, fingerprint: bool = True
+) -> List[PageExtraction]:
+    """Process-pool worker: open a private document and extract the pages at ``numbers`` (0-based)."""
+
+    # other chunks of the document run in other processes, so share exported images through the disk
+    registry = ImageRegistry(link_xrefs=True)
+    with fitz.open(pdf_path) as doc:
+        fingerprinter = Fingerprinter(doc) if fingerprint else None
+        return [
+            _extract_page(doc[number], job_id, Path(upload_dir), options, registry, fingerprinter)
+            for number in numbers
+        ]
+
+
+def _fingerprint_page_range(pdf_path: str, numbers: List[int]) -> List[str]:
+    """Process-pool worker: fingerprints of the pages at ``numbers`` (0-based)."""
+
+    with fitz.open(pdf_path) as doc:
+        fingerprinter = Fingerprinter(doc)
+        return [fingerprinter.page(doc[number]) for number in numbers]
+
+
+def _chunks(numbers: List[int], chunk_size: int) -> List[List[int]]:
+    chunk_size = max(1, chunk_size)
+    return [numbers[start : start + chunk_size] for start in range(0, len(numbers), chunk_size)]
+
+
+def _iter_sequential(
+    doc: fitz.Document,
+    job_id: str,
+    upload_dir: Path,
+    numbers: List[int],
+    options: RenderOptions,
+    registry: ImageRegistry,
+    fingerprinter: Optional[Fingerprinter],
+) -> Iterator[PageExtraction]:
+    for number in numbers:
+        yield _extract_page(doc[number], job_id, upload_dir, options, registry, fingerprinter)
+
+
+def _iter_parallel(
+    pdf_path: Path,
+    job_id: str,
+    upload_dir: Path,
+    numbers: List[int],
+    workers: int,
+    options: RenderOptions,
+    fingerprint: bool = True,
+) -> Iterator[PageExtraction]:
+    """Extract chunks of pages in the shared ``page_pool``, at most ``workers`` chunks at a time."""
+
+    pool = page_pool.get()
+    chunks = deque(_chunks(numbers, settings.extract_chunk_pages))
+    in_flight: Deque[Future] = deque()
+    try:
+        while chunks or in_flight:
+            while chunks and len(in_flight) < workers:
+                chunk = chunks.popleft()
+                in_flight.append(
+                    pool.submit(
+                        _extract_page_range, str(pdf_path), job_id, str(upload_dir), chunk, options, fingerprint
+                    )
+                )
+            yield from in_flight.popleft().result()
+    except BrokenProcessPool:
+        page_pool.discard(pool)
+        raise
+    finally:
+        # when the consumer fails or stops early, drop the chunks that have not started yet and
+        # wait for the running ones, so nothing writes into the job after it is cleaned up
+        for future in in_flight:
+            future.cancel()
+        wait(in_flight)
+
+
+def _relink(url: str, previous_job_id: str, old_page: int, new_page: int, job_id: str, upload_dir: Path) -> str:
+    """Hard-link an earlier job's artifact into this job and return its new URL.
+
+    Raises ``ValueError`` for URLs that are not artifacts of the earlier job and ``OSError``
+    when the file is gone.
+    """
+
+    prefix = f"/static/uploads/{previous_job_id}/"
+    if not url.startswith(prefix):
+        raise ValueError(f"Not an artifact of job {previous_job_id}: {url}")
+    source = url[len(prefix) :]
+    # page renders are named after the page number, which may have moved
+    target = re.sub(rf"^pages/page_{old_page}(?=[._@])", f"pages/page_{new_page}", source)
+    link_file(settings.upload_static_dir / previous_job_id / source, upload_dir / target)
+    return build_web_image_path(job_id, target)
+
+
+def _reuse_page(
+    page: fitz.Page, previous: PreviousVersion, product: Product, job_id: str, upload_dir: Path, options: RenderOptions
+) -> Optional[PageExtraction]:
+    """Extraction result for an unchanged page, built from the earlier job's artifacts.
+
+    Returns ``None`` when any of them can no longer be reused.
+    """
+
+    started = time.perf_counter()
+    page_number = page.number + 1
+    old_page = product.page_number
+
+    def relink(url: str) -> str:
+        return _relink(url, previous.job_id, old_page, page_number, job_id, upload_dir)
+
+    try:
+        image_paths = [relink(url) for url in product.embedded_images or []]
+        if options.lazy:
+            previews = _lazy_pyramid(page, job_id, options)
+            preview_path = previews[0].web_path
+            thumbnail_path = previews[-1].web_path if len(previews) > 1 else None
+            srcset = build_srcset(previews) if len(previews) > 1 else None
+        else:
+            preview_path = relink(product.page_preview_url or "")
+            thumbnail_path = relink(product.thumbnail_url) if product.thumbnail_url else None
+            srcset = None
+            if product.srcset:
+                entries = (entry.strip().partition(" ") for entry in product.srcset.split(","))
+                srcset = ", ".join(f"{relink(url)} {width}" for url, _, width in entries)
+    except (OSError, ValueError):
+        logger.info("Artifacts of page %s in job %s are gone; extracting page %s again",
+                    old_page, previous.job_id, page_number)
+        return None
+    return PageExtraction(
+        page_number=page_number,
+        text=product.extracted_text or "",
+        image_paths=image_paths,
+        preview_path=preview_path,
+        thumbnail_path=thumbnail_path,
+        preview_srcset=srcset,
+        timings={"reuse": time.perf_counter() - started},
+        reused=True,
+    )
+
+
+def _use_parallel(page_count: int) -> bool:
+    return settings.extract_workers > 1 and page_count > settings.extract_chunk_pages
+
+
+def _record_page_metrics(extracted: PageExtraction) -> None:
+    if not settings.metrics_enabled:
+        return
+    if extracted.reused:
+        metrics.PAGES_REUSED.inc()
+        return
+    for stage in ("text", "images", "render"):
+        metrics.STAGE_SECONDS.observe(extracted.timings.get(stage, 0.0), stage=stage)
+    metrics.PAGE_SECONDS.observe(extracted.timings.get("page", 0.0))
+    metrics.PAGES_TOTAL.inc()
+    metrics.IMAGES_WRITTEN.inc(extracted.images_written)
+    metrics.IMAGES_SKIPPED.inc(extracted.images_skipped)
+    metrics.BYTES_WRITTEN.inc(extracted.image_bytes_written, kind="image")
+    metrics.BYTES_WRITTEN.inc(extracted.preview_bytes_written, kind="preview")
+
+
+def page_count(pdf_path: Path) -> int:
+    """Number of pages, read from the page tree without loading or parsing any page."""
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except (fitz.FileDataError, RuntimeError) as exc:
+        raise ValueError("The uploaded file is not a valid PDF.") from exc
+
+
+def _fingerprint_pages(
+    pdf_path: Path, doc: fitz.Document, numbers: List[int], fingerprinter: Optional[Fingerprinter]
+) -> List[str]:
+    """Fingerprints of the pages at ``numbers``; without a ``fingerprinter``, a chunk per ``page_pool`` task."""
+
+    if fingerprinter is not None:
+        return [fingerprinter.page(doc[number]) for number in numbers]
+    pool = page_pool.get()
+    chunks = _chunks(numbers, settings.extract_chunk_pages)
+    futures = [pool.submit(_fingerprint_page_range, str(pdf_path), chunk) for chunk in chunks]
+    try:
+        return [fingerprint for future in futures for fingerprint in future.result()]
+    except BrokenProcessPool:
+        page_pool.discard(pool)
+        raise
+
+
+def iter_pages(
+    pdf_path: Path, job_id: str, previous: Optional[PreviousVersion] = None, isolate: bool = False
+) -> Iterator[PageExtraction]:
+    """Extract pages one at a time, in page order, as soon as each is ready.
+
+    Every yielded page carries ``pages_total`` and its fingerprint, computed along with the
+    page. With ``previous``, pages whose fingerprint matches a page of that job reuse its text
+    and artifacts (hard-linked) instead of being extracted again, and are yielded with
+    ``reused`` set. Their fingerprints are needed first, so the document is then fingerprinted
+    and extracted a window of chunks at a time rather than all up front.
+
+    With ``isolate`` pages are always parsed and rendered in the ``page_pool`` processes, so
+    the calling process only orchestrates; the web server's ``JobManager`` asks for that.
+    Otherwise, as in queue workers and the CLI, the pool is only used for parallel mode.
+    """
+
+    _, upload_dir = prepare_extraction_dirs(job_id)
     logger.info("Starting extraction for %s", pdf_path)
+    options = RenderOptions.from_settings()
     doc = fitz.open(pdf_path)
+    total_pages = doc.page_count
+    parallel = isolate or _use_parallel(total_pages)
+    workers = max(1, settings.extract_workers)
+    registry = ImageRegistry()
+    fingerprinter = None if parallel else Fingerprinter(doc)
+    try:
+        if previous is not None and previous.render_options != asdict(options):
+            logger.info("Render settings changed since job %s; extracting every page", previous.job_id)
+            previous = None
+        if parallel:
+            logger.info("Extracting %d pages with %d workers", total_pages, workers)
+        pages = list(range(total_pages))
+        # with a previous version, fingerprint only as far ahead as the pages about to be extracted
+        window = settings.extract_chunk_pages * (workers if parallel else 1)
+        windows = [pages] if previous is None else _chunks(pages, window)
+        reused_count = 0
+        for numbers in windows:
+            fingerprints: Dict[int, str] = {}
+            reused: Dict[int, PageExtraction] = {}
+            if previous is not None:
+                fingerprints = dict(zip(numbers, _fingerprint_pages(pdf_path, doc, numbers, fingerprinter)))
+                for number, fingerprint in fingerprints.items():
+                    product = previous.match(fingerprint)
+                    if product is None:
+                        continue
+                    extracted = _reuse_page(doc[number], previous, product, job_id, upload_dir, options)
+                    if extracted is not None:
+                        reused[number] = extracted
+                reused_count += len(reused)
+            changed = [number for number in numbers if number not in reused]
+
+            if parallel:
+                extracted_pages = _iter_parallel(
+                    pdf_path, job_id, upload_dir, changed, workers, options, fingerprint=previous is None
+                )
+            else:
+                extracted_pages = _iter_sequential(
+                    doc, job_id, upload_dir, changed, options, registry, fingerprinter if previous is None else None
+                )
+
+            for number in numbers:
+                extracted = reused.get(number) or next(extracted_pages)
+                extracted.pages_total = total_pages
+                extracted.fingerprint = fingerprints.get(number, extracted.fingerprint)
+                _record_page_metrics(extracted)
+                yield extracted
+        if previous is not None:
+            logger.info("Reused %d of %d pages from job %s", reused_count, total_pages, previous.job_id)
+    finally:
+        doc.close()
+
+
+def extract_from_pdf(
+    pdf_path: Path, job_id: str, progress: Optional[ProgressCallback] = None, isolate: bool = False
+) -> ExtractionResult:
+    """Extract text, embedded images and page previews for every page.
+
+    ``progress`` is called as ``progress(pages_done, pages_total)`` after each page; ``isolate``
+    is passed on to ``iter_pages``.
+    """
+
     text_blocks: List[Tuple[int, str]] = []
     page_images: Dict[int, List[str]] = {}
     page_previews: Dict[int, str] = {}
+    page_thumbnails: Dict[int, str] = {}
+    page_srcsets: Dict[int, str] = {}
 
-    for page in doc:
-        page_number = page.number + 1
-        text = (page.get_text("text") or "").strip()
-        text_blocks.append((page_number, text))
-        images = export_page_images(page, job_id, upload_dir)
-        if images:
-            page_images[page_number] = [img.web_path for img in images]
-        preview = render_page_preview(
-            page,
-            job_id,
-            upload_dir,
-            scale=settings.render_scale,
-            fmt=settings.render_format,
-        )
-        page_previews[page_number] = preview.web_path
+    for extracted in iter_pages(pdf_path, job_id, isolate=isolate):
+        text_blocks.append((extracted.page_number, extracted.text))
+        if extracted.image_paths:
+            page_images[extracted.page_number] = extracted.image_paths
+        page_previews[extracted.page_number] = extracted.preview_path
+        if extracted.thumbnail_path:
+            page_thumbnails[extracted.page_number] = extracted.thumbnail_path
+        if extracted.preview_srcset:
+            page_srcsets[extracted.page_number] = extracted.preview_srcset
+        if progress is not None:
+            progress(len(text_blocks), extracted.pages_total)
 
     logger.info(
         "Extracted %d pages of text and %d pages with images",
@@ -57,5 +461,11 @@ def extract_from_pdf(pdf_path: Path, job_id: str) -> ExtractionResult:
         len(page_images),
     )
     return ExtractionResult(
-        text_blocks=text_blocks, page_images=page_images, page_previews=page_previews, job_id=job_id
+        text_blocks=text_blocks,
+        page_images=page_images,
+        page_previews=page_previews,
+        job_id=job_id,
+        page_thumbnails=page_thumbnails,
+        page_srcsets=page_srcsets,
     )
+
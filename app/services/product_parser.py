@@ -2,48 +2,199 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Dict, List, Optional, Sequence, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 from app.models import Product
 
 logger = logging.getLogger(__name__)
 
+# a digit group is comma-grouped thousands, space-grouped thousands (plain, no-break or narrow
+# no-break space) or a plain run, never a mix, so a match cannot backtrack across separators;
+# the lookbehind keeps SKUs and model numbers out
+AMOUNT = (
+    r"(?:[0-9]{1,3}(?:,[0-9]{3})+|[0-9]{1,3}(?:[ \u00a0\u202f][0-9]{3})+|[0-9]+)"
+    r"(?:\.[0-9]{1,2})?(?![0-9]|[.,][0-9])"
+)
+THOUSANDS_SEPARATORS = re.compile(r"[, \u00a0\u202f]")
 PRICE_PATTERN = re.compile(
-    r"(?i)(?:rs\.?|inr|₹|¥|円|usd|eur|cad|aud|\$|€)?\s*([0-9]+(?:[, ]?[0-9]{3})*(?:\.[0-9]{1,2})?)"
+    r"(?i)(?<![A-Za-z0-9_.,-])"
+    r"(?:(?P<prefix>rs\.?|inr|usd|eur|gbp|cad|aud|jpy|₹|¥|￥|\$|€|£)[ \t]?)?"
+    rf"(?P<amount>{AMOUNT})"
+    r"(?:[ \t]?(?P<suffix>円|yen|jpy|usd|eur|inr|/-))?"
 )
+PRICE_KEYWORDS = re.compile(r"(?i)price|mrp|cost|価格|値段|税込|税抜|售价|价格")
+SPEC_SEPARATOR = re.compile(r"[:：]")
+
+CURRENCY_CODES = {
+    "rs": "INR",
+    "rs.": "INR",
+    "inr": "INR",
+    "₹": "INR",
+    "/-": "INR",
+    "usd": "USD",
+    "$": "USD",
+    "eur": "EUR",
+    "€": "EUR",
+    "gbp": "GBP",
+    "£": "GBP",
+    "cad": "CAD",
+    "aud": "AUD",
+    "jpy": "JPY",
+    "yen": "JPY",
+    "¥": "JPY",
+    "￥": "JPY",
+    "円": "JPY",
+}
+MAX_PRICE_CONTEXT_CHARS = 120
+
+
+class Price(NamedTuple):
+    text: str
+    value: float
+    currency: Optional[str]
+    context: str
+
+
+class PageScan(NamedTuple):
+    lines: List[str]
+    prices: List[Price]
+    specs: List[Tuple[str, str]]
+
+    @property
+    def best_price(self) -> Optional[Price]:
+        return self.prices[0] if self.prices else None
+
+
+def _amount_value(match: re.Match) -> float:
+    return float(THOUSANDS_SEPARATORS.sub("", match.group("amount")))
+
+
+def _price_from_match(match: re.Match, line: str) -> Price:
+    symbol = (match.group("prefix") or match.group("suffix") or "").casefold()
+    return Price(
+        text=match.group(0).strip(),
+        value=_amount_value(match),
+        currency=CURRENCY_CODES.get(symbol),
+        context=line[:MAX_PRICE_CONTEXT_CHARS],
+    )
+
+
+def _scan_line(line: str, priced: List[Price], keyed: List[Price], specs: List[Tuple[str, str]]) -> None:
+    has_keyword = None
+    for match in PRICE_PATTERN.finditer(line):
+        if match.group("prefix") or match.group("suffix"):
+            priced.append(_price_from_match(match, line))
+        else:
+            if has_keyword is None:
+                has_keyword = PRICE_KEYWORDS.search(line) is not None
+            if has_keyword:
+                keyed.append(_price_from_match(match, line))
 
+    separator = SPEC_SEPARATOR.search(line)
+    if separator:
+        key = line[: separator.start()].strip()
+        value = line[separator.end() :].strip()
+        if key and value and not value.startswith("//"):
+            specs.append((key, value))
 
-def extract_price(text: str) -> Optional[str]:
-    match = PRICE_PATTERN.search(text)
-    if match:
-        return match.group(0).strip()
-    return None
 
+def scan_text(text: str) -> PageScan:
+    """Find lines, price candidates and ``key: value`` specs in a single pass over ``text``.
 
-def _extract_lines(text: str) -> List[str]:
-    lines = [line.strip() for line in text.splitlines() if line.strip()]
-    logger.debug("Split text into %d lines", len(lines))
-    return lines
+    Prices carrying a currency come first, in reading order, followed by bare amounts on
+    lines that mention a price; other numbers (SKUs, page numbers, sizes) are ignored.
+    """
 
-
-def _extract_specs(lines: Sequence[str]) -> List[Tuple[str, str]]:
+    lines: List[str] = []
+    priced: List[Price] = []
+    keyed: List[Price] = []
     specs: List[Tuple[str, str]] = []
-    for line in lines:
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip()
-            value = value.strip()
-            if key and value:
-                specs.append((key, value))
-    return specs
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        lines.append(line)
+        _scan_line(line, priced, keyed, specs)
+    logger.debug("Scanned %d lines, %d price candidates", len(lines), len(priced) + len(keyed))
+    return PageScan(lines, priced + keyed, specs)
 
 
-def parse_products(
-    text_blocks: Sequence[Union[str, Tuple[int, str]]],
+def extract_price(text: str) -> Optional[str]:
+    price = scan_text(text).best_price
+    return price.text if price else None
+
+
+def price_value(price: Optional[str]) -> Optional[float]:
+    """Numeric value of an extracted price string, ignoring currency and thousands separators."""
+
+    if not price:
+        return None
+    match = PRICE_PATTERN.search(price)
+    if not match:
+        return None
+    return _amount_value(match)
+
+
+def product_price_value(product: Product) -> Optional[float]:
+    """Parsed price of ``product``; records saved before ``price_value`` existed are parsed from ``price``."""
+
+    if product.price_value is not None:
+        return product.price_value
+    return price_value(product.price)
+
+
+def parse_page(
+    page_number: int,
+    text: str,
+    embedded_images: Optional[List[str]] = None,
+    page_preview_url: Optional[str] = None,
+    thumbnail_url: Optional[str] = None,
+    srcset: Optional[str] = None,
+) -> Optional[Product]:
+    """Build the product for a single page, or ``None`` when the page has no image to show."""
+
+    scan = scan_text(text)
+    name = scan.lines[0] if scan.lines else f"Page {page_number}"
+    description = text.strip()
+    price = scan.best_price
+    embedded_images = embedded_images or None
+    page_image_url = page_preview_url or (embedded_images[0] if embedded_images else None)
+    specs = scan.specs
+
+    if not page_image_url:
+        logger.warning("Missing page render for page %s", page_number)
+        return None
+
+    return Product(
+        name=name or f"Page {page_number}",
+        description=description or "",
+        page_number=page_number,
+        page_image_url=page_image_url,
+        extracted_text=description or None,
+        price=price.text if price else None,
+        price_value=price.value if price else None,
+        price_text=price.context if price else None,
+        currency=price.currency if price else None,
+        image_url=page_image_url,
+        page_preview_url=page_preview_url,
+        specs=specs or None,
+        embedded_images=embedded_images,
+        thumbnail_url=thumbnail_url,
+        srcset=srcset,
+    )
+
+
+def iter_products(
+    text_blocks: Iterable[Union[str, Tuple[int, str]]],
     page_images: Dict[int, List[str]],
     page_previews: Dict[int, str],
-) -> List[Product]:
-    products: List[Product] = []
+    page_thumbnails: Optional[Dict[int, str]] = None,
+    page_srcsets: Optional[Dict[int, str]] = None,
+) -> Iterator[Product]:
+    """Yield products page by page; ``text_blocks`` may be a lazy stream."""
+
+    page_thumbnails = page_thumbnails or {}
+    page_srcsets = page_srcsets or {}
 
     for idx, block in enumerate(text_blocks):
         if isinstance(block, tuple):
@@ -51,40 +202,39 @@ def parse_products(
         else:
             page_number, text = idx + 1, block
 
-        lines = _extract_lines(text)
-        name = lines[0] if lines else f"Page {page_number}"
-        description = text.strip()
-        price = extract_price(text)
-        embedded_images = page_images.get(page_number, []) or None
-        page_preview_url = page_previews.get(page_number)
-        page_image_url = page_preview_url or (embedded_images[0] if embedded_images else None)
-        specs = _extract_specs(lines)
-
-        if not page_image_url:
-            logger.warning("Missing page render for page %s", page_number)
-            continue
-
-        products.append(
-            Product(
-                name=name or f"Page {page_number}",
-                description=description or "",
-                page_number=page_number,
-                page_image_url=page_image_url,
-                extracted_text=description or None,
-                price=price,
-                image_url=page_image_url,
-                page_preview_url=page_preview_url,
-                specs=specs or None,
-                embedded_images=embedded_images,
-            )
+        product = parse_page(
+            page_number,
+            text,
+            page_images.get(page_number),
+            page_previews.get(page_number),
+            thumbnail_url=page_thumbnails.get(page_number),
+            srcset=page_srcsets.get(page_number),
         )
+        if product is not None:
+            yield product
 
+
+def parse_products(
+    text_blocks: Sequence[Union[str, Tuple[int, str]]],
+    page_images: Dict[int, List[str]],
+    page_previews: Dict[int, str],
+    page_thumbnails: Optional[Dict[int, str]] = None,
+    page_srcsets: Optional[Dict[int, str]] = None,
+) -> List[Product]:
+    products = list(iter_products(text_blocks, page_images, page_previews, page_thumbnails, page_srcsets))
     logger.info("Parsed %d products", len(products))
     return products
 
 
 __all__ = [
     "PRICE_PATTERN",
+    "PageScan",
+    "Price",
     "extract_price",
+    "iter_products",
+    "parse_page",
     "parse_products",
+    "price_value",
+    "product_price_value",
+    "scan_text",
 ]
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import fitz  # PyMuPDF
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# page renders are RGB without alpha
+BYTES_PER_PIXEL = 3
+# encoding and pyramid shrinking keep about one more copy of the pixmap alive
+RENDER_OVERHEAD = 2
+
+
+def effective_scale(rect: fitz.Rect, scale: float, max_pixels: int) -> float:
+    """Largest scale up to ``scale`` at which ``rect`` renders to at most ``max_pixels`` pixels."""
+
+    pixels = rect.width * scale * rect.height * scale
+    if max_pixels <= 0 or pixels <= max_pixels:
+        return scale
+    return math.floor(scale * math.sqrt(max_pixels / pixels) * 1000) / 1000
+
+
+def render_cost(pixels: int) -> int:
+    return pixels * BYTES_PER_PIXEL * RENDER_OVERHEAD
+
+
+class RenderBudget:
+    """Byte-weighted semaphore bounding the memory held by concurrent page renders.
+
+    A render bigger than the whole budget still runs, but only once nothing else holds it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.waits = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        if self.max_bytes <= 0:
+            yield
+            return
+        nbytes = min(nbytes, self.max_bytes)
+        with self._condition:
+            if self.in_use + nbytes > self.max_bytes:
+                self.waits += 1
+                self._condition.wait_for(lambda: self.in_use + nbytes <= self.max_bytes)
+            self.in_use += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_use -= nbytes
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {"max_bytes": self.max_bytes, "in_use_bytes": self.in_use, "waits": self.waits}
+
+
+def _render_tiled(page: fitz.Page, matrix: fitz.Matrix, area: fitz.IRect, tile_pixels: int) -> fitz.Pixmap:
+    """Rasterize ``page`` in horizontal bands of at most ``tile_pixels`` into one pixmap.
+
+    Each band is drawn from a shared display list with a clip rectangle, so MuPDF's scratch
+    buffers (transparency groups, soft masks) are sized to the band rather than the page.
+    """
+
+    target = fitz.Pixmap(fitz.csRGB, area, False)
+    display_list = page.get_displaylist()
+    band_height = max(1, tile_pixels // max(1, area.width))
+    inverse = ~matrix
+    for top in range(area.y0, area.y1, band_height):
+        band = fitz.IRect(area.x0, top, area.x1, min(top + band_height, area.y1))
+        tile = display_list.get_pixmap(matrix=matrix, clip=fitz.Rect(band) * inverse, alpha=False)
+        target.copy(tile, band)
+        tile = None
+    return target
+
+
+@contextmanager
+def rasterize(
+    page: fitz.Page,
+    scale: float,
+    max_pixels: Optional[int] = None,
+    tile_pixels: Optional[int] = None,
+    budget: Optional[RenderBudget] = None,
+) -> Iterator[fitz.Pixmap]:
+    """Render ``page`` within the pixel and memory budgets and hold the reservation while in use.
+
+    The scale is lowered when the page would exceed ``max_pixels``; pages larger than
+    ``tile_pixels`` are drawn in bands.
+    """
+
+    max_pixels = settings.render_max_pixels if max_pixels is None else max_pixels
+    tile_pixels = settings.render_tile_pixels if tile_pixels is None else tile_pixels
+    budget = budget or render_budget
+    effective = effective_scale(page.rect, scale, max_pixels)
+    if effective < scale:
+        logger.info("Page %s rendered at %sx instead of %sx to stay within %s pixels",
+                    page.number + 1, effective, scale, max_pixels)
+    matrix = fitz.Matrix(effective, effective)
+    area = (page.rect * matrix).round()
+    pixels = area.width * area.height
+    with budget.reserve(render_cost(pixels)):
+        if tile_pixels > 0 and pixels > tile_pixels:
+            pix = _render_tiled(page, matrix, area, tile_pixels)
+        else:
+            pix = page.get_pixmap(matrix=matrix, alpha=False)
+        try:
+            yield pix
+        finally:
+            pix = None
+
+
+render_budget = RenderBudget(settings.render_memory_mb * 1024 * 1024)
+metrics.RENDER_BYTES_RESERVED.set_function(lambda: render_budget.in_use)
+
+
+__all__ = ["RenderBudget", "effective_scale", "rasterize", "render_budget", "render_cost"]
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from app import metrics
+from app.config import settings
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+# directories that ship with the tree (e.g. data/extracted/tmp) rather than belong to a job
+RESERVED_DIR_NAMES = frozenset({"tmp"})
+
+
+@dataclass
+class JobUsage:
+    job_id: str
+    size_bytes: int
+    last_access: float
+
+
+@dataclass
+class SweepResult:
+    evicted: List[str]
+    reclaimed_bytes: int
+    remaining_bytes: int
+    duration_seconds: float
+
+
+def _job_id_for(entry: Path, in_tmp_dir: bool) -> Optional[str]:
+    if entry.name.startswith("."):
+        return None
+    if in_tmp_dir:
+        if not entry.is_file() or "_" not in entry.name:
+            return None
+        job_id = entry.name.split("_", 1)[0]
+    else:
+        if not entry.is_dir() or entry.name in RESERVED_DIR_NAMES:
+            return None
+        job_id = entry.name
+    return job_id if storage.JOB_ID_PATTERN.fullmatch(job_id) else None
+
+
+class RetentionSweeper:
+    """Keep job artifacts in the tmp, extracted and upload directories within age and size bounds.
+
+    Jobs are evicted least recently accessed first. Pinned jobs (still processing or being
+    served) and jobs accessed within ``min_idle_seconds`` are never evicted.
+    """
+
+    def __init__(
+        self,
+        max_age_seconds: float,
+        max_bytes: int,
+        interval_seconds: float,
+        min_idle_seconds: float,
+    ):
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.interval_seconds = interval_seconds
+        self.min_idle_seconds = min_idle_seconds
+        self.sweeps = 0
+        self.jobs_evicted = 0
+        self.bytes_reclaimed = 0
+        self.last_sweep: Optional[Dict[str, Any]] = None
+        self._access: Dict[str, float] = {}
+        self._pins: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._eviction_listeners: List[Callable[[str], None]] = []
+        self._pin_checks: List[Callable[[str], bool]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        self._eviction_listeners.append(listener)
+
+    def add_pin_check(self, check: Callable[[str], bool]) -> None:
+        """Also treat jobs as pinned while ``check(job_id)`` is true, e.g. jobs held by another process."""
+
+        self._pin_checks.append(check)
+
+    def touch(self, job_id: str) -> None:
+        """Record an access to ``job_id``; ids without files on disk (typos, probes) are ignored."""
+
+        if not storage.job_exists(job_id):
+            return
+        with self._lock:
+            self._access[job_id] = time.time()
+
+    def pin(self, job_id: str) -> None:
+        with self._lock:
+            self._pins[job_id] += 1
+
+    def unpin(self, job_id: str) -> None:
+        """Release a pin; the end of a request or extraction counts as an access."""
+
+        with self._lock:
+            self._pins[job_id] -= 1
+            if self._pins[job_id] <= 0:
+                del self._pins[job_id]
+        self.touch(job_id)
+
+    @contextmanager
+    def pinned(self, job_id: str) -> Iterator[None]:
+        self.pin(job_id)
+        try:
+            yield
+        finally:
+            self.unpin(job_id)
+
+    def is_pinned(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._pins:
+                return True
+        return any(check(job_id) for check in self._pin_checks)
+
+    def usage(self) -> List[JobUsage]:
+        """Size and last access of every job with files on disk."""
+
+        sizes: Dict[str, int] = {}
+        modified: Dict[str, float] = {}
+        roots = [
+            (settings.tmp_dir, True),
+            (settings.extracted_dir, False),
+            (settings.upload_static_dir, False),
+        ]
+        for root, in_tmp_dir in roots:
+            if not root.is_dir():
+                continue
+            for entry in root.iterdir():
+                job_id = _job_id_for(entry, in_tmp_dir)
+                # a configured directory may sit inside another one, e.g. TMP_DIR=data/extracted/tmp
+                if job_id is None or any(entry == other for other, _ in roots):
+                    continue
+                try:
+                    size = entry.stat().st_size if in_tmp_dir else storage.directory_size(entry)
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue  # removed while scanning
+                sizes[job_id] = sizes.get(job_id, 0) + size
+                modified[job_id] = max(modified.get(job_id, 0.0), mtime)
+
+        with self._lock:
+            access = dict(self._access)
+        return [
+            JobUsage(job_id, size, max(modified[job_id], access.get(job_id, 0.0)))
+            for job_id, size in sizes.items()
+        ]
+
+    def sweep(self, now: Optional[float] = None) -> SweepResult:
+        """Evict expired jobs, then least recently accessed ones until under ``max_bytes``."""
+
+        with self._sweep_lock:
+            started = time.perf_counter()
+            now = time.time() if now is None else now
+            jobs = sorted(self.usage(), key=lambda usage: usage.last_access)
+            self._forget_missing({usage.job_id for usage in jobs})
+            total = sum(usage.size_bytes for usage in jobs)
+            evicted: List[str] = []
+            reclaimed = 0
+            for usage in jobs:
+                expired = self.max_age_seconds > 0 and now - usage.last_access > self.max_age_seconds
+                over_budget = self.max_bytes > 0 and total > self.max_bytes
+                if not (expired or over_budget):
+                    continue
+                if now - usage.last_access < self.min_idle_seconds or self.is_pinned(usage.job_id):
+                    continue
+                self._evict(usage.job_id)
+                evicted.append(usage.job_id)
+                reclaimed += usage.size_bytes
+                total -= usage.size_bytes
+
+            result = SweepResult(evicted, reclaimed, total, time.perf_counter() - started)
+            self._record(result, now)
+            return result
+
+    def _forget_missing(self, present: Set[str]) -> None:
+        """Drop recorded accesses of jobs whose files are gone, so only jobs on disk are tracked."""
+
+        with self._lock:
+            for job_id in [job_id for job_id in self._access if job_id not in present and job_id not in self._pins]:
+                del self._access[job_id]
+
+    def _evict(self, job_id: str) -> None:
+        logger.info("Retention evicting job %s", job_id)
+        storage.cleanup_job(job_id)
+        storage.remove_upload(job_id)
+        with self._lock:
+            self._access.pop(job_id, None)
+        for listener in self._eviction_listeners:
+            try:
+                listener(job_id)
+            except Exception:
+                logger.warning("Eviction listener failed for job %s", job_id, exc_info=True)
+
+    def _record(self, result: SweepResult, now: float) -> None:
+        self.sweeps += 1
+        self.jobs_evicted += len(result.evicted)
+        self.bytes_reclaimed += result.reclaimed_bytes
+        self.last_sweep = {
+            "at": now,
+            "duration_seconds": round(result.duration_seconds, 4),
+            "evicted": len(result.evicted),
+            "reclaimed_bytes": result.reclaimed_bytes,
+            "remaining_bytes": result.remaining_bytes,
+        }
+        metrics.RETENTION_SWEEP_SECONDS.observe(result.duration_seconds)
+        metrics.RETENTION_RECLAIMED_BYTES.inc(result.reclaimed_bytes)
+        if result.evicted:
+            logger.info(
+                "Retention sweep evicted %d jobs, reclaimed %d bytes in %.2fs",
+                len(result.evicted),
+                result.reclaimed_bytes,
+                result.duration_seconds,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pinned = len(self._pins)
+            tracked = len(self._access)
+        return {
+            "max_age_seconds": self.max_age_seconds,
+            "max_bytes": self.max_bytes,
+            "interval_seconds": self.interval_seconds,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "pinned_jobs": pinned,
+            "tracked_jobs": tracked,
+            "sweeps": self.sweeps,
+            "jobs_evicted": self.jobs_evicted,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "last_sweep": self.last_sweep,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="retention-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Retention sweep failed")
+
+
+sweeper = RetentionSweeper(
+    max_age_seconds=settings.retention_max_age_hours * 3600,
+    max_bytes=settings.retention_max_mb * 1024 * 1024,
+    interval_seconds=settings.retention_interval_seconds,
+    min_idle_seconds=settings.retention_min_idle_seconds,
+)
+
+
+__all__ = ["JobUsage", "RetentionSweeper", "SweepResult", "sweeper"]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+from app.models import Product
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+REFERENCE = re.compile(r"(?<![\d.])(\d+)\s+\d+\s+R\b")
+# back-pointers and bookkeeping that change when a page is moved or the file is re-saved
+IGNORED_ENTRIES = re.compile(
+    r"/(?:Parent|P|Popup)\s+\d+\s+\d+\s+R\b|/StructParents?\s+\d+|/LastModified\s*\([^)]*\)"
+)
+
+
+class Fingerprinter:
+    """Hash pages by what they draw: content streams, resources, annotations and geometry.
+
+    Object references are replaced by the digest of the referenced object, so fingerprints
+    survive the object renumbering that comes with re-saving a revised catalog. References
+    to other pages (link destinations) are not followed.
+    """
+
+    def __init__(self, doc: fitz.Document):
+        self.doc = doc
+        self._digests: Dict[int, str] = {}
+        self._pages = {doc.page_xref(number) for number in range(doc.page_count)}
+
+    def page(self, page: fitz.Page) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{tuple(page.rect)}|{page.rotation}|".encode())
+        digest.update(self._expand(self.doc.xref_object(page.xref, compressed=True)).encode())
+        digest.update(self._inherited_resources(page.xref).encode())
+        return digest.hexdigest()[:32]
+
+    def _object(self, xref: int) -> str:
+        if xref in self._pages:
+            return "page"
+        cached = self._digests.get(xref)
+        if cached is not None:
+            return cached
+        self._digests[xref] = "cycle"
+        digest = hashlib.sha256(self._expand(self.doc.xref_object(xref, compressed=True)).encode())
+        if self.doc.xref_is_stream(xref):
+            digest.update(hashlib.sha256(self.doc.xref_stream_raw(xref) or b"").digest())
+        self._digests[xref] = digest.hexdigest()[:32]
+        return self._digests[xref]
+
+    def _expand(self, source: str) -> str:
+        source = IGNORED_ENTRIES.sub("", source)
+        return REFERENCE.sub(lambda match: f"<{self._object(int(match.group(1)))}>", source)
+
+    def _inherited_resources(self, xref: int) -> str:
+        """Resources a page inherits from the page tree when it has none of its own."""
+
+        if self.doc.xref_get_key(xref, "Resources")[0] != "null":
+            return ""
+        seen = set()
+        while xref not in seen:
+            seen.add(xref)
+            kind, value = self.doc.xref_get_key(xref, "Parent")
+            if kind != "xref":
+                return ""
+            xref = int(value.split()[0])
+            kind, value = self.doc.xref_get_key(xref, "Resources")
+            if kind != "null":
+                return self._expand(value)
+        return ""
+
+
+def page_fingerprints(doc: fitz.Document) -> List[str]:
+    fingerprinter = Fingerprinter(doc)
+    return [fingerprinter.page(page) for page in doc]
+
+
+@dataclass
+class PreviousVersion:
+    """Page fingerprints and products of an earlier job that a revised catalog can reuse."""
+
+    job_id: str
+    fingerprints: List[str]
+    render_options: Dict[str, Any]
+    products: Dict[int, Product]
+    _pages: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._pages = {}
+        for number, fingerprint in enumerate(self.fingerprints, start=1):
+            self._pages.setdefault(fingerprint, number)
+
+    @classmethod
+    def load(cls, job_id: str) -> Optional["PreviousVersion"]:
+        record = storage.load_job_record(job_id)
+        if record is None or not record.get("page_fingerprints"):
+            return None
+        products = [Product.from_dict(item) for item in record.get("products", [])]
+        return cls(
+            job_id=job_id,
+            fingerprints=record["page_fingerprints"],
+            render_options=record.get("render_options") or {},
+            products={product.page_number: product for product in products},
+        )
+
+    def match(self, fingerprint: str) -> Optional[Product]:
+        """Product of the earlier page with the same fingerprint, wherever it sat in the document."""
+
+        number = self._pages.get(fingerprint)
+        return self.products.get(number) if number is not None else None
+
+
+__all__ = ["Fingerprinter", "PreviousVersion", "page_fingerprints"]
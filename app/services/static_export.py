@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import re
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from jinja2 import Environment
+
+from app.config import settings
+from app.models import Product
+from app.services import page_cache, retention
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TEMPLATE = "export.html"
+FILES_DIR = "files"
+STYLESHEET_PATH = "assets/app.css"
+# formats that are already compressed gain nothing from deflate
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".jp2", ".jpx"}
+READ_CHUNK_BYTES = 256 * 1024
+LAZY_PAGE_URL = re.compile(r"^/jobs/(?P<job_id>[A-Za-z0-9_-]+)/pages/(?P<page>\d+)\.(?P<fmt>\w+)(?:\?scale=(?P<scale>[0-9.]+))?$")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file object that collects whatever ``zipfile`` writes until it is drained."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class ExportPlan:
+    """Maps a job's artifact URLs to paths inside the archive and records which files to copy."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.files: Dict[str, Tuple[str, Any]] = {}
+        self._prefix = f"/static/uploads/{job_id}/"
+
+    def local(self, url: Optional[str]) -> Optional[str]:
+        """Relative archive path for ``url``, or ``url`` unchanged when it is not a job artifact."""
+
+        if not url:
+            return url
+        if url.startswith(self._prefix):
+            relative = url[len(self._prefix) :]
+            arcname = f"{FILES_DIR}/{relative}"
+            self.files.setdefault(arcname, ("file", settings.upload_static_dir / self.job_id / relative))
+            return arcname
+        match = LAZY_PAGE_URL.match(url)
+        if match and match.group("job_id") == self.job_id:
+            scale = page_cache.snap_scale(float(match.group("scale")) if match.group("scale") else None)
+            fmt = page_cache.normalize_format(match.group("fmt"))
+            page_number = int(match.group("page"))
+            path = page_cache.page_render_path(self.job_id, page_number, scale, fmt)
+            arcname = f"{FILES_DIR}/{path.relative_to(settings.upload_static_dir / self.job_id).as_posix()}"
+            self.files.setdefault(arcname, ("page", (page_number, scale, fmt)))
+            return arcname
+        return url
+
+    def local_srcset(self, srcset: Optional[str]) -> Optional[str]:
+        if not srcset:
+            return srcset
+        entries = []
+        for entry in srcset.split(","):
+            url, _, descriptor = entry.strip().partition(" ")
+            entries.append(f"{self.local(url)} {descriptor}".strip())
+        return ", ".join(entries)
+
+    def product(self, product: Product) -> Dict[str, Any]:
+        item = product.to_dict()
+        for key in ("page_image_url", "image_url", "page_preview_url", "thumbnail_url"):
+            item[key] = self.local(item[key])
+        item["embedded_images"] = [self.local(url) for url in product.embedded_images or []]
+        item["srcset"] = self.local_srcset(product.srcset)
+        return item
+
+    def resolve(self, arcname: str) -> Optional[Path]:
+        kind, target = self.files[arcname]
+        if kind == "file":
+            return target if target.is_file() else None
+        page_number, scale, fmt = target
+        try:
+            return page_cache.renderer.render(self.job_id, page_number, scale, fmt)
+        except page_cache.PageNotFound:
+            return None
+
+
+def _zip_info(arcname: str, size: int, mtime: float) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime)[:6])
+    info.compress_type = zipfile.ZIP_STORED if Path(arcname).suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+    info.file_size = size  # lets zipfile choose zip64 up front for large entries
+    return info
+
+
+def _flush(sink: _ChunkSink) -> Iterator[bytes]:
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _write_bytes(archive: zipfile.ZipFile, arcname: str, data: bytes) -> None:
+    with archive.open(_zip_info(arcname, len(data), time.time()), "w") as dest:
+        dest.write(data)
+
+
+def stream_export(
+    env: Environment, job_id: str, filename: str, products: List[Product]
+) -> Iterator[bytes]:
+    """Yield a ZIP holding a self-contained gallery of the job, one bounded chunk at a time.
+
+    Nothing is staged on disk or held in memory beyond one read chunk. Pages that were never
+    rendered in lazy mode are rendered as they are reached.
+    """
+
+    with retention.sweeper.pinned(job_id):
+        plan = ExportPlan(job_id)
+        items = [plan.product(product) for product in products]
+        html = env.get_template(EXPORT_TEMPLATE).render(
+            products=items, filename=filename, stylesheet=STYLESHEET_PATH, job_id=job_id
+        )
+
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            _write_bytes(archive, "index.html", html.encode("utf-8"))
+            _write_bytes(archive, "catalog.json", json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8"))
+            stylesheet = settings.static_dir / "css" / "app.css"
+            if stylesheet.is_file():
+                _write_bytes(archive, STYLESHEET_PATH, stylesheet.read_bytes())
+            yield from _flush(sink)
+
+            for arcname in sorted(plan.files):
+                path = plan.resolve(arcname)
+                if path is None:
+                    logger.warning("Skipping missing export file %s for job %s", arcname, job_id)
+                    continue
+                stat_result = path.stat()
+                with path.open("rb") as source, archive.open(
+                    _zip_info(arcname, stat_result.st_size, stat_result.st_mtime), "w"
+                ) as dest:
+                    while chunk := source.read(READ_CHUNK_BYTES):
+                        dest.write(chunk)
+                        yield from _flush(sink)
+                yield from _flush(sink)
+        yield from _flush(sink)
+
+
+__all__ = ["ExportPlan", "stream_export"]
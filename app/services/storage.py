@@ -1,26 +1,74 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import re
 import shutil
 import uuid
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
 
 from app.config import settings
 
+JOB_RECORD_NAME = "job.json"
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+# tmp files of an upload session that has not been finalized yet are named "<job_id>_~..."
+SESSION_FILE_MARKER = "~"
+
 
 def ensure_directories() -> None:
     for path in [settings.tmp_dir, settings.extracted_dir, settings.upload_static_dir]:
         path.mkdir(parents=True, exist_ok=True)
 
 
+class UploadTooLarge(ValueError):
+    """Raised when an upload grows past its size limit."""
+
+
+def upload_name(filename: str) -> str:
+    return Path(filename).name.lstrip(SESSION_FILE_MARKER) or "upload.pdf"
+
+
+class UploadSpool:
+    """Write an upload to the tmp directory chunk by chunk, counting and hashing as it goes."""
+
+    def __init__(self, filename: str, max_bytes: Optional[int] = None):
+        ensure_directories()
+        self.job_id = uuid.uuid4().hex
+        safe_name = upload_name(filename)
+        self.path = settings.tmp_dir / f"{self.job_id}_{safe_name}"
+        self.size = 0
+        self.max_bytes = max_bytes
+        self._digest = hashlib.sha256()
+        self._handle = self.path.open("wb")
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes.")
+        self._digest.update(chunk)
+        self._handle.write(chunk)
+
+    def finish(self) -> Tuple[Path, str]:
+        self._handle.close()
+        return self.path, self.job_id
+
+    def discard(self) -> None:
+        self._handle.close()
+        self.path.unlink(missing_ok=True)
+
+
 def save_upload(file_bytes: bytes, filename: str) -> Tuple[Path, str]:
     """Save uploaded PDF to tmp directory and return path and job id."""
-    ensure_directories()
-    job_id = uuid.uuid4().hex
-    safe_name = Path(filename).name or "upload.pdf"
-    tmp_path = settings.tmp_dir / f"{job_id}_{safe_name}"
-    tmp_path.write_bytes(file_bytes)
-    return tmp_path, job_id
+    spool = UploadSpool(filename)
+    spool.write(file_bytes)
+    return spool.finish()
 
 
 def prepare_extraction_dirs(job_id: str) -> Tuple[Path, Path]:
@@ -33,6 +81,76 @@ def prepare_extraction_dirs(job_id: str) -> Tuple[Path, Path]:
     return extraction_dir, upload_dir
 
 
+def find_upload(job_id: str) -> Optional[Path]:
+    """Return the stored source PDF for a job, if it is still present."""
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    session_prefix = f"{job_id}_{SESSION_FILE_MARKER}"
+    return next((path for path in settings.tmp_dir.glob(f"{job_id}_*") if not path.name.startswith(session_prefix)), None)
+
+
+def remove_upload(job_id: str) -> None:
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return
+    for path in settings.tmp_dir.glob(f"{job_id}_*"):
+        path.unlink(missing_ok=True)
+
+
+def save_job_record(job_id: str, record: Dict[str, Any]) -> Path:
+    """Persist a finished job (metadata and products) next to its extraction output."""
+    extraction_dir = settings.extracted_dir / job_id
+    extraction_dir.mkdir(parents=True, exist_ok=True)
+    record_path = extraction_dir / JOB_RECORD_NAME
+    tmp_path = record_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(record_path)
+    return record_path
+
+
+def has_job_record(job_id: str) -> bool:
+    return (settings.extracted_dir / Path(job_id).name / JOB_RECORD_NAME).is_file()
+
+
+def job_exists(job_id: str) -> bool:
+    """Whether the job has extraction output or artifacts on disk."""
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return False
+    return (settings.extracted_dir / job_id).is_dir() or (settings.upload_static_dir / job_id).is_dir()
+
+
+def load_job_record(job_id: str) -> Optional[Dict[str, Any]]:
+    record_path = settings.extracted_dir / Path(job_id).name / JOB_RECORD_NAME
+    try:
+        return json.loads(record_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def link_file(source: Path, target: Path) -> Path:
+    """Hard-link ``source`` to ``target``, copying when the two are on different filesystems."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        if not source.is_file():
+            raise
+        shutil.copy2(source, target)
+    return target
+
+
+def directory_size(path: Path) -> int:
+    if not path.exists():
+        return 0
+    return sum(entry.stat().st_size for entry in path.rglob("*") if entry.is_file())
+
+
+def job_size(job_id: str) -> int:
+    """Bytes on disk owned by a job across the extracted and upload directories."""
+    return directory_size(settings.extracted_dir / job_id) + directory_size(settings.upload_static_dir / job_id)
+
+
 def cleanup_job(job_id: str) -> None:
     extraction_dir = settings.extracted_dir / job_id
     upload_dir = settings.upload_static_dir / job_id
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+SESSION_NAME = f"{storage.SESSION_FILE_MARKER}session.json"
+DATA_NAME = f"{storage.SESSION_FILE_MARKER}data.part"
+CHUNK_PREFIX = f"{storage.SESSION_FILE_MARKER}chunk-"
+CHUNK_MARKER = re.compile(rf"{re.escape(CHUNK_PREFIX)}(\d+)")
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class SessionNotFound(LookupError):
+    """Raised for unknown, finalized or expired upload sessions."""
+
+
+class UploadIncomplete(ValueError):
+    """Raised when a session is finalized before all of its chunks have arrived."""
+
+    def __init__(self, missing: List[int]):
+        super().__init__(f"{len(missing)} chunks have not been uploaded yet.")
+        self.missing = missing
+
+
+def _normalize_sha256(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip().lower()
+    if not SHA256_PATTERN.fullmatch(value):
+        raise ValueError("Checksums must be hex-encoded SHA-256 digests.")
+    return value
+
+
+@dataclass
+class UploadSession:
+    """A large upload sent as numbered chunks, in any order and over as many requests as needed.
+
+    Chunks are written in place into one preallocated file under ``settings.tmp_dir``, and a
+    small marker file records the SHA-256 of each chunk once it has been written completely.
+    The session's files share the ``<upload_id>_`` prefix of a job's source PDF, so the
+    retention sweeper removes abandoned sessions like any other upload.
+    """
+
+    upload_id: str
+    filename: str
+    size: int
+    chunk_size: int
+    sha256: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def create(cls, filename: str, size: int, sha256: Optional[str] = None) -> "UploadSession":
+        if size <= 0:
+            raise ValueError("Uploaded file is empty.")
+        if size > settings.resumable_max_upload_bytes:
+            raise storage.UploadTooLarge(f"File exceeds maximum size of {settings.resumable_max_upload_mb} MB.")
+        storage.ensure_directories()
+        session = cls(
+            upload_id=uuid.uuid4().hex,
+            filename=storage.upload_name(filename),
+            size=size,
+            chunk_size=max(1, settings.resumable_chunk_bytes),
+            sha256=_normalize_sha256(sha256),
+        )
+        with session._path(DATA_NAME).open("wb") as handle:
+            handle.truncate(size)  # sparse until the chunks arrive
+        session._write_atomic(SESSION_NAME, json.dumps(asdict(session)))
+        return session
+
+    @classmethod
+    def load(cls, upload_id: str) -> "UploadSession":
+        if not storage.JOB_ID_PATTERN.fullmatch(upload_id):
+            raise SessionNotFound(upload_id)
+        try:
+            data = json.loads((settings.tmp_dir / f"{upload_id}_{SESSION_NAME}").read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise SessionNotFound(upload_id) from exc
+        return cls(**data)
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.size // self.chunk_size)
+
+    @property
+    def pdf_path(self) -> Path:
+        return self._path(self.filename)
+
+    def _path(self, name: str) -> Path:
+        return settings.tmp_dir / f"{self.upload_id}_{name}"
+
+    def _write_atomic(self, name: str, text: str) -> None:
+        tmp_path = self._path(f"{name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        tmp_path.replace(self._path(name))
+
+    def chunk_range(self, index: int) -> Tuple[int, int]:
+        """Offset and length of chunk ``index``; every chunk but the last is ``chunk_size`` long."""
+
+        if not 0 <= index < self.chunks:
+            raise ValueError(f"Chunk index must be between 0 and {self.chunks - 1}.")
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, self.size - offset)
+
+    def received(self) -> Dict[int, str]:
+        """Digest of every chunk that has been written completely, by index."""
+
+        chunks: Dict[int, str] = {}
+        for path in settings.tmp_dir.glob(f"{self.upload_id}_{CHUNK_PREFIX}*"):
+            match = CHUNK_MARKER.fullmatch(path.name[len(self.upload_id) + 1 :])
+            if match is None:
+                continue
+            try:
+                chunks[int(match.group(1))] = path.read_text(encoding="utf-8")
+            except OSError:
+                continue  # finalized or discarded while listing
+        return chunks
+
+    def status(self) -> Dict[str, Any]:
+        received = self.received()
+        ranges: List[List[int]] = []
+        for index in sorted(received):
+            offset, length = self.chunk_range(index)
+            if ranges and ranges[-1][1] == offset:
+                ranges[-1][1] = offset + length
+            else:
+                ranges.append([offset, offset + length])
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "sha256": self.sha256,
+            "chunk_size": self.chunk_size,
+            "chunks": self.chunks,
+            "bytes_received": sum(end - start for start, end in ranges),
+            "received_ranges": ranges,
+            "missing_chunks": [index for index in range(self.chunks) if index not in received],
+            "created_at": self.created_at,
+            "status_url": f"/uploads/{self.upload_id}",
+        }
+
+    def open_chunk(self, index: int, sha256: Optional[str] = None) -> "ChunkWriter":
+        return ChunkWriter(self, index, _normalize_sha256(sha256))
+
+    def assemble(self) -> Tuple[Path, str]:
+        """Move the completed data file into place as the job's source PDF and return it with its SHA-256.
+
+        The file is renamed, not copied. It is read once to compute the digest the extraction
+        cache is keyed by, since out-of-order chunks cannot be hashed as they arrive.
+        """
+
+        missing = self.status()["missing_chunks"]
+        if missing:
+            raise UploadIncomplete(missing)
+        data_path = self._path(DATA_NAME)
+        digest = hashlib.sha256()
+        try:
+            with data_path.open("rb") as handle:
+                while chunk := handle.read(HASH_CHUNK_BYTES):
+                    digest.update(chunk)
+        except FileNotFoundError as exc:
+            raise SessionNotFound(self.upload_id) from exc
+        if self.sha256 and digest.hexdigest() != self.sha256:
+            raise ValueError("The assembled file does not match the SHA-256 given when the upload was created.")
+        try:
+            os.replace(data_path, self.pdf_path)
+        except FileNotFoundError as exc:
+            raise SessionNotFound(self.upload_id) from exc  # finalized by a concurrent request
+        return self.pdf_path, digest.hexdigest()
+
+    def reopen(self) -> None:
+        """Undo ``assemble`` so the session can be finalized again later."""
+
+        os.replace(self.pdf_path, self._path(DATA_NAME))
+
+    def close(self) -> None:
+        """Remove the session bookkeeping, keeping the assembled PDF."""
+
+        for path in settings.tmp_dir.glob(f"{self.upload_id}_{storage.SESSION_FILE_MARKER}*"):
+            path.unlink(missing_ok=True)
+
+    def discard(self) -> None:
+        storage.remove_upload(self.upload_id)
+
+
+class ChunkWriter:
+    """Write one chunk at its offset as it streams in, hashing it on the way."""
+
+    def __init__(self, session: UploadSession, index: int, sha256: Optional[str] = None):
+        self.session = session
+        self.index = index
+        self.offset, self.length = session.chunk_range(index)
+        self.expected_sha256 = sha256
+        self.written = 0
+        self._digest = hashlib.sha256()
+        self._marker = f"{CHUNK_PREFIX}{index:06d}"
+        # a chunk sent again is missing until it has been written completely once more
+        session._path(self._marker).unlink(missing_ok=True)
+        try:
+            self._fd: Optional[int] = os.open(session._path(DATA_NAME), os.O_WRONLY)
+        except FileNotFoundError as exc:
+            raise SessionNotFound(session.upload_id) from exc
+
+    def write(self, data: bytes) -> None:
+        if self.written + len(data) > self.length:
+            self.close()
+            raise ValueError(f"Chunk {self.index} must be {self.length} bytes long.")
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self._fd, view, self.offset + self.written)
+            self.written += written
+            view = view[written:]
+        self._digest.update(data)
+
+    def finish(self) -> Dict[str, Any]:
+        """Record the chunk as received once its length and checksum are right."""
+
+        self.close()
+        if self.written != self.length:
+            raise ValueError(f"Chunk {self.index} must be {self.length} bytes long, got {self.written}.")
+        sha256 = self._digest.hexdigest()
+        if self.expected_sha256 and sha256 != self.expected_sha256:
+            raise ValueError(f"Chunk {self.index} does not match its SHA-256 checksum.")
+        self.session._write_atomic(self._marker, sha256)
+        return {"index": self.index, "offset": self.offset, "size": self.length, "sha256": sha256}
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+__all__ = ["ChunkWriter", "SessionNotFound", "UploadIncomplete", "UploadSession"]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+from app.config import settings
+from app.logging_conf import configure_logging
+from app.models import Product
+from app.services import job_queue, jobs, storage
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Claim jobs from the durable queue and run them through the extraction pipeline.
+
+    While a job runs, a heartbeat thread renews its lease, and each page's product and the
+    progress are published to the queue as soon as the page is parsed. Results are published
+    the same way the web process publishes them: ``job.json``, the catalog store and finally
+    the queue state. A worker that finds its lease taken over stops after the current page and
+    leaves the job to its new owner.
+    """
+
+    def __init__(
+        self,
+        queue: job_queue.JobQueue,
+        manager: jobs.JobManager,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        poll_seconds: Optional[float] = None,
+    ):
+        self.queue = queue
+        self.manager = manager
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds or settings.queue_lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.queue_heartbeat_seconds
+        self.poll_seconds = poll_seconds or settings.worker_poll_seconds
+        self.processed = 0
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self, burst: bool = False) -> int:
+        """Process jobs until stopped, or until the queue is empty when ``burst`` is set."""
+
+        logger.info("Worker %s waiting for jobs in %s", self.worker_id, self.queue.db_path)
+        while not self._stop.is_set():
+            if not self.run_once():
+                if burst:
+                    break
+                self._stop.wait(self.poll_seconds)
+        return self.processed
+
+    def run_once(self) -> bool:
+        """Claim and process one job; ``False`` when there was nothing to claim."""
+
+        queued = self.queue.claim(self.worker_id, self.lease_seconds)
+        if queued is None:
+            return False
+        logger.info("Worker %s processing job %s (attempt %d)", self.worker_id, queued.job_id, queued.attempts)
+        job = jobs.Job(
+            job_id=queued.job_id,
+            filename=queued.filename,
+            sha256=queued.sha256,
+            pages_total=queued.pages,
+            created_at=queued.enqueued_at,
+            previous_job_id=queued.previous_job_id,
+        )
+        done = threading.Event()
+        # set when the lease turns out to be lost; extraction then stops without touching the job's files
+        lost = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job, done, lost), name="worker-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        try:
+            self.manager.process(
+                job, Path(queued.pdf_path), on_page=lambda job, product: self._publish(job, product, lost), cancel=lost
+            )
+        finally:
+            done.set()
+            heartbeat.join()
+        if lost.is_set():
+            logger.warning("Worker %s abandoned job %s to its new owner", self.worker_id, job.job_id)
+        elif not self.queue.finish(job.job_id, self.worker_id, error=job.error if job.state == jobs.JOB_FAILED else None):
+            logger.warning("Worker %s lost the lease on job %s before finishing it", self.worker_id, job.job_id)
+        self.processed += 1
+        return True
+
+    def _publish(self, job: jobs.Job, product: Optional[Product], lost: threading.Event) -> None:
+        try:
+            owned = self.queue.publish(
+                job.job_id, self.worker_id, product.to_dict() if product else None, job.pages_done, job.pages_total
+            )
+        except Exception:
+            # the live stream misses this product; the job's record will still have it
+            logger.warning("Publishing page %d of job %s failed", job.pages_done, job.job_id, exc_info=True)
+            return
+        if not owned:
+            logger.warning("Job %s was handed to another worker", job.job_id)
+            lost.set()
+
+    def _heartbeat(self, job: jobs.Job, done: threading.Event, lost: threading.Event) -> None:
+        while not done.wait(self.heartbeat_seconds):
+            try:
+                owned = self.queue.heartbeat(job.job_id, self.worker_id, self.lease_seconds, job.pages_done, job.pages_total)
+            except Exception:
+                logger.warning("Heartbeat for job %s failed", job.job_id, exc_info=True)
+                continue
+            if not owned:
+                logger.warning("Job %s was handed to another worker", job.job_id)
+                lost.set()
+                return
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="Extract catalogs from the job queue.")
+    parser.add_argument("--worker-id", help="name recorded on claimed jobs (default: host-pid)")
+    parser.add_argument("--burst", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    storage.ensure_directories()
+    if settings.job_backend != "queue":
+        logger.warning("JOB_BACKEND is %r; the web app only hands jobs to workers with JOB_BACKEND=queue", settings.job_backend)
+    manager = jobs.manager if jobs.manager.queue is not None else jobs.JobManager(1, queue=job_queue.queue)
+    worker = Worker(job_queue.queue, manager, worker_id=args.worker_id)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        # finish the current job; if we are killed instead, its lease expires and it is retried
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run(burst=args.burst)
+    logger.info("Worker %s stopped after %d jobs", worker.worker_id, worker.processed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""Drive the web app with concurrent mixed traffic and report latency percentiles per endpoint.
+
+Usage::
+
+    python -m benchmarks.load                                    # in-process over an ASGI transport
+    python -m benchmarks.load --serve --workers 2                # against a uvicorn started for the run
+    python -m benchmarks.load --url http://127.0.0.1:8000        # against a server that is already up
+    python -m benchmarks.load --concurrency 32 --duration 30 --mix upload=1,results=4,image=8,health=2
+
+A few synthetic catalogs are uploaded and processed first, so results pages and images can be
+fetched. The timed run then picks endpoints at random by weight from ``--mix``. The report has
+throughput, p50/p95/p99 latency and error rate per endpoint. In-process runs also measure event
+loop lag, which shows blocking work done on the loop.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from benchmarks.run import isolated_env
+from benchmarks.synthetic import CatalogSpec, generate_catalog
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_OUTPUT = RESULTS_DIR / "load.json"
+DEFAULT_MIX = "upload=1,results=4,image=8,health=2"
+# status codes that count as success; anything else, or no response at all, is an error
+EXPECTED_STATUS = {
+    "upload": {202, 303},
+    "results": {200},
+    "image": {200},
+    "health": {200},
+}
+PERCENTILES = (0.5, 0.95, 0.99)
+POLL_SECONDS = 0.05
+JOB_TIMEOUT_SECONDS = 120
+SERVER_START_SECONDS = 30
+LAG_INTERVAL_SECONDS = 0.01
+PRODUCTS_LIMIT = 200
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    seconds: float
+    status: int  # 0 when the request failed without a response
+    ok: bool
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse ``name=weight,...``; endpoints left out are not requested."""
+
+    mix: Dict[str, float] = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in EXPECTED_STATUS:
+            raise ValueError(f"unknown endpoint {name!r}; choose from {', '.join(EXPECTED_STATUS)}")
+        mix[name] = float(weight) if weight.strip() else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("the mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted ``values``."""
+
+    if not values:
+        return 0.0
+    rank = min(max(1, math.ceil(len(values) * fraction)), len(values))
+    return values[rank - 1]
+
+
+def _latency_ms(values: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    summary = {f"p{round(fraction * 100)}": round(percentile(ordered, fraction) * 1000, 2) for fraction in PERCENTILES}
+    summary["mean"] = round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0
+    summary["max"] = round(ordered[-1] * 1000, 2) if ordered else 0.0
+    return summary
+
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles, error rate and status codes, in total and per endpoint."""
+
+    def group(selected: Sequence[Sample]) -> Dict[str, Any]:
+        errors = sum(1 for sample in selected if not sample.ok)
+        statuses: Dict[str, int] = {}
+        for sample in selected:
+            statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+        return {
+            "requests": len(selected),
+            "errors": errors,
+            "error_rate": round(errors / len(selected), 4) if selected else 0.0,
+            "requests_per_second": round(len(selected) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": _latency_ms([sample.seconds for sample in selected]),
+            "status_codes": dict(sorted(statuses.items())),
+        }
+
+    endpoints = sorted({sample.endpoint for sample in samples})
+    return {
+        "total": group(samples),
+        "endpoints": {name: group([sample for sample in samples if sample.endpoint == name]) for name in endpoints},
+    }
+
+
+class LoadRun:
+    """Mixed traffic against one client; ``seed`` must run first so there are jobs to read."""
+
+    def __init__(self, client: httpx.AsyncClient, catalogs: Sequence[Tuple[str, bytes]], mix: Dict[str, float], seed: int = 0):
+        self.client = client
+        self.catalogs = list(catalogs)
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.job_ids: List[str] = []
+        self.image_urls: List[str] = []
+        self._uploads = 0
+
+    async def seed(self) -> None:
+        """Upload every catalog, wait for it to be processed and collect its image URLs."""
+
+        for filename, pdf_bytes in self.catalogs:
+            response = await self._post_upload(filename, pdf_bytes)
+            if response.status_code not in EXPECTED_STATUS["upload"]:
+                raise RuntimeError(f"/upload answered {response.status_code} while seeding")
+            job_id = response.headers["location"].split("/")[2]
+            await self._wait_for(job_id)
+            self.job_ids.append(job_id)
+            products = (await self.client.get(f"/api/jobs/{job_id}/products", params={"limit": PRODUCTS_LIMIT})).json()
+            for item in products.get("items", []):
+                for key in ("image_url", "thumbnail_url", "page_image_url"):
+                    if item.get(key):
+                        self.image_urls.append(item[key])
+        if "image" in self.mix and not self.image_urls:
+            raise RuntimeError("the seeded catalogs have no images to fetch")
+
+    async def _wait_for(self, job_id: str) -> None:
+        deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+        while True:
+            response = await self.client.get(f"/jobs/{job_id}")
+            # with several server workers and the local backend, only the worker running the job
+            # knows it until job.json is written; the others answer 404 until then
+            status = response.json() if response.status_code == 200 else {}
+            if status.get("state") == "done":
+                return
+            if status.get("state") == "failed":
+                raise RuntimeError(f"seed job {job_id} failed: {status.get('error')}")
+            if response.status_code not in (200, 404):
+                raise RuntimeError(f"/jobs/{job_id} answered {response.status_code} while seeding")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"seed job {job_id} did not finish in {JOB_TIMEOUT_SECONDS}s")
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def _post_upload(self, filename: str, pdf_bytes: bytes) -> httpx.Response:
+        return await self.client.post("/upload", files={"file": (filename, pdf_bytes, "application/pdf")})
+
+    async def call(self, endpoint: str) -> Sample:
+        started = time.perf_counter()
+        try:
+            if endpoint == "upload":
+                filename, pdf_bytes = self.catalogs[self._uploads % len(self.catalogs)]
+                self._uploads += 1
+                response = await self._post_upload(filename, pdf_bytes)
+            elif endpoint == "results":
+                response = await self.client.get(f"/jobs/{self.rng.choice(self.job_ids)}/results")
+            elif endpoint == "image":
+                response = await self.client.get(self.rng.choice(self.image_urls))
+            else:
+                response = await self.client.get("/health")
+        except httpx.HTTPError:
+            return Sample(endpoint, time.perf_counter() - started, 0, False)
+        seconds = time.perf_counter() - started
+        return Sample(endpoint, seconds, response.status_code, response.status_code in EXPECTED_STATUS[endpoint])
+
+    async def run(self, concurrency: int, duration: float, max_requests: Optional[int] = None) -> Tuple[List[Sample], float]:
+        """Keep ``concurrency`` requests in flight until ``duration`` seconds or ``max_requests`` have passed."""
+
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        samples: List[Sample] = []
+        budget = [max_requests if max_requests is not None else -1]
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline and budget[0] != 0:
+                budget[0] -= 1
+                samples.append(await self.call(self.rng.choices(names, weights)[0]))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        return samples, time.perf_counter() - started
+
+
+async def _measure_loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    """Record how late a short sleep wakes up; long lags mean something blocked the event loop."""
+
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL_SECONDS)
+        lags.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL_SECONDS))
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    catalogs: Sequence[Tuple[str, bytes]],
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int] = None,
+    seed: int = 0,
+    track_loop_lag: bool = False,
+) -> Dict[str, Any]:
+    load = LoadRun(client, catalogs, mix, seed=seed)
+    await load.seed()
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_loop_lag(stop, lags)) if track_loop_lag else None
+    samples, elapsed = await load.run(concurrency, duration, max_requests)
+    stop.set()
+    if lag_task is not None:
+        await lag_task
+
+    report = summarize(samples, elapsed)
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["event_loop_lag_ms"] = _latency_ms(lags) if track_loop_lag else None
+    return report
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _serve(workers: int, env: Dict[str, str]) -> Iterator[str]:
+    """Start uvicorn on a free local port and yield its base URL."""
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **env, "LOG_LEVEL": "WARNING"},
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + SERVER_START_SECONDS
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {process.returncode}")
+            try:
+                if httpx.get(f"{url}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"uvicorn did not answer /health within {SERVER_START_SECONDS}s")
+            time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _run_against(base_url: Optional[str], catalogs, args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Any]:
+    if base_url is None:
+        from app.main import app
+
+        # per-request access logs would dominate the timing
+        logging.disable(logging.INFO)
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://load", timeout=args.timeout)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits)
+    async with client:
+        report = await run_load(
+            client,
+            catalogs,
+            mix,
+            args.concurrency,
+            args.duration,
+            max_requests=args.requests,
+            seed=args.seed,
+            track_loop_lag=base_url is None,
+        )
+    if base_url is None:
+        from app.services import jobs
+
+        # extractions started by the run must finish before their scratch directory is removed
+        await asyncio.to_thread(jobs.manager.shutdown)
+    return report
+
+
+def _format_row(name: str, result: Dict[str, Any]) -> str:
+    latency = result["latency_ms"]
+    return (
+        f"{name:<8} {result['requests']:>7} req {result['requests_per_second']:>9.1f} req/s"
+        f" p50 {latency['p50']:>8.1f} ms  p95 {latency['p95']:>8.1f} ms  p99 {latency['p99']:>8.1f} ms"
+        f"  errors {result['error_rate']:>6.1%}"
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="base URL of a running server (default: in-process)")
+    target.add_argument("--serve", action="store_true", help="start uvicorn on a free local port for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes with --serve")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of timed traffic")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights: " + ", ".join(EXPECTED_STATUS))
+    parser.add_argument("--catalogs", type=int, default=3, help="distinct generated PDFs")
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--images", type=int, default=CatalogSpec.images_per_page, help="embedded images per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    with tempfile.TemporaryDirectory(prefix="catalog-load-") as tmp:
+        workdir = Path(tmp)
+        specs = [
+            CatalogSpec(pages=args.pages, images_per_page=args.images, seed=args.seed + index)
+            for index in range(max(1, args.catalogs))
+        ]
+        catalogs = [
+            (f"load_{index}.pdf", generate_catalog(workdir / f"load_{index}.pdf", spec).read_bytes())
+            for index, spec in enumerate(specs)
+        ]
+        env = isolated_env(workdir)
+        if args.url:
+            mode, report = "url", asyncio.run(_run_against(args.url, catalogs, args, mix))
+        elif args.serve:
+            with _serve(max(1, args.workers), env) as url:
+                mode, report = "serve", asyncio.run(_run_against(url, catalogs, args, mix))
+        else:
+            # settings are read when app.main is imported, so point them at the scratch directory first
+            os.environ.update(env)
+            mode, report = "in-process", asyncio.run(_run_against(None, catalogs, args, mix))
+
+    for name, result in report["endpoints"].items():
+        print(_format_row(name, result))
+    print(_format_row("total", report["total"]))
+    if report["event_loop_lag_ms"]:
+        print(f"event loop lag p99 {report['event_loop_lag_ms']['p99']:.1f} ms, max {report['event_loop_lag_ms']['max']:.1f} ms")
+
+    payload = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mode": mode,
+        "target": args.url,
+        "workers": args.workers if args.serve else None,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "catalog": {**asdict(specs[0]), "count": len(specs)},
+        **report,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote {args.output}")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Micro-benchmark of the price and spec scanner in lines per second.
+
+Usage::
+
+    python -m benchmarks.parser --pages 5000 --output benchmarks/results/parser.json
+
+Besides realistic catalog text it times adversarial input (long digit and separator runs, as
+found in spec tables) that made the previous backtracking price pattern slow.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.product_parser import scan_text
+from benchmarks.synthetic import CatalogSpec, catalog_text
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "parser.json"
+
+
+def adversarial_text(pages: int) -> List[str]:
+    page = "\n".join(
+        [
+            "Dimensions " + "1 2 3 4 5 6 7 8 9 0 " * 40,
+            "Serial " + "1234567890" * 40,
+            "Table " + "1,2,3,4,5,6,7,8,9," * 40,
+            "Price: " + " ".join(f"{n},000" for n in range(100, 140)),
+        ]
+    )
+    return [page] * pages
+
+
+def time_corpus(pages: Sequence[str], repeat: int) -> Dict[str, Any]:
+    lines = sum(page.count("\n") + 1 for page in pages)
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page in pages:
+            scan_text(page)
+        runs.append(time.perf_counter() - started)
+    best = min(runs)
+    return {
+        "pages": len(pages),
+        "lines": lines,
+        "megabytes": round(sum(len(page.encode("utf-8")) for page in pages) / 1e6, 2),
+        "best_seconds": round(best, 4),
+        "lines_per_sec": round(lines / best) if best else None,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    corpora = {
+        "catalog": catalog_text(CatalogSpec(pages=args.pages, price_lines=24)),
+        "adversarial": adversarial_text(max(1, args.pages // 10)),
+    }
+    results = {name: time_corpus(pages, max(1, args.repeat)) for name, pages in corpora.items()}
+    for name, result in results.items():
+        print(f"{name:<12} {result['lines']:>9} lines {result['best_seconds']:>8.3f}s {result['lines_per_sec']:>10} lines/s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({"results": results}, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Time the extraction pipeline on synthetic catalogs and compare against a stored baseline.
+
+Usage::
+
+    python -m benchmarks.run                      # run every case, write benchmarks/results/latest.json
+    python -m benchmarks.run --save-baseline      # also store the run as the baseline
+    python -m benchmarks.run --compare            # exit 1 if a case regressed past --threshold
+
+Each case runs in a fresh process so its peak RSS is its own, with every data directory
+redirected to a temporary folder so nothing under ``data/`` or ``app/static`` is touched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+
+from benchmarks.synthetic import CatalogSpec, generate_catalog
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_OUTPUT = RESULTS_DIR / "latest.json"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+DEFAULT_THRESHOLD = 0.15
+COMPARED_METRICS = ("wall_seconds", "peak_rss_mb")
+POLL_SECONDS = 0.02
+
+Runner = Callable[[], int]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _bench_parse_products(pdf_path: Path) -> Runner:
+    import fitz
+
+    from app.services.product_parser import parse_products
+
+    with fitz.open(pdf_path) as doc:
+        text_blocks = [(page.number + 1, page.get_text("text")) for page in doc]
+    previews = {number: f"/static/uploads/bench/page_{number}.png" for number, _ in text_blocks}
+
+    def run() -> int:
+        parse_products(text_blocks, {}, previews)
+        return len(text_blocks)
+
+    return run
+
+
+def _bench_export_page_images(pdf_path: Path) -> Runner:
+    import fitz
+
+    from app.config import settings
+    from app.services.image_export import ImageRegistry, export_page_images
+
+    def run() -> int:
+        job_id = uuid.uuid4().hex
+        with fitz.open(pdf_path) as doc:
+            registry = ImageRegistry()
+            for page in doc:
+                export_page_images(page, job_id, settings.upload_static_dir / job_id, registry)
+            return doc.page_count
+
+    return run
+
+
+def _bench_render_page_preview(pdf_path: Path) -> Runner:
+    import fitz
+
+    from app.config import settings
+    from app.services.image_export import render_page_preview
+
+    def run() -> int:
+        job_id = uuid.uuid4().hex
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                render_page_preview(
+                    page,
+                    job_id,
+                    settings.upload_static_dir / job_id,
+                    scale=settings.render_scale,
+                    fmt=settings.render_format,
+                    quality=settings.render_quality,
+                )
+            return doc.page_count
+
+    return run
+
+
+def _bench_extract_from_pdf(pdf_path: Path) -> Runner:
+    from app.services.pdf_extract import extract_from_pdf
+
+    def run() -> int:
+        # measure extraction itself, in this process, rather than the page pool round trips
+        result = extract_from_pdf(pdf_path, uuid.uuid4().hex)
+        return len(result.text_blocks)
+
+    return run
+
+
+async def _upload_once(pdf_bytes: bytes) -> int:
+    import httpx
+
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/upload", files={"file": ("bench.pdf", pdf_bytes, "application/pdf")})
+        if response.status_code != 202:
+            raise RuntimeError(f"/upload answered {response.status_code}")
+        location = response.headers["location"]
+        while True:
+            status = (await client.get(location)).json()
+            if status["state"] == "failed":
+                raise RuntimeError(f"job failed: {status.get('error')}")
+            if status["state"] == "done":
+                return status["pages_total"]
+            await asyncio.sleep(POLL_SECONDS)
+
+
+def _bench_upload(pdf_path: Path) -> Runner:
+    import app.main  # noqa: F401  configures logging on import
+
+    # per-request access logs would dominate the timing
+    logging.disable(logging.INFO)
+    pdf_bytes = pdf_path.read_bytes()
+
+    def run() -> int:
+        return asyncio.run(_upload_once(pdf_bytes))
+
+    return run
+
+
+CASES: Dict[str, Callable[[Path], Runner]] = {
+    "parse_products": _bench_parse_products,
+    "export_page_images": _bench_export_page_images,
+    "render_page_preview": _bench_render_page_preview,
+    "extract_from_pdf": _bench_extract_from_pdf,
+    "upload": _bench_upload,
+}
+
+
+def run_case(name: str, pdf_path: Path, repeat: int) -> Dict[str, Any]:
+    """Run one case ``repeat`` times in the current process and summarize it."""
+
+    runner = CASES[name](pdf_path)
+    runs: List[float] = []
+    pages = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pages = runner()
+        runs.append(time.perf_counter() - started)
+    wall = statistics.median(runs)
+    return {
+        "pages": pages,
+        "runs": [round(seconds, 4) for seconds in runs],
+        "wall_seconds": round(wall, 4),
+        "best_seconds": round(min(runs), 4),
+        "pages_per_sec": round(pages / wall, 2) if wall else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def isolated_env(workdir: Path) -> Dict[str, str]:
+    return {
+        "TMP_DIR": str(workdir / "tmp"),
+        "EXTRACTED_DIR": str(workdir / "extracted"),
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "CATALOG_DB_PATH": str(workdir / "catalog.db"),
+        "QUEUE_DB_PATH": str(workdir / "queue.db"),
+        "CACHE_ENABLED": "false",
+    }
+
+
+def run_suite(spec: CatalogSpec, cases: Sequence[str], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="catalog-bench-") as tmp:
+        workdir = Path(tmp)
+        pdf_path = generate_catalog(workdir / f"catalog_{spec.label}.pdf", spec)
+        os.environ.update(isolated_env(workdir))
+        context = multiprocessing.get_context("spawn")
+        for name in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results[name] = pool.submit(run_case, name, pdf_path, repeat).result()
+            print(_format_row(name, results[name]), flush=True)
+        pdf_bytes = pdf_path.stat().st_size
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": os.cpu_count(),
+        "catalog": {**asdict(spec), "bytes": pdf_bytes},
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _format_row(name: str, result: Dict[str, Any]) -> str:
+    return (
+        f"{name:<22} {result['wall_seconds']:>9.3f}s {result['pages_per_sec'] or 0:>10.1f} pages/s"
+        f" {result['peak_rss_mb']:>9.1f} MB"
+    )
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Describe every case whose time or peak memory grew by more than ``threshold`` (a fraction)."""
+
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if change > threshold:
+                regressions.append(f"{name}.{metric}: {before} -> {after} (+{change:.0%})")
+    return regressions
+
+
+def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=CatalogSpec.pages)
+    parser.add_argument("--images", type=int, default=CatalogSpec.images_per_page, help="embedded images per page")
+    parser.add_argument("--seed", type=int, default=CatalogSpec.seed)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail when a case regressed against the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    cases = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    spec = CatalogSpec(pages=args.pages, images_per_page=args.images, seed=args.seed)
+    report = run_suite(spec, cases, max(1, args.repeat))
+    _write_json(args.output, report)
+    print(f"Wrote {args.output}")
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"Saved baseline {args.baseline}")
+
+    if not args.compare:
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+        return 2
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("catalog", {}).get("pages") != spec.pages:
+        print("Warning: baseline was recorded with a different catalog", file=sys.stderr)
+    regressions = compare(report, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Deterministic synthetic catalogs for benchmarking.
+
+Every page carries a shared logo (the same image bytes on every page), ``images_per_page - 1``
+unique product photos, a block of CJK text and a run of price and spec lines.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import fitz  # PyMuPDF
+
+CURRENCIES = ("¥{:,}", "{:,}円", "${:,}.99", "Rs. {:,}", "€{:,}", "USD {:,}")
+CJK_LINES = (
+    "高品質ステンレス製の電気ケトル。素早く沸騰し、自動電源オフ機能付き。",
+    "本製品は家庭用です。仕様は予告なく変更される場合があります。",
+    "不锈钢保温杯，容量五百毫升，保温十二小时。",
+)
+SPEC_KEYS = ("Weight", "Size", "Material", "Color", "重量", "サイズ", "容量")
+
+
+@dataclass(frozen=True)
+class CatalogSpec:
+    pages: int = 20
+    images_per_page: int = 3
+    image_size: int = 192
+    price_lines: int = 12
+    seed: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.pages}p_{self.images_per_page}img"
+
+
+def _photo(rng: random.Random, size: int) -> bytes:
+    """A unique, mildly compressible RGB image encoded as PNG."""
+
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, size, size), False)
+    base = [rng.randrange(256) for _ in range(3)]
+    step = max(8, size // 8)
+    for y in range(0, size, step):
+        for x in range(0, size, step):
+            color = tuple((channel + rng.randrange(64)) % 256 for channel in base)
+            pix.set_rect(fitz.IRect(x, y, x + step, y + step), color)
+    return pix.tobytes("png")
+
+
+def _logo(size: int) -> bytes:
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, size, size // 2), False)
+    pix.set_rect(pix.irect, (200, 30, 40))
+    pix.set_rect(fitz.IRect(size // 8, size // 8, size * 7 // 8, size * 3 // 8), (255, 255, 255))
+    return pix.tobytes("png")
+
+
+def _page_text(rng: random.Random, page_number: int, spec: CatalogSpec) -> List[str]:
+    lines = [f"Product {page_number:04d} Deluxe Kettle", CJK_LINES[page_number % len(CJK_LINES)]]
+    for index in range(spec.price_lines):
+        template = CURRENCIES[(page_number + index) % len(CURRENCIES)]
+        key = SPEC_KEYS[index % len(SPEC_KEYS)]
+        separator = "：" if not key.isascii() else ":"
+        lines.append(f"{key}{separator} {rng.randrange(1, 500)} {template.format(rng.randrange(100, 250_000))}")
+    lines.append(f"SKU: BENCH-{page_number:05d}")
+    return lines
+
+
+def catalog_text(spec: CatalogSpec = CatalogSpec()) -> List[str]:
+    """The text ``generate_catalog`` would place on each page, without building a PDF."""
+
+    rng = random.Random(spec.seed)
+    return ["\n".join(_page_text(rng, page_number, spec)) for page_number in range(1, spec.pages + 1)]
+
+
+def _insert_line(page: fitz.Page, x: float, y: float, line: str) -> None:
+    """Write ``line`` with Helvetica for ASCII runs and the built-in Japanese font for the rest."""
+
+    start = 0
+    while start < len(line):
+        ascii_run = line[start].isascii()
+        end = start
+        while end < len(line) and line[end].isascii() == ascii_run:
+            end += 1
+        run = line[start:end]
+        fontname = "helv" if ascii_run else "japan"
+        page.insert_text((x, y), run, fontsize=10, fontname=fontname)
+        x += fitz.get_text_length(run, fontname=fontname, fontsize=10)
+        start = end
+
+
+def generate_catalog(path: Path, spec: CatalogSpec = CatalogSpec()) -> Path:
+    """Write a catalog PDF described by ``spec`` to ``path``; identical specs give identical bytes."""
+
+    rng = random.Random(spec.seed)
+    logo = _logo(spec.image_size)
+    doc = fitz.open()
+    try:
+        for page_number in range(1, spec.pages + 1):
+            page = doc.new_page(width=595, height=842)
+            page.insert_image(fitz.Rect(36, 24, 156, 84), stream=logo)
+            y = 100.0
+            for line in _page_text(rng, page_number, spec):
+                _insert_line(page, 36, y, line)
+                y += 14
+            photos = max(0, spec.images_per_page - 1)
+            for index in range(photos):
+                x = 36 + (index % 3) * 180
+                top = y + 20 + (index // 3) * 180
+                page.insert_image(fitz.Rect(x, top, x + 170, top + 170), stream=_photo(rng, spec.image_size))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    finally:
+        doc.close()
+    return path
+
+
+__all__ = ["CatalogSpec", "catalog_text", "generate_catalog"]
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+
+# settings name -> location under the suite's data root
+DATA_LOCATIONS = {
+    "TMP_DIR": "tmp",
+    "EXTRACTED_DIR": "extracted",
+    "UPLOAD_DIR": "uploads",
+    "CATALOG_DB_PATH": "catalog.db",
+    "QUEUE_DB_PATH": "queue.db",
+}
+
+_data_root: Optional[Path] = None
+
+
+def pytest_configure(config):
+    # The static mount, catalog store, cache index and job queue are built from the settings when
+    # the app is imported, so the suite's data has to move before any test module imports it.
+    global _data_root
+    _data_root = Path(tempfile.mkdtemp(prefix="catalog-tests-"))
+    for name, location in DATA_LOCATIONS.items():
+        os.environ[name] = str(_data_root / location)
+
+
+def pytest_unconfigure(config):
+    if _data_root is not None:
+        shutil.rmtree(_data_root, ignore_errors=True)
+
+
+@pytest.fixture
+def data_dirs(tmp_path: Path, monkeypatch) -> Path:
+    """Point the job data settings at ``tmp_path`` for tests that inspect or sweep whole directories."""
+
+    from app.config import settings
+
+    for name in ("tmp_dir", "extracted_dir", "upload_static_dir"):
+        path = tmp_path / name
+        path.mkdir()
+        monkeypatch.setattr(settings, name, path)
+    monkeypatch.setattr(settings, "catalog_db_path", tmp_path / "catalog.db")
+    return tmp_path
+
+
+@pytest.fixture
+def make_pdf() -> Callable[..., bytes]:
+    """Build a PDF with one page per text; ``images`` adds a differently coloured square to each page."""
+
+    def build(*texts: str, images: bool = False) -> bytes:
+        doc = fitz.open()
+        for number, text in enumerate(texts, start=1):
+            page = doc.new_page()
+            page.insert_text((72, 72), text)
+            if images:
+                pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+                pix.clear_with(40 * number)
+                page.insert_image(fitz.Rect(72, 120, 200, 248), pixmap=pix)
+        return doc.tobytes()
+
+    return build
+
+
+@pytest.fixture
+def wait_for_job() -> Callable[..., dict]:
+    """Poll ``/jobs/<job_id>`` until the job is done or failed, or ``timeout`` runs out."""
+
+    def wait(client: TestClient, job_id: str, timeout: float = 15.0) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            status = client.get(f"/jobs/{job_id}").json()
+            if status["state"] in {"done", "failed"} or time.monotonic() > deadline:
+                return status
+            time.sleep(0.05)
+
+    return wait
+
+
+@pytest.fixture
+def upload_catalog(wait_for_job) -> Callable[..., dict]:
+    """Upload a PDF through ``POST /upload`` and return the finished job's status."""
+
+    def upload(client: TestClient, pdf_bytes: bytes, filename: str = "catalog.pdf", previous_job_id: str = "") -> dict:
+        response = client.post(
+            "/upload",
+            files={"file": (filename, pdf_bytes, "application/pdf")},
+            data={"previous_job_id": previous_job_id},
+        )
+        assert response.status_code == 202
+        status = wait_for_job(client, response.headers["location"].rsplit("/", 1)[-1])
+        assert status["state"] in {"done", "failed"}, "job did not finish in time"
+        return status
+
+    return upload
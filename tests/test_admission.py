@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import admission, jobs, storage
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def test_queue_rejects_past_page_limit_with_retry_after():
+    controller = AdmissionController(max_running_pages=10, max_queued_pages=50)
+    controller.admit("first", 40)
+    controller.admit("second", 10)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("third", 1)
+
+    assert rejected.value.retry_after >= 1
+    assert controller.stats()["queued_pages"] == 50
+    assert controller.stats()["rejected"] == 1
+
+
+def test_oversized_job_is_accepted_into_an_empty_queue():
+    controller = AdmissionController(max_running_pages=10, max_queued_pages=50)
+    controller.admit("poster-book", 400)
+
+    with controller.slot("poster-book"):
+        assert controller.stats()["running_pages"] == 400
+
+
+def test_slots_are_page_weighted_and_first_come_first_served():
+    controller = AdmissionController(max_running_pages=10, max_queued_pages=0)
+    order = []
+    controller.admit("big", 8)
+    controller.admit("medium", 5)
+    controller.admit("small", 1)
+
+    def run(job_id):
+        with controller.slot(job_id):
+            order.append(job_id)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=run, args=(job_id,)) for job_id in ("small", "medium", "big")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # "small" would fit next to "big" but must not overtake "medium"
+    assert order == ["big", "medium", "small"]
+    assert controller.stats()["running_jobs"] == 0
+
+
+def test_upload_returns_503_when_queue_is_full(monkeypatch, make_pdf):
+    controller = AdmissionController(max_running_pages=1, max_queued_pages=1)
+    controller.admit("blocker", 5)
+    monkeypatch.setattr(admission, "controller", controller)
+    client = TestClient(app)
+    response = client.post("/upload", files={"file": ("busy.pdf", make_pdf(f"Busy {uuid.uuid4().hex}"), "application/pdf")})
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert client.get("/debug/config").json()["admission"]["rejected"] == 1
+
+
+def test_concurrent_submits_reach_the_executor_in_ticket_order(monkeypatch, make_pdf):
+    controller = AdmissionController(max_running_pages=0, max_queued_pages=0)
+    monkeypatch.setattr(admission, "controller", controller)
+    manager = jobs.JobManager(1)
+    second_submitted = threading.Event()
+    admit = controller.admit
+
+    def slow_first_admit(job_id, pages):
+        admit(job_id, pages)
+        if job_id == job_ids[0]:
+            # give the second submit a chance to overtake the first one after admission
+            second_submitted.wait(0.3)
+
+    monkeypatch.setattr(controller, "admit", slow_first_admit)
+    uploads = [storage.save_upload(make_pdf(f"Ticket {number} {uuid.uuid4().hex}"), "t.pdf") for number in (1, 2)]
+    job_ids = [job_id for _, job_id in uploads]
+
+    def submit(index):
+        manager.submit(uploads[index][0], job_ids[index], "ticket.pdf", pages=1)
+        if index == 1:
+            second_submitted.set()
+
+    first = threading.Thread(target=submit, args=(0,))
+    first.start()
+    time.sleep(0.05)
+    submit(1)
+    first.join()
+
+    try:
+        deadline = time.monotonic() + 15
+        while not all(manager.get(job_id).finished for job_id in job_ids) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert [manager.get(job_id).state for job_id in job_ids] == [jobs.JOB_DONE, jobs.JOB_DONE]
+    finally:
+        manager.shutdown(wait=False)
+        for job_id in job_ids:
+            controller.cancel(job_id)  # releases a deadlocked executor thread
+            storage.cleanup_job(job_id)
+            storage.remove_upload(job_id)
@@ -0,0 +1,91 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Product
+from app.services import storage
+
+
+def make_job(prices):
+    job_id = f"testapi{uuid.uuid4().hex[:8]}"
+    products = [
+        Product(
+            name=f"Item {number}",
+            description=f"Item {number} description",
+            page_number=number,
+            page_image_url=f"/static/uploads/{job_id}/pages/page_{number}.png",
+            price=price,
+            extracted_text=f"Item {number} " + "spec line " * 100,
+        ).to_dict()
+        for number, price in enumerate(prices, start=1)
+    ]
+    storage.save_job_record(
+        job_id,
+        {"job_id": job_id, "filename": "api.pdf", "sha256": "ab" * 32, "pages_total": len(prices), "products": products},
+    )
+    return job_id
+
+
+def test_products_api_paginates_and_filters():
+    job_id = make_job(["$10", "$25", None, "$40"])
+    client = TestClient(app)
+
+    try:
+        first = client.get(f"/api/jobs/{job_id}/products?limit=3").json()
+        assert first["total"] == 4
+        assert [item["page_number"] for item in first["items"]] == [1, 2, 3]
+        assert first["next_offset"] == 3
+
+        second = client.get(first["next"]).json()
+        assert [item["page_number"] for item in second["items"]] == [4]
+        assert second["next_offset"] is None
+
+        priced = client.get(f"/api/jobs/{job_id}/products?min_price=20&max_price=30").json()
+        assert [item["name"] for item in priced["items"]] == ["Item 2"]
+
+        searched = client.get(f"/api/jobs/{job_id}/products?q=item 4").json()
+        assert [item["page_number"] for item in searched["items"]] == [4]
+
+        assert client.get("/api/jobs/missing/products").status_code == 404
+    finally:
+        storage.cleanup_job(job_id)
+
+
+def test_products_api_honors_if_none_match():
+    job_id = make_job(["$10"])
+    client = TestClient(app)
+
+    try:
+        response = client.get(f"/api/jobs/{job_id}/products")
+        etag = response.headers["etag"]
+        assert etag.startswith('"')
+
+        cached = client.get(f"/api/jobs/{job_id}/products", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+
+        other_page = client.get(f"/api/jobs/{job_id}/products?offset=1", headers={"If-None-Match": etag})
+        assert other_page.status_code == 200
+    finally:
+        storage.cleanup_job(job_id)
+
+
+def test_results_page_is_paginated_and_loads_text_on_demand():
+    job_id = make_job(["$10", "$25"])
+    client = TestClient(app)
+
+    try:
+        response = client.get(f"/jobs/{job_id}/results?page=2&per_page=1")
+        assert response.status_code == 200
+        assert "Item 2" in response.text
+        assert "Item 1" not in response.text
+        assert "Page 2 of 2" in response.text
+        assert f"/api/jobs/{job_id}/pages/2/text" in response.text
+        assert response.text.count("spec line") < 100
+
+        text = client.get(f"/api/jobs/{job_id}/pages/2/text")
+        assert text.text == "Item 2 " + "spec line " * 100
+        assert client.get(f"/api/jobs/{job_id}/pages/9/text").status_code == 404
+    finally:
+        storage.cleanup_job(job_id)
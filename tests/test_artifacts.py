@@ -0,0 +1,78 @@
+import gzip
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.artifacts import IMMUTABLE_CACHE_CONTROL, parse_range
+from app.config import settings
+from app.main import app
+
+
+@pytest.fixture
+def artifact():
+    job_dir = settings.upload_static_dir / "testartifacts"
+    job_dir.mkdir(parents=True, exist_ok=True)
+    image = job_dir / "page_1.png"
+    image.write_bytes(bytes(range(256)) * 40)
+    yield image
+    shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def test_job_artifacts_are_immutable_with_content_etag(artifact):
+    client = TestClient(app)
+    response = client.get("/static/uploads/testartifacts/page_1.png")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.content == artifact.read_bytes()
+
+    etag = response.headers["etag"]
+    artifact.touch()  # a new mtime does not change the content hash
+    revalidated = client.get("/static/uploads/testartifacts/page_1.png", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+def test_range_requests(artifact):
+    client = TestClient(app)
+    url = "/static/uploads/testartifacts/page_1.png"
+    data = artifact.read_bytes()
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert partial.content == data[100:200]
+
+    assert client.get(url, headers={"Range": "bytes=-10"}).content == data[-10:]
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert unsatisfiable.status_code == 416
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == data
+
+
+def test_css_is_served_precompressed():
+    client = TestClient(app)
+    css = (settings.static_dir / "css" / "app.css").read_bytes()
+
+    response = client.get("/static/css/app.css", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == css  # decoded by the client
+    assert not (settings.static_dir / "css" / "app.css.gz").exists()
+    variants = list((settings.tmp_dir / "compressed").glob("*-app.css.gz"))
+    assert [gzip.decompress(variant.read_bytes()) for variant in variants] == [css]
+
+    identity = client.get("/static/css/app.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-", 10) == (0, 9)
+    assert parse_range("bytes=5-100", 10) == (5, 9)
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    assert parse_range("items=0-1", 10) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=10-", 10)
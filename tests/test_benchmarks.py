@@ -0,0 +1,77 @@
+import asyncio
+
+import fitz
+import httpx
+import pytest
+
+from app.main import app
+from benchmarks.load import Sample, parse_mix, percentile, run_load, summarize
+from benchmarks.run import compare
+from benchmarks.synthetic import CatalogSpec, generate_catalog
+
+
+def test_synthetic_catalog_is_deterministic(tmp_path):
+    spec = CatalogSpec(pages=3, images_per_page=2, image_size=64)
+    first = generate_catalog(tmp_path / "a.pdf", spec)
+    second = generate_catalog(tmp_path / "b.pdf", spec)
+
+    assert first.read_bytes() == second.read_bytes()
+    with fitz.open(first) as doc:
+        assert doc.page_count == 3
+        assert all(len(page.get_images(full=True)) == 2 for page in doc)
+        text = doc[0].get_text()
+    assert "Product 0001" in text
+    assert "：" in text
+
+
+def test_compare_flags_regressions_past_threshold():
+    baseline = {"results": {"extract_from_pdf": {"wall_seconds": 1.0, "peak_rss_mb": 100.0}}}
+    current = {"results": {"extract_from_pdf": {"wall_seconds": 1.3, "peak_rss_mb": 105.0}, "upload": {}}}
+
+    regressions = compare(current, baseline, threshold=0.15)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("extract_from_pdf.wall_seconds")
+    assert compare(current, baseline, threshold=0.5) == []
+
+
+def test_load_summary_reports_percentiles_and_errors():
+    samples = [Sample("health", seconds / 1000, 200, True) for seconds in range(1, 101)]
+    samples.append(Sample("upload", 0.5, 503, False))
+
+    report = summarize(samples, elapsed=2.0)
+
+    assert percentile([1, 2, 3, 4], 0.5) == 2 and percentile([1, 2, 3, 4], 0.99) == 4
+    health = report["endpoints"]["health"]
+    assert health["latency_ms"]["p50"] == 50 and health["latency_ms"]["p95"] == 95 and health["latency_ms"]["p99"] == 99
+    assert health["requests_per_second"] == 50 and health["error_rate"] == 0
+    assert report["endpoints"]["upload"]["status_codes"] == {"503": 1}
+    assert report["total"]["errors"] == 1
+    assert parse_mix("upload=1, health") == {"upload": 1.0, "health": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("uploads=1")
+
+
+def test_load_run_in_process(tmp_path):
+    spec = CatalogSpec(pages=2, images_per_page=1, image_size=64)
+    catalog = ("load.pdf", generate_catalog(tmp_path / "load.pdf", spec).read_bytes())
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+            return await run_load(
+                client,
+                [catalog],
+                parse_mix("results=2,image=2,health=1"),
+                concurrency=4,
+                duration=30,
+                max_requests=20,
+                track_loop_lag=True,
+            )
+
+    report = asyncio.run(run())
+
+    assert report["total"]["requests"] == 20
+    assert report["total"]["errors"] == 0
+    assert set(report["endpoints"]) <= {"results", "image", "health"}
+    assert report["event_loop_lag_ms"]["max"] >= 0
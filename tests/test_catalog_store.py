@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Product
+from app.services import catalog_store
+from app.services.catalog_store import CatalogStore
+
+
+def product(page_number: int, name: str, description: str, specs=None, price=None) -> Product:
+    return Product(
+        name=name,
+        description=description,
+        page_number=page_number,
+        page_image_url=f"/static/uploads/job/pages/page_{page_number}.png",
+        extracted_text=description,
+        price=price,
+        specs=specs,
+        embedded_images=["/static/uploads/job/img_1.png"],
+    )
+
+
+def test_search_ranks_name_matches_first(tmp_path: Path):
+    store = CatalogStore(tmp_path / "catalog.db")
+    store.save_job(
+        "springjob",
+        [
+            product(1, "Garden Chair", "Teak wood outdoor seat", [("Material", "Teak")], "$120"),
+            product(2, "Table Lamp", "Pairs well with any chair", price="$40"),
+        ],
+        filename="spring.pdf",
+    )
+    store.save_job("winterjob", [product(1, "Wool Blanket", "Warm throw")], filename="winter.pdf")
+
+    hits = store.search("chair")
+    assert [(hit["job_id"], hit["page_number"]) for hit in hits] == [("springjob", 1), ("springjob", 2)]
+    assert hits[0]["filename"] == "spring.pdf"
+    assert hits[0]["price_value"] == 120.0
+
+    assert [hit["name"] for hit in store.search("teak")] == ["Garden Chair"]
+    assert store.search('wool "') and store.search("blan")
+    assert store.search("chair", job_id="winterjob") == []
+
+    store.save_job("springjob", [product(1, "Bench", "Oak")])
+    assert store.search("chair") == []
+
+    store.delete_job("winterjob")
+    assert store.search("wool") == []
+
+
+def test_search_endpoint(tmp_path: Path, monkeypatch):
+    store = CatalogStore(tmp_path / "catalog.db")
+    store.save_job("apijob", [product(3, "Desk Organizer", "Bamboo tray")])
+    monkeypatch.setattr(catalog_store, "store", store)
+
+    response = TestClient(app).get("/api/search?q=bamboo")
+
+    assert response.status_code == 200
+    assert [hit["page_number"] for hit in response.json()["hits"]] == [3]
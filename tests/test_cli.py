@@ -0,0 +1,106 @@
+import json
+import os
+
+import fitz
+
+from app import cli
+
+
+def write_pdf(path, pages: int) -> None:
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"{path.stem} item {number}\nPrice $1{number}.00")
+    doc.save(path)
+
+
+def test_convert_writes_json_lines_and_resumes(tmp_path, monkeypatch, capsys):
+    for name in ("TMP_DIR", "EXTRACTED_DIR", "UPLOAD_DIR"):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    catalogs = tmp_path / "catalogs"
+    (catalogs / "nested").mkdir(parents=True)
+    write_pdf(catalogs / "spring.pdf", pages=2)
+    write_pdf(catalogs / "nested" / "summer.pdf", pages=3)
+    (catalogs / "broken.pdf").write_bytes(b"%PDF-1.4 not really")
+    (catalogs / "notes.txt").write_text("ignored")
+    output = tmp_path / "out" / "products.jsonl"
+
+    exit_code = cli.main(["convert", str(catalogs), "-o", str(output), "-w", "2", "--json", "-q"])
+
+    assert exit_code == 1
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["files"] == 3
+    assert summary["failures"] == 1
+    assert summary["pages"] == 5
+    assert summary["products"] == 5
+    assert summary["pages_per_second"] > 0
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    files = {record["source"].rsplit("/", 1)[-1]: record for record in lines if record["type"] == "file"}
+    assert files["broken.pdf"]["status"] == "failed"
+    summer = files["summer.pdf"]
+    assert summer["status"] == "done" and summer["products"] == 3
+    summer_products = [record for record in lines if record["type"] == "product" and record["job_id"] == summer["job_id"]]
+    assert [product["price"] for product in summer_products] == ["$11.00", "$12.00", "$13.00"]
+    assert {product["source"] for product in summer_products} == {summer["source"]}
+    # a file's record comes after its products
+    assert lines.index(summer) > max(lines.index(product) for product in summer_products)
+    assert (tmp_path / "extracted_dir" / summer["job_id"] / "job.json").is_file()
+
+    cli.main(["convert", str(catalogs / "**" / "*.pdf"), "-o", str(output), "--json", "-q"])
+
+    rerun = json.loads(capsys.readouterr().out)
+    assert rerun["skipped"] == 2
+    assert rerun["files"] == 1  # only the failed file is tried again
+    assert len(output.read_text().splitlines()) == len(lines) + 1
+
+
+def test_resume_drops_products_of_an_unfinished_file(tmp_path):
+    output = tmp_path / "products.jsonl"
+    done = {"type": "file", "source": "a.pdf", "job_id": "a", "status": "done", "pages": 1, "products": 1}
+    output.write_text(
+        json.dumps({"type": "product", "source": "a.pdf", "job_id": "a", "name": "Lamp"}) + "\n"
+        + json.dumps(done) + "\n"
+        + json.dumps({"type": "product", "source": "b.pdf", "job_id": "b", "name": "Chair"}) + "\n"
+        + '{"type": "product", "sou'
+    )
+
+    cli._trim_unfinished(output)
+
+    assert [json.loads(line)["type"] for line in output.read_text().splitlines()] == ["product", "file"]
+    assert cli.completed_sources(output) == {"a.pdf"}
+
+
+def convert_or_crash(source: str) -> dict:
+    # runs in the spawned workers, which import it from this module
+    if source.endswith("crash.pdf"):
+        os._exit(1)
+    return cli.convert_file(source)
+
+
+def test_convert_survives_a_worker_that_dies(tmp_path, monkeypatch):
+    for name in ("TMP_DIR", "EXTRACTED_DIR", "UPLOAD_DIR"):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(cli, "convert_file", convert_or_crash)
+    for name in ("a", "b", "crash", "c", "d"):
+        write_pdf(tmp_path / f"{name}.pdf", pages=1)
+    output = tmp_path / "products.jsonl"
+
+    summary = cli.convert(cli.find_pdfs([str(tmp_path)]), output, workers=2, progress=False)
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    records = {record["source"].rsplit("/", 1)[-1]: record for record in lines if record["type"] == "file"}
+    assert sorted(records) == ["a.pdf", "b.pdf", "c.pdf", "crash.pdf", "d.pdf"]
+    assert records["crash.pdf"]["status"] == "failed"
+    assert "BrokenProcessPool" in records["crash.pdf"]["error"]
+    assert all(record["status"] == "done" for name, record in records.items() if name != "crash.pdf")
+    assert summary["files"] == 5 and summary["failures"] == 1
+
+
+def test_find_pdfs_expands_directories_and_globs(tmp_path):
+    (tmp_path / "a").mkdir()
+    for name in ("a/one.pdf", "a/two.PDF", "three.pdf", "four.txt"):
+        (tmp_path / name).write_bytes(b"%PDF-")
+
+    assert [path.name for path in cli.find_pdfs([str(tmp_path / "a")])] == ["one.pdf", "two.PDF"]
+    assert len(cli.find_pdfs([str(tmp_path / "*.pdf"), str(tmp_path / "three.pdf")])) == 1
+    assert len(cli.find_pdfs([str(tmp_path / "**" / "*.[pP][dD][fF]")])) == 3
@@ -0,0 +1,69 @@
+import io
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import storage
+
+
+def catalog_pages(pages: int = 2):
+    return [f"Export Product {number}\nPrice ¥{number},000" for number in range(1, pages + 1)]
+
+
+def read_export(client: TestClient, job_id: str) -> zipfile.ZipFile:
+    response = client.get(f"/jobs/{job_id}/export.zip")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert 'filename="spring_sale-catalog.zip"' in response.headers["content-disposition"]
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    return archive
+
+
+def test_export_is_a_self_contained_gallery(make_pdf, upload_catalog):
+    client = TestClient(app)
+    job_id = upload_catalog(client, make_pdf(*catalog_pages(), images=True), "spring sale.pdf")["job_id"]
+
+    try:
+        archive = read_export(client, job_id)
+        names = set(archive.namelist())
+        assert {"index.html", "catalog.json", "assets/app.css"} <= names
+
+        html = archive.read("index.html").decode("utf-8")
+        assert "Export Product 2" in html
+        assert "/static/uploads" not in html
+        assert 'href="assets/app.css"' in html
+
+        images = [info for info in archive.infolist() if info.filename.endswith((".png", ".jpg", ".webp"))]
+        assert images
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in images)
+        for info in images:
+            assert info.filename.startswith("files/")
+            assert info.filename in html
+    finally:
+        storage.cleanup_job(job_id)
+        storage.remove_upload(job_id)
+
+
+def test_export_renders_lazy_pages(monkeypatch, make_pdf, upload_catalog):
+    monkeypatch.setattr(settings, "render_mode", "lazy")
+    monkeypatch.setattr(settings, "prewarm_pages", 0)
+    client = TestClient(app)
+    job_id = upload_catalog(client, make_pdf(*catalog_pages(1), images=True), "spring sale.pdf")["job_id"]
+
+    try:
+        archive = read_export(client, job_id)
+        html = archive.read("index.html").decode("utf-8")
+        assert f"/jobs/{job_id}/pages" not in html
+        assert any(name.startswith("files/pages/page_1") for name in archive.namelist())
+    finally:
+        storage.cleanup_job(job_id)
+        storage.remove_upload(job_id)
+
+
+def test_export_requires_a_finished_job():
+    client = TestClient(app)
+
+    assert client.get("/jobs/doesnotexist/export.zip").status_code == 404
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+from app.config import settings
+from app.services import retention, storage
+from app.services.extraction_cache import ExtractionCache, cache_key
+
+
+def make_job(job_id: str) -> None:
+    _, upload_dir = storage.prepare_extraction_dirs(job_id)
+    (upload_dir / "page_1.png").write_bytes(b"x" * 100)
+    storage.save_job_record(job_id, {"job_id": job_id, "products": []})
+
+
+def test_cache_evicts_least_recently_used_job(tmp_path: Path):
+    cache = ExtractionCache(tmp_path / "index.json", max_entries=2, max_bytes=10**9, max_age_seconds=3600)
+    evicted = []
+
+    def failing_listener(job_id: str) -> None:
+        raise RuntimeError("database is locked")
+
+    # a failing listener must not break the upload that triggered the eviction
+    cache.add_eviction_listener(failing_listener)
+    cache.add_eviction_listener(evicted.append)
+    job_ids = ["testcache1", "testcache2", "testcache3"]
+    for job_id in job_ids:
+        make_job(job_id)
+
+    try:
+        cache.store("key1", "testcache1")
+        cache.store("key2", "testcache2")
+        assert cache.lookup("key1") == "testcache1"  # key2 is now least recently used
+        cache.store("key3", "testcache3")
+
+        assert evicted == ["testcache2"]
+        assert cache.lookup("key2") is None
+        assert not (settings.upload_static_dir / "testcache2").exists()
+        assert (settings.upload_static_dir / "testcache1").exists()
+
+        reloaded = ExtractionCache(tmp_path / "index.json", max_entries=2, max_bytes=10**9, max_age_seconds=3600)
+        assert reloaded.lookup("key3") == "testcache3"
+    finally:
+        for job_id in job_ids:
+            storage.cleanup_job(job_id)
+
+
+def test_cache_key_follows_output_settings(monkeypatch):
+    before = cache_key("a" * 64)
+    monkeypatch.setattr(settings, "image_min_pixels", settings.image_min_pixels + 1)
+    changed = cache_key("a" * 64)
+    monkeypatch.setattr(settings, "image_skip_masks", not settings.image_skip_masks)
+    masks = cache_key("a" * 64)
+    monkeypatch.setattr(settings, "render_max_pixels", settings.render_max_pixels // 2)
+
+    assert len({before, changed, masks, cache_key("a" * 64)}) == 4
+
+
+def test_cache_keeps_pinned_jobs_until_they_are_released(tmp_path: Path):
+    cache = ExtractionCache(tmp_path / "index.json", max_entries=1, max_bytes=10**9, max_age_seconds=3600)
+    job_ids = ["testpinned1", "testpinned2", "testpinned3"]
+    for job_id in job_ids:
+        make_job(job_id)
+
+    try:
+        cache.store("key1", "testpinned1")
+        with retention.sweeper.pinned("testpinned1"):  # e.g. the previous version of a revision
+            cache.store("key2", "testpinned2")
+            assert storage.has_job_record("testpinned1")
+            assert cache.stats()["entries"] == 2
+        cache.store("key3", "testpinned3")
+
+        assert not storage.has_job_record("testpinned1")
+        assert cache.lookup("key3") == "testpinned3"
+    finally:
+        for job_id in job_ids:
+            storage.cleanup_job(job_id)
+
+
+def test_hits_are_saved_lazily_and_evictions_run_outside_the_lock(tmp_path: Path, monkeypatch):
+    cache = ExtractionCache(tmp_path / "index.json", max_entries=1, max_bytes=10**9, max_age_seconds=3600)
+    saves = []
+    save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda: saves.append(1) or save())
+    # a listener that reads the cache would deadlock if files were removed under the lock
+    still_owned = []
+    cache.add_eviction_listener(lambda job_id: still_owned.append(cache.owns(job_id)))
+    job_ids = ["testlazy1", "testlazy2"]
+    for job_id in job_ids:
+        make_job(job_id)
+
+    try:
+        cache.store("key1", "testlazy1")
+        for _ in range(3):
+            assert cache.lookup("key1") == "testlazy1"
+        assert len(saves) == 1  # only the store; the hits wait for the next save
+        cache.flush()
+        cache.flush()
+        assert len(saves) == 2
+
+        cache.store("key2", "testlazy2")
+        assert still_owned == [False]
+        assert not (settings.upload_static_dir / "testlazy1").exists()
+    finally:
+        for job_id in job_ids:
+            storage.cleanup_job(job_id)
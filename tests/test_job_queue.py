@@ -0,0 +1,112 @@
+import hashlib
+import time
+
+from app.config import settings
+from app.models import Product
+from app.services import extraction_cache, job_queue, jobs, storage
+from app.worker import Worker
+
+
+def test_expired_lease_is_retried_until_attempts_run_out(tmp_path):
+    queue = job_queue.JobQueue(tmp_path / "queue.db", max_attempts=2)
+    queue.enqueue("job-1", tmp_path / "job-1.pdf", "a.pdf", pages=3)
+    assert queue.pending_pages() == 3
+
+    first = queue.claim("w1", lease_seconds=0.2)
+    assert first.job_id == "job-1" and first.attempts == 1
+    assert queue.claim("w2", lease_seconds=60) is None
+    time.sleep(0.25)
+
+    # w1 stopped heartbeating, so w2 takes over and w1 can no longer publish
+    second = queue.claim("w2", lease_seconds=0.2)
+    assert second.worker == "w2" and second.attempts == 2
+    assert not queue.heartbeat("job-1", "w1", 60, 1, 3)
+    assert not queue.finish("job-1", "w1")
+    time.sleep(0.25)
+
+    assert queue.claim("w3", lease_seconds=60) is None
+    failed = queue.get("job-1")
+    assert failed.state == job_queue.FAILED and failed.error
+    assert not queue.is_active("job-1")
+
+
+def test_running_jobs_show_the_products_their_worker_published(tmp_path):
+    queue = job_queue.JobQueue(tmp_path / "queue.db")
+    web = jobs.JobManager(1, queue=queue)
+    queue.enqueue("job-1", tmp_path / "job-1.pdf", "a.pdf", pages=2)
+    queue.claim("w1", lease_seconds=60)
+    lamp = Product(name="Lamp", description="", page_number=1, page_image_url="/static/uploads/job-1/p1.png")
+
+    assert queue.publish("job-1", "w1", lamp.to_dict(), pages_done=1, pages=2)
+    assert not queue.publish("job-1", "w2", lamp.to_dict(), pages_done=2, pages=2)
+
+    running = web.get("job-1")
+    assert running.state == jobs.JOB_RUNNING and running.pages_done == 1
+    assert [product.name for product in running.products] == ["Lamp"]
+    assert queue.finish("job-1", "w1")
+    assert queue.products("job-1") == []
+
+
+def test_worker_processes_jobs_submitted_by_the_web_process(tmp_path, make_pdf, monkeypatch):
+    queue = job_queue.JobQueue(tmp_path / "queue.db")
+    web = jobs.JobManager(1, queue=queue)
+    pdf_path, job_id = storage.save_upload(make_pdf("Queued Lamp\nPrice $12.50"), "queued.pdf")
+
+    job = web.submit(pdf_path, job_id, "queued.pdf", pages=1)
+    assert job.state == jobs.JOB_QUEUED
+    assert web.get(job_id).state == jobs.JOB_QUEUED
+    assert queue.stats()["queued"] == 1
+
+    published = []
+    publish = queue.publish
+    monkeypatch.setattr(queue, "publish", lambda *args: published.append(args[2]) or publish(*args))
+    worker = Worker(queue, jobs.JobManager(1, queue=queue), worker_id="w1", heartbeat_seconds=0.05)
+    assert worker.run(burst=True) == 1
+    assert [product["price"] for product in published] == ["$12.50"]
+
+    assert queue.get(job_id).state == job_queue.DONE
+    finished = web.get(job_id)
+    assert finished.state == jobs.JOB_DONE
+    assert [product.price for product in finished.products] == ["$12.50"]
+
+
+def test_worker_results_are_cached_on_lookup_not_on_read(tmp_path, make_pdf, monkeypatch):
+    queue = job_queue.JobQueue(tmp_path / "queue.db")
+    web = jobs.JobManager(1, queue=queue)
+    cache = extraction_cache.ExtractionCache(tmp_path / "index.json", 10, 10**9, 3600)
+    monkeypatch.setattr(extraction_cache, "cache", cache)
+    pdf_bytes = make_pdf("Cached Lamp\nPrice $9.00")
+    pdf_path, job_id = storage.save_upload(pdf_bytes, "cached.pdf")
+    sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+
+    web.submit(pdf_path, job_id, "cached.pdf", sha256=sha256, pages=1)
+    Worker(queue, jobs.JobManager(1, queue=queue), worker_id="w1").run(burst=True)
+    assert web.get(job_id).state == jobs.JOB_DONE
+    assert cache.stats()["entries"] == 0
+
+    assert web.find_cached(sha256).job_id == job_id
+    assert cache.lookup(extraction_cache.cache_key(sha256)) == job_id
+
+
+def test_worker_that_lost_its_lease_stops_without_touching_the_job(tmp_path, make_pdf, monkeypatch):
+    queue = job_queue.JobQueue(tmp_path / "queue.db")
+    pdf_path, job_id = storage.save_upload(make_pdf("Page one", "Page two", "Page three"), "lost.pdf")
+    queue.enqueue(job_id, pdf_path, "lost.pdf", pages=3)
+    marker = settings.upload_static_dir / job_id / "new-owner.txt"
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text("written by the worker that took over")
+
+    published = []
+
+    def handed_over(job_id, worker, product, pages_done, pages):
+        published.append(pages_done)
+        return False
+
+    monkeypatch.setattr(queue, "publish", handed_over)
+    worker = Worker(queue, jobs.JobManager(1, queue=queue), worker_id="w1")
+    assert worker.run_once()
+
+    assert published == [1]
+    assert marker.exists()
+    assert storage.load_job_record(job_id) is None
+    assert queue.get(job_id).state == job_queue.RUNNING
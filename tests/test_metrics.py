@@ -0,0 +1,49 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.config import settings
+from app.main import app
+
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter("demo_total", "Demo counter.", ["kind"]))
+    histogram = registry.register(metrics.Histogram("demo_seconds", "Demo timings.", buckets=(0.1, 1.0)))
+    counter.inc(2, kind="a")
+    histogram.observe(0.5)
+
+    text = registry.render()
+
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{kind="a"} 2' in text
+    assert 'demo_seconds_bucket{le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{le="1"} 1' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 1' in text
+    assert "demo_seconds_count 1" in text
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+    counter = metrics.Counter("off_total", "Disabled counter.")
+    counter.inc()
+
+    assert counter.value() == 0
+    assert TestClient(app).get("/metrics").status_code == 404
+
+
+def test_metrics_endpoint_reports_job_stages(make_pdf, upload_catalog):
+    client = TestClient(app)
+    pages_before = metrics.PAGES_TOTAL.value()
+    status = upload_catalog(client, make_pdf(f"Metered Product\nSKU {uuid.uuid4().hex}"), "metrics.pdf")
+    assert status["state"] == "done"
+
+    scrape = client.get("/metrics")
+
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain")
+    assert metrics.PAGES_TOTAL.value() == pages_before + 1
+    assert 'catalog_stage_seconds_count{stage="render"}' in scrape.text
+    assert 'catalog_stage_seconds_count{stage="parse"}' in scrape.text
+    assert "catalog_jobs_in_flight" in scrape.text
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import fitz
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import page_cache, pdf_extract, storage
+
+
+def save_pdf(pages: int = 2):
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"Lazy page {number}")
+    return storage.save_upload(doc.tobytes(), "lazy.pdf")
+
+
+def test_page_endpoint_renders_once_and_serves_from_disk():
+    _, job_id = save_pdf()
+    client = TestClient(app)
+
+    try:
+        first = client.get(f"/jobs/{job_id}/pages/2.png?scale=1")
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "image/png"
+        cached = page_cache.page_render_path(job_id, 2, 1.0, "png")
+        assert cached.exists()
+
+        mtime = cached.stat().st_mtime_ns
+        assert client.get(f"/jobs/{job_id}/pages/2.png?scale=1").content == first.content
+        assert cached.stat().st_mtime_ns == mtime
+
+        # other scales snap to the nearest pyramid level instead of getting a render of their own
+        assert client.get(f"/jobs/{job_id}/pages/2.png?scale=1.07").content == first.content
+        assert sorted(path.name for path in cached.parent.iterdir()) == ["page_2@1x.png"]
+
+        assert client.get(f"/jobs/{job_id}/pages/9.png").status_code == 404
+        assert client.get(f"/jobs/{job_id}/pages/1.gif").status_code == 400
+        assert client.get("/jobs/missing/pages/1.png").status_code == 404
+    finally:
+        storage.cleanup_job(job_id)
+        storage.remove_upload(job_id)
+
+
+def test_concurrent_requests_render_a_page_once(monkeypatch):
+    _, job_id = save_pdf(pages=1)
+    calls = []
+    real_render = page_cache.render_page_bytes
+
+    def slow_render(page, scale, fmt, quality):
+        calls.append(page.number)
+        time.sleep(0.1)
+        return real_render(page, scale=scale, fmt=fmt, quality=quality)
+
+    monkeypatch.setattr(page_cache, "render_page_bytes", slow_render)
+    renderer = page_cache.PageRenderer()
+    threads = [threading.Thread(target=renderer.render, args=(job_id, 1, 1.0, "png")) for _ in range(4)]
+
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == [0]
+    finally:
+        storage.cleanup_job(job_id)
+        storage.remove_upload(job_id)
+
+
+def test_lazy_mode_links_products_to_page_endpoint(monkeypatch):
+    monkeypatch.setattr(settings, "render_mode", "lazy")
+    pdf_path, job_id = save_pdf()
+
+    try:
+        result = pdf_extract.extract_from_pdf(pdf_path, job_id)
+        assert result.page_previews[1] == f"/jobs/{job_id}/pages/1.png"
+        assert not (settings.upload_static_dir / job_id / "pages").exists()
+    finally:
+        storage.cleanup_job(job_id)
+        storage.remove_upload(job_id)
+
+
+def test_requested_scales_snap_to_the_pyramid(monkeypatch):
+    monkeypatch.setattr(settings, "render_scale", 2.0)
+    monkeypatch.setattr(settings, "preview_levels", 3)
+    monkeypatch.setattr(settings, "lazy_max_scale", 4.0)
+
+    assert page_cache.lazy_scales() == [0.5, 1.0, 2.0, 4.0]
+    assert page_cache.snap_scale(None) == 2.0
+    assert [page_cache.snap_scale(scale) for scale in (0.01, 0.8, 1.49, 2.9, 100.0)] == [0.5, 1.0, 1.0, 2.0, 4.0]
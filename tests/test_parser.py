@@ -1,6 +1,6 @@
 import re
 
-from app.services.product_parser import PRICE_PATTERN, parse_products
+from app.services.product_parser import PRICE_PATTERN, parse_products, scan_text
 
 
 SAMPLE_TEXT_BLOCKS = [
@@ -46,3 +46,34 @@ def test_parse_products_handles_japanese_text():
     products = parse_products([japanese_block], {}, {3: "/static/uploads/job/pages/page_3.png"})
     assert products[0].name.startswith("商品名")
     assert products[0].price == "12,000円"
+
+
+def test_scan_text_prefers_prices_with_currency_over_other_numbers():
+    scan = scan_text("Model X200\nSKU: 48213\nPage 7\nSize：120 cm\nPrice: Rs. 1,299 (MRP 1,499)")
+
+    assert scan.best_price is not None
+    assert scan.best_price.text == "Rs. 1,299"
+    assert scan.best_price.value == 1299.0
+    assert scan.best_price.currency == "INR"
+    assert [price.value for price in scan.prices] == [1299.0, 1499.0]
+    assert ("Size", "120 cm") in scan.specs
+    assert ("SKU", "48213") in scan.specs
+
+
+def test_parse_products_sets_price_value_and_currency():
+    products = parse_products([(1, "Kettle\n価格：12,000円（税込）")], {}, {1: "/static/uploads/job/pages/page_1.png"})
+
+    assert products[0].price == "12,000円"
+    assert products[0].price_value == 12000.0
+    assert products[0].currency == "JPY"
+    assert products[0].price_text == "価格：12,000円（税込）"
+    assert products[0].specs == [("価格", "12,000円（税込）")]
+
+
+def test_space_grouped_thousands_stay_one_price():
+    assert [price.value for price in scan_text("Price: 1 299").prices] == [1299.0]
+
+    euro = scan_text("€1 299,-").best_price
+    assert euro.value == 1299.0 and euro.currency == "EUR"
+    assert scan_text("Price: 12\u202f500\u00a0000").prices[0].value == 12500000.0
+    assert scan_text("Price: 1 299.50 USD").best_price.value == 1299.5
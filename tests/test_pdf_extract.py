@@ -0,0 +1,176 @@
+from pathlib import Path
+
+import fitz
+
+from app.config import settings
+from app.services import image_export, pdf_extract, storage
+from app.services.image_export import ImagePolicy, ImageRegistry, export_page_images
+from app.services.revisions import page_fingerprints
+
+
+def create_catalog(path: Path, pages: int) -> Path:
+    doc = fitz.open()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 16, 16), 0)
+    pix.set_rect(pix.irect, (200, 30, 30))
+    logo = pix.tobytes("png")
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Item {number}\nPrice $1{number}.00")
+        page.insert_image(fitz.Rect(72, 100, 136, 164), stream=logo)
+    doc.save(path)
+    return path
+
+
+def test_parallel_extraction_matches_sequential(tmp_path: Path, monkeypatch):
+    pdf_path = create_catalog(tmp_path / "catalog.pdf", pages=5)
+
+    monkeypatch.setattr(settings, "extract_workers", 1)
+    sequential = pdf_extract.extract_from_pdf(pdf_path, "testsequential")
+
+    monkeypatch.setattr(settings, "extract_workers", 2)
+    monkeypatch.setattr(settings, "extract_chunk_pages", 2)
+    progress = []
+    parallel = pdf_extract.extract_from_pdf(
+        pdf_path, "testparallel", progress=lambda done, total: progress.append((done, total))
+    )
+
+    def normalize(paths):
+        return [path.replace("testparallel", "testsequential") for path in paths]
+
+    try:
+        assert parallel.text_blocks == sequential.text_blocks
+        assert [page for page, _ in parallel.text_blocks] == [1, 2, 3, 4, 5]
+        assert {k: normalize(v) for k, v in parallel.page_images.items()} == sequential.page_images
+        assert {k: normalize([v])[0] for k, v in parallel.page_previews.items()} == sequential.page_previews
+        assert progress[-1] == (5, 5)
+    finally:
+        storage.cleanup_job("testsequential")
+        storage.cleanup_job("testparallel")
+
+
+def test_pages_are_extracted_outside_the_calling_process(tmp_path: Path, monkeypatch):
+    pdf_path = create_catalog(tmp_path / "isolated.pdf", pages=2)
+
+    def in_this_process(*args):
+        raise AssertionError("page extracted in the calling process")
+
+    # the pool's processes import their own copy of the module
+    monkeypatch.setattr(pdf_extract, "_extract_page", in_this_process)
+    monkeypatch.setattr(pdf_extract, "Fingerprinter", in_this_process)
+
+    try:
+        pages = list(pdf_extract.iter_pages(pdf_path, "testisolated", isolate=True))
+        assert [page.page_number for page in pages] == [1, 2]
+        assert all(page.fingerprint for page in pages)
+    finally:
+        storage.cleanup_job("testisolated")
+
+
+def test_pages_are_fingerprinted_as_they_are_extracted(tmp_path: Path, monkeypatch):
+    pdf_path = create_catalog(tmp_path / "fingerprints.pdf", pages=3)
+
+    def separate_pass(*args):
+        raise AssertionError("document fingerprinted before extraction")
+
+    monkeypatch.setattr(pdf_extract, "_fingerprint_pages", separate_pass)
+
+    try:
+        pages = list(pdf_extract.iter_pages(pdf_path, "testfingerprints"))
+        assert [page.fingerprint for page in pages] == page_fingerprints(fitz.open(pdf_path))
+    finally:
+        storage.cleanup_job("testfingerprints")
+
+
+def test_repeated_images_are_exported_once(tmp_path: Path):
+    pdf_path = create_catalog(tmp_path / "logos.pdf", pages=3)
+
+    result = pdf_extract.extract_from_pdf(pdf_path, "testdedupe")
+
+    try:
+        assert len({tuple(paths) for paths in result.page_images.values()}) == 1
+        assert len(result.page_images[1]) == 1
+        exported = list((settings.upload_static_dir / "testdedupe").glob("img_*"))
+        assert len(exported) == 1
+    finally:
+        storage.cleanup_job("testdedupe")
+
+
+def test_identical_images_with_different_xrefs_share_a_file(tmp_path: Path):
+    merged = fitz.open()
+    for number in range(2):
+        merged.insert_pdf(fitz.open(create_catalog(tmp_path / f"part{number}.pdf", pages=1)))
+    assert merged[0].get_images()[0][0] != merged[1].get_images()[0][0]
+
+    registry = ImageRegistry()
+    first = export_page_images(merged[0], "testdigest", tmp_path / "out", registry=registry)
+    second = export_page_images(merged[1], "testdigest", tmp_path / "out", registry=registry)
+
+    assert [img.web_path for img in first] == [img.web_path for img in second]
+    assert len(list((tmp_path / "out").iterdir())) == 1
+
+
+def test_chunks_in_other_processes_reuse_exported_images(tmp_path: Path, monkeypatch):
+    doc = fitz.open(create_catalog(tmp_path / "chunks.pdf", pages=2))
+    out = tmp_path / "out"
+    first = ImageRegistry(link_xrefs=True)
+    export_page_images(doc[0], "testchunks", out, registry=first)
+
+    # a registry without xref links decodes the image again but finds the file already written
+    unlinked = ImageRegistry()
+    export_page_images(doc[1], "testchunks", out, registry=unlinked)
+
+    def no_decoding(*args):
+        raise AssertionError("image decoded again")
+
+    monkeypatch.setattr(image_export, "_read_original_image", no_decoding)
+    monkeypatch.setattr(image_export, "_render_image_pixmap", no_decoding)
+    second = ImageRegistry(link_xrefs=True)
+    exported = export_page_images(doc[1], "testchunks", out, registry=second)
+
+    assert (first.images_written, unlinked.images_written, second.images_written) == (1, 0, 0)
+    assert [img.file_path.name for img in exported] == [path.name for path in out.glob("img_*")]
+
+
+def test_export_policy_skips_masks_and_spacers(tmp_path: Path):
+    doc = fitz.open()
+    page = doc.new_page()
+    photo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 48, 32), 1)
+    photo.clear_with(120)
+    page.insert_image(fitz.Rect(72, 72, 168, 136), pixmap=photo)  # stored with a soft mask
+    spacer = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 1, 1), 0)
+    page.insert_image(fitz.Rect(200, 72, 201, 73), pixmap=spacer)
+    # list the soft mask as a page image too, as some producers do
+    smask = page.get_images(full=True)[0][1]
+    resources = int(doc.xref_get_key(page.xref, "Resources")[1].split()[0])
+    doc.xref_set_key(resources, "XObject/fzMask", f"{smask} 0 R")
+
+    registry = ImageRegistry()
+    exported = export_page_images(page, "testpolicy", tmp_path, registry=registry, policy=ImagePolicy())
+
+    assert len(page.get_images(full=True)) == 3
+    assert len(exported) == 1
+    assert len(registry.skipped) == 2
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_jpeg_streams_are_copied_without_decoding(tmp_path: Path):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 40, 30), 0)
+    pix.set_rect(pix.irect, (10, 120, 200))
+    jpeg = pix.tobytes("jpg")
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(72, 72, 152, 132), stream=jpeg)
+
+    exported = export_page_images(page, "testraw", tmp_path, policy=ImagePolicy())
+
+    assert exported[0].file_path.suffix == ".jpg"
+    assert exported[0].file_path.read_bytes() == jpeg
+
+
+def test_images_browsers_cannot_show_are_not_kept_as_extracted():
+    class JpegTwoThousand:
+        def extract_image(self, xref):
+            return {"image": b"\x00\x00\x00\x0cjP  ", "ext": "jpx"}
+
+    assert "JPXDecode" not in image_export.RAW_IMAGE_FILTERS
+    assert image_export._read_original_image(JpegTwoThousand(), 7) is None
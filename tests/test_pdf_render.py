@@ -1,10 +1,14 @@
 import shutil
+import threading
+import time
 from pathlib import Path
 
 import fitz
 
 from app.config import settings
-from app.services.image_export import render_page_preview
+from app.services import image_export
+from app.services.image_export import build_srcset, render_page_preview, render_page_pyramid
+from app.services.render_budget import RenderBudget, effective_scale, rasterize
 from app.services.storage import ensure_directories
 
 
@@ -26,3 +30,70 @@ def test_render_page_preview_creates_file(tmp_path: Path):
 
     # cleanup
     shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def test_render_page_pyramid_halves_one_rasterization(tmp_path: Path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Hello catalog")
+
+    levels = render_page_pyramid(page, "testpyramid", tmp_path, scale=2.0, fmt="jpg", quality=60, levels=3)
+
+    assert [img.file_path.name for img in levels] == ["page_1.jpg", "page_1_card.jpg", "page_1_thumb.jpg"]
+    assert [img.width for img in levels] == [1190, 595, 298]
+    assert all(img.file_path.read_bytes()[:2] == b"\xff\xd8" for img in levels)
+    assert build_srcset(levels).startswith("/static/uploads/testpyramid/pages/page_1_thumb.jpg 298w, ")
+
+
+def test_webp_without_pillow_falls_back_to_jpeg(monkeypatch):
+    monkeypatch.setattr(image_export, "Image", None)
+
+    assert image_export.output_format("webp") == "jpg"
+
+
+def poster_page():
+    doc = fitz.open()
+    page = doc.new_page(width=2384, height=3370)  # A0
+    page.draw_rect(fitz.Rect(100, 100, 2000, 3000), color=(1, 0, 0), fill=(0, 0, 1))
+    page.insert_text((200, 200), "Poster", fontsize=120)
+    return doc, page
+
+
+def test_effective_scale_caps_pixel_count():
+    rect = fitz.Rect(0, 0, 2384, 3370)
+
+    scale = effective_scale(rect, 2.0, max_pixels=4_000_000)
+
+    assert scale < 2.0
+    assert rect.width * scale * rect.height * scale <= 4_000_000
+    assert effective_scale(fitz.Rect(0, 0, 595, 842), 2.0, max_pixels=4_000_000) == 2.0
+
+
+def test_tiled_rasterization_matches_single_render():
+    doc, page = poster_page()
+
+    with rasterize(page, 0.5, max_pixels=0, tile_pixels=50_000) as tiled:
+        direct = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5), alpha=False)
+        assert tiled.irect == direct.irect
+        assert tiled.samples == direct.samples
+
+
+def test_render_budget_serializes_reservations_over_limit():
+    budget = RenderBudget(max_bytes=100)
+    order = []
+
+    def worker(name):
+        with budget.reserve(80):
+            order.append(f"{name}-start")
+            time.sleep(0.05)
+            order.append(f"{name}-end")
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert order[1].endswith("-end")
+    assert budget.in_use == 0
+    assert budget.waits == 1
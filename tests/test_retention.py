@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import JobAccessMiddleware, app
+from app.services import retention, storage
+from app.services.retention import RetentionSweeper
+
+
+def make_job(job_id: str, size: int, age_seconds: float) -> None:
+    extraction_dir, upload_dir = storage.prepare_extraction_dirs(job_id)
+    (upload_dir / "page_1.png").write_bytes(b"x" * size)
+    storage.save_job_record(job_id, {"job_id": job_id, "products": []})
+    pdf_path = settings.tmp_dir / f"{job_id}_catalog.pdf"
+    pdf_path.write_bytes(b"%PDF")
+    stamp = time.time() - age_seconds
+    for path in (extraction_dir, upload_dir, pdf_path):
+        os.utime(path, (stamp, stamp))
+
+
+def test_sweep_evicts_least_recently_accessed_jobs_over_budget(data_dirs):
+    sweeper = RetentionSweeper(max_age_seconds=0, max_bytes=2500, interval_seconds=60, min_idle_seconds=0)
+    evicted = []
+    sweeper.add_eviction_listener(evicted.append)
+    make_job("oldest", 1000, age_seconds=300)
+    make_job("older", 1000, age_seconds=200)
+    make_job("newest", 1000, age_seconds=100)
+    sweeper.touch("oldest")
+
+    result = sweeper.sweep()
+
+    assert result.evicted == evicted == ["older"]
+    assert result.reclaimed_bytes > 1000
+    assert storage.find_upload("older") is None
+    assert not (settings.upload_static_dir / "older").exists()
+    assert storage.has_job_record("oldest") and storage.has_job_record("newest")
+    assert sweeper.stats()["bytes_reclaimed"] == result.reclaimed_bytes
+
+
+def test_sweep_skips_pinned_and_recently_used_jobs(data_dirs):
+    sweeper = RetentionSweeper(max_age_seconds=60, max_bytes=0, interval_seconds=60, min_idle_seconds=30)
+    make_job("processing", 10, age_seconds=3600)
+    make_job("expired", 10, age_seconds=3600)
+    make_job("fresh", 10, age_seconds=10)
+    sweeper.pin("processing")
+
+    assert sweeper.sweep().evicted == ["expired"]
+
+    sweeper.unpin("processing")  # unpinning counts as an access
+    assert sweeper.sweep().evicted == []
+    assert sweeper.sweep(now=time.time() + 3600).evicted == ["fresh", "processing"]
+
+
+def test_sweep_ignores_directories_that_are_not_jobs(data_dirs):
+    sweeper = RetentionSweeper(max_age_seconds=60, max_bytes=0, interval_seconds=60, min_idle_seconds=0)
+    make_job("expired", 10, age_seconds=3600)
+    (settings.extracted_dir / "tmp").mkdir()
+    (settings.extracted_dir / "tmp" / ".gitkeep").touch()
+    (settings.upload_static_dir / ".cache").mkdir()
+
+    assert sweeper.sweep(now=time.time() + 3600).evicted == ["expired"]
+    assert (settings.extracted_dir / "tmp" / ".gitkeep").exists()
+
+
+def test_only_jobs_on_disk_are_tracked(data_dirs, monkeypatch):
+    sweeper = RetentionSweeper(max_age_seconds=0, max_bytes=0, interval_seconds=60, min_idle_seconds=0)
+    monkeypatch.setattr(retention, "sweeper", sweeper)
+    make_job("kept", 10, age_seconds=0)
+    make_job("removed", 10, age_seconds=0)
+    client = TestClient(app)
+
+    assert client.get("/jobs/never-existed").status_code == 404
+    assert client.get("/static/uploads/never-existed/page_1.png").status_code == 404
+    client.get("/static/uploads/kept/page_1.png")
+    sweeper.touch("removed")
+    assert sweeper.stats()["tracked_jobs"] == 2
+
+    storage.cleanup_job("removed")
+    storage.remove_upload("removed")
+    sweeper.sweep()
+    assert sweeper.stats()["tracked_jobs"] == 1
+
+
+def test_job_stays_pinned_until_the_response_body_is_sent(tmp_path):
+    path = tmp_path / "page_1.png"
+    path.write_bytes(b"x" * 100)
+    pinned_while_sending = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            pinned_while_sending.append(retention.sweeper.is_pinned("streamed"))
+
+    scope = {"type": "http", "method": "GET", "path": "/static/uploads/streamed/page_1.png", "headers": []}
+    asyncio.run(JobAccessMiddleware(FileResponse(path))(scope, receive, send))
+
+    assert pinned_while_sending and all(pinned_while_sending)
+    assert not retention.sweeper.is_pinned("streamed")
+
+
+def test_debug_config_reports_retention_stats():
+    stats = TestClient(app).get("/debug/config").json()["retention"]
+
+    assert {"enabled", "sweeps", "bytes_reclaimed", "last_sweep", "pinned_jobs"} <= stats.keys()
@@ -0,0 +1,77 @@
+import fitz
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import storage
+from app.services.revisions import page_fingerprints
+
+
+ITEMS = {"A": 60, "B": 120, "C": 180, "D": 240}
+
+
+def build_catalog(items) -> fitz.Document:
+    doc = fitz.open()
+    for name, price in items:
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Item {name}\nPrice ${price}")
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 32, 32), False)
+        pix.clear_with(ITEMS[name])
+        page.insert_image(fitz.Rect(72, 120, 136, 184), pixmap=pix)
+    return doc
+
+
+def test_fingerprints_follow_content_not_object_numbers():
+    before = page_fingerprints(build_catalog([("A", "10.00"), ("B", "20.00"), ("C", "30.00")]))
+    revised = build_catalog([("A", "10.00"), ("B", "25.00"), ("C", "30.00")])
+    after = page_fingerprints(revised)
+    # a full rewrite renumbers every object
+    resaved = fitz.open("pdf", revised.tobytes(garbage=4))
+
+    assert len(set(before)) == 3
+    assert before[0] == after[0] and before[2] == after[2]
+    assert before[1] != after[1]
+    assert page_fingerprints(resaved) == after
+
+
+def test_revision_reprocesses_only_changed_pages(upload_catalog):
+    client = TestClient(app)
+    first = upload_catalog(client, build_catalog([("A", "10.00"), ("B", "20.00"), ("C", "30.00")]).tobytes(), "weekly.pdf")
+    assert first["changed_pages"] is None
+
+    # a new first page pushes A back, B is dropped and C stays where it was
+    revised = build_catalog([("D", "5.00"), ("A", "10.00"), ("C", "30.00")])
+    second = upload_catalog(client, revised.tobytes(), "weekly.pdf", first["job_id"])
+
+    job_id = second["job_id"]
+    try:
+        assert second["state"] == "done"
+        assert second["previous_job_id"] == first["job_id"]
+        assert second["changed_pages"] == [1]
+
+        products = client.get(f"/api/jobs/{job_id}/products").json()["items"]
+        assert [product["name"] for product in products] == ["Item D", "Item A", "Item C"]
+        assert [product["page_number"] for product in products] == [1, 2, 3]
+        for product in products:
+            assert product["page_image_url"].startswith(f"/static/uploads/{job_id}/")
+            assert client.get(product["page_image_url"]).status_code == 200
+
+        old_render = settings.upload_static_dir / first["job_id"] / "pages" / "page_1.png"
+        new_render = settings.upload_static_dir / job_id / "pages" / "page_2.png"
+        assert new_render.stat().st_ino == old_render.stat().st_ino
+    finally:
+        for done in (first["job_id"], job_id):
+            storage.cleanup_job(done)
+            storage.remove_upload(done)
+
+
+def test_unknown_previous_version_is_rejected():
+    client = TestClient(app)
+    response = client.post(
+        "/upload",
+        files={"file": ("weekly.pdf", build_catalog([("A", "1.00")]).tobytes(), "application/pdf")},
+        data={"previous_job_id": "doesnotexist"},
+    )
+
+    assert response.status_code == 400
+    assert "doesnotexist" in response.text
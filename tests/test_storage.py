@@ -0,0 +1,29 @@
+import hashlib
+
+import pytest
+
+from app.services import storage
+
+
+def test_upload_spool_hashes_while_writing():
+    spool = storage.UploadSpool("catalog.pdf", max_bytes=1024)
+    spool.write(b"%PDF-")
+    spool.write(b"1.7")
+    path, job_id = spool.finish()
+
+    try:
+        assert path.name == f"{job_id}_catalog.pdf"
+        assert path.read_bytes() == b"%PDF-1.7"
+        assert spool.size == 8
+        assert spool.sha256 == hashlib.sha256(b"%PDF-1.7").hexdigest()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def test_upload_spool_aborts_past_limit():
+    spool = storage.UploadSpool("big.pdf", max_bytes=10)
+    spool.write(b"x" * 10)
+
+    with pytest.raises(storage.UploadTooLarge):
+        spool.write(b"x")
+    assert not spool.path.exists()
@@ -1,24 +1,113 @@
-import fitz
+import json
+import uuid
+
 from fastapi.testclient import TestClient
 
+from app.config import settings
 from app.main import app
+from app.services import jobs
+
+
+def test_upload_endpoint_processes_pdf(make_pdf, wait_for_job):
+    client = TestClient(app)
+    pdf_bytes = make_pdf(f"Sample Product\nPrice ¥12,000\nSKU {uuid.uuid4().hex}")
+    response = client.post(
+        "/upload",
+        files={"file": ("sample.pdf", pdf_bytes, "application/pdf")},
+    )
+
+    assert response.status_code == 202
+    job_id = response.headers["location"].rsplit("/", 1)[-1]
+
+    status = wait_for_job(client, job_id)
+    assert status["state"] == "done"
+    assert status["pages_done"] == status["pages_total"] == 1
+    # finished jobs are not kept in memory; each lookup reads job.json
+    assert jobs.manager.get(job_id) is not jobs.manager.get(job_id)
 
+    results = client.get(f"/jobs/{job_id}/results")
+    assert results.status_code == 200
+    assert "Catalog Results" in results.text
+    assert "Sample Product" in results.text
 
-def create_pdf_bytes(text: str) -> bytes:
-    doc = fitz.open()
-    page = doc.new_page()
-    page.insert_text((72, 72), text)
-    return doc.tobytes()
+
+def test_unknown_job_returns_404():
+    client = TestClient(app)
+
+    assert client.get("/jobs/doesnotexist").status_code == 404
+    assert client.get("/jobs/doesnotexist/results").status_code == 404
 
 
-def test_upload_endpoint_processes_pdf():
+def test_upload_rejects_oversized_file(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_mb", 1)
     client = TestClient(app)
-    pdf_bytes = create_pdf_bytes("Sample Product\nPrice ¥12,000")
     response = client.post(
         "/upload",
-        files={"file": ("sample.pdf", pdf_bytes, "application/pdf")},
+        files={"file": ("big.pdf", b"%PDF-" + b"0" * (2 * 1024 * 1024), "application/pdf")},
+    )
+
+    assert response.status_code == 413
+
+    # Just over the limit: passes the header check and is cut off while spooling
+    response = client.post(
+        "/upload",
+        files={"file": ("edge.pdf", b"%PDF-" + b"0" * (1024 * 1024), "application/pdf")},
     )
 
-    assert response.status_code == 200
-    assert "Catalog Pages" in response.text
-    assert "Sample Product" in response.text
+    assert response.status_code == 413
+
+
+def test_repeat_upload_reuses_cached_extraction(make_pdf, upload_catalog):
+    client = TestClient(app)
+    pdf_bytes = make_pdf(f"Cached Product\nSKU {uuid.uuid4().hex}")
+
+    first = upload_catalog(client, pdf_bytes, "cached.pdf")
+    assert first["state"] == "done"
+    job_id = first["job_id"]
+
+    repeat = client.post("/upload", files={"file": ("cached.pdf", pdf_bytes, "application/pdf")}, follow_redirects=False)
+
+    assert repeat.status_code == 303
+    assert repeat.headers["location"] == f"/jobs/{job_id}/results"
+    assert "Cached Product" in client.get(repeat.headers["location"]).text
+
+
+def test_job_events_stream_products_and_completion(make_pdf):
+    client = TestClient(app)
+    pdf_bytes = make_pdf(f"Streamed Product\nSKU {uuid.uuid4().hex}")
+    response = client.post("/upload", files={"file": ("stream.pdf", pdf_bytes, "application/pdf")})
+    job_id = response.headers["location"].rsplit("/", 1)[-1]
+
+    events = []
+    with client.stream("GET", f"/jobs/{job_id}/events") as stream:
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        for line in stream.iter_lines():
+            if line.startswith("event: "):
+                events.append(line[len("event: "):])
+            elif line.startswith("data: ") and events[-1] == "product":
+                assert json.loads(line[len("data: "):])["name"] == "Streamed Product"
+
+    assert events[-1] == "done"
+    assert "product" in events
+    assert "progress" in events
+
+
+def test_upload_rejects_invalid_pdf_before_queueing():
+    client = TestClient(app)
+    response = client.post("/upload", files={"file": ("broken.pdf", b"not a pdf at all", "application/pdf")})
+
+    assert response.status_code == 400
+    assert "not a valid PDF" in response.text
+
+
+def test_failed_upload_discards_the_spooled_pdf(data_dirs, make_pdf, monkeypatch):
+    def broken_cache(sha256):
+        raise RuntimeError("cache index unavailable")
+
+    monkeypatch.setattr(jobs.manager, "find_cached", broken_cache)
+    client = TestClient(app)
+    pdf_bytes = make_pdf(f"Lost Product\nSKU {uuid.uuid4().hex}")
+    response = client.post("/upload", files={"file": ("lost.pdf", pdf_bytes, "application/pdf")})
+
+    assert response.status_code == 500
+    assert list(settings.tmp_dir.iterdir()) == []
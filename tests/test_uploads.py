@@ -0,0 +1,80 @@
+import hashlib
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import storage
+
+
+def chunks_of(data: bytes, size: int):
+    return [data[offset : offset + size] for offset in range(0, len(data), size)]
+
+
+def test_chunks_arrive_out_of_order_and_resume(monkeypatch, make_pdf, wait_for_job):
+    monkeypatch.setattr(settings, "resumable_chunk_bytes", 256)
+    client = TestClient(app)
+    pdf_bytes = make_pdf("Oak Table\nPrice $199.00", "Pine Chair\nPrice $49.50")
+    parts = chunks_of(pdf_bytes, 256)
+    assert len(parts) > 2
+
+    created = client.post("/uploads", json={"filename": "big.pdf", "size": len(pdf_bytes)})
+    assert created.status_code == 201
+    session = created.json()
+    upload_id = session["upload_id"]
+    assert session["chunks"] == len(parts) and session["missing_chunks"] == list(range(len(parts)))
+
+    last = len(parts) - 1
+    for index in (last, 0):
+        response = client.put(
+            f"/uploads/{upload_id}/chunks/{index}",
+            content=parts[index],
+            headers={"X-Chunk-SHA256": hashlib.sha256(parts[index]).hexdigest()},
+        )
+        assert response.status_code == 200
+        assert response.json()["offset"] == index * 256
+
+    status = client.get(f"/uploads/{upload_id}").json()
+    assert status["received_ranges"] == [[0, 256], [last * 256, len(pdf_bytes)]]
+    incomplete = client.post(f"/uploads/{upload_id}/complete")
+    assert incomplete.status_code == 409
+    assert incomplete.json()["missing_chunks"] == list(range(1, last))
+
+    bad = client.put(f"/uploads/{upload_id}/chunks/1", content=parts[1], headers={"X-Chunk-SHA256": "0" * 64})
+    assert bad.status_code == 400
+    assert client.put(f"/uploads/{upload_id}/chunks/1", content=parts[1][:-1]).status_code == 400
+    for index in status["missing_chunks"]:
+        assert client.put(f"/uploads/{upload_id}/chunks/{index}", content=parts[index]).status_code == 200
+
+    completed = client.post(f"/uploads/{upload_id}/complete")
+    assert completed.status_code == 202
+    job = completed.json()
+    assert job["job_id"] == upload_id
+    assert job["sha256"] == hashlib.sha256(pdf_bytes).hexdigest()
+    # the session's bookkeeping is gone and the data file became the job's source PDF
+    assert storage.find_upload(upload_id).read_bytes() == pdf_bytes
+    assert client.get(f"/uploads/{upload_id}").status_code == 404
+
+    state = wait_for_job(client, upload_id)
+    assert state["state"] == "done" and state["products"] == 2
+
+
+def test_sessions_are_bounded_and_checked(monkeypatch, make_pdf):
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "resumable_max_upload_mb", 1)
+    assert client.post("/uploads", json={"filename": "huge.pdf", "size": 2 * 1024 * 1024}).status_code == 413
+    assert client.post("/uploads", json={"filename": "notes.txt", "size": 10}).status_code == 400
+
+    pdf_bytes = make_pdf("Oak Table\nPrice $199.00", "Pine Chair\nPrice $49.50")
+    session = client.post(
+        "/uploads", json={"filename": "declared.pdf", "size": len(pdf_bytes), "sha256": "a" * 64}
+    ).json()
+    upload_id = session["upload_id"]
+    assert client.put(f"/uploads/{upload_id}/chunks/0", content=pdf_bytes + b"x").status_code == 413
+    assert client.put(f"/uploads/{upload_id}/chunks/1", content=b"").status_code == 400
+    assert client.put(f"/uploads/{upload_id}/chunks/0", content=pdf_bytes).status_code == 200
+    # the assembled file does not match the digest declared up front
+    assert client.post(f"/uploads/{upload_id}/complete").status_code == 400
+
+    assert client.delete(f"/uploads/{upload_id}").status_code == 204
+    assert not list(settings.tmp_dir.glob(f"{upload_id}_*"))